@@ -0,0 +1,83 @@
+"""Query count and latency of the SilkProduct admin changelist on a large catalog."""
+import argparse
+import random
+import time
+
+from common import test_database
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from silk_products.models import SilkProduct
+
+TYPES = ['saree', 'fabric', 'scarf', 'shawl']
+
+
+def populate(rows, sellers, batch_size=10000):
+    User.objects.bulk_create(
+        [User(username=f'seller{i}') for i in range(sellers)], batch_size=batch_size
+    )
+    owner_ids = list(User.objects.values_list('pk', flat=True))
+    rng = random.Random(1)
+    for start in range(0, rows, batch_size):
+        SilkProduct.objects.bulk_create([
+            SilkProduct(
+                name=f'Silk product {i}',
+                type=rng.choice(TYPES),
+                price=rng.randint(100, 10000),
+                availability=rng.random() < 0.8,
+                owner_id=rng.choice(owner_ids),
+                description='Handwoven Rajshahi silk. ' * 40,
+            )
+            for i in range(start, min(start + batch_size, rows))
+        ])
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def measure(client, url, params, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url, params)
+            timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    return len(queries), min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--sellers', type=int, default=5000)
+    args = parser.parse_args()
+
+    with test_database():
+        start = time.perf_counter()
+        populate(args.rows, args.sellers)
+        print(f'populated {args.rows} products / {args.sellers} sellers in {time.perf_counter() - start:.1f} s')
+
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass123')
+        client = Client()
+        client.force_login(admin_user)
+        url = reverse('admin:silk_products_silkproduct_changelist')
+
+        for label, params in [
+            ('unfiltered', {}),
+            ('page 50', {'p': 50}),
+            ('owner filter', {'owner': 'seller42'}),
+            ('name search', {'q': 'Katan'}),
+        ]:
+            queries, seconds = measure(client, url, params)
+            print(f'{label:<16} {queries:>3} queries {seconds * 1000:>9.1f} ms')
+
+        search, _ = admin.site._registry[SilkProduct].get_search_results(None, SilkProduct.objects.all(), 'Katan')
+        print('name search plan:', search.order_by('-created_at', '-id').explain())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Set-based availability/price updates versus saving rows one by one."""
+import argparse
+import time
+from decimal import Decimal
+
+from common import test_database
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from silk_products.bulk import reprice, set_availability
+from silk_products.models import SilkProduct, UserProfile
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--saves', type=int, default=2000, help='Rows to time with per-row save().')
+    args = parser.parse_args()
+
+    with test_database():
+        seller = User.objects.create_user(username='seller')
+        UserProfile.objects.create(user=seller, role='seller')
+        SilkProduct.objects.bulk_create(
+            [SilkProduct(name=f'Saree {i}', type='saree', price=1000, owner=seller) for i in range(args.rows)],
+            batch_size=5000,
+        )
+        queryset = SilkProduct.objects.filter(owner=seller)
+
+        for label, func in [
+            ('set_availability(False)', lambda: set_availability(queryset, False, user=seller)),
+            ('reprice(percent=5)', lambda: reprice(queryset, percent=Decimal(5), user=seller)),
+        ]:
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                updated = func()
+                elapsed = time.perf_counter() - start
+            statements = sum(1 for q in queries if q['sql'].startswith('UPDATE "silk_products_silkproduct"'))
+            print(f'{label:<26} {updated} rows, {statements} UPDATE statement(s), {elapsed:.2f} s')
+
+        start = time.perf_counter()
+        for product in queryset[:args.saves]:
+            product.availability = True
+            product.save()
+        per_row = (time.perf_counter() - start) / args.saves
+        print(f'per-row save()             {per_row * 1000:.2f} ms/row, ~{per_row * args.rows:.1f} s for {args.rows} rows')
+
+
+if __name__ == '__main__':
+    main()
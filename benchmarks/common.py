@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'silk_catalog.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """Run the benchmark body against a throwaway test database."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def timeit(func, repeat=1000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(label, seconds):
+    print(f'{label:<48} {seconds * 1e6:>10.1f} us')
@@ -0,0 +1,49 @@
+"""Converting a page of prices: a rate lookup per price (what a template filter does) vs one batched pass."""
+import argparse
+import random
+from decimal import ROUND_HALF_UP, Decimal
+
+from common import report, test_database, timeit
+
+from django.core.management import call_command
+from django.db import connection
+
+from silk_products.currency import convert_prices, rate_table
+from silk_products.log import QueryCounter
+from silk_products.models import ExchangeRate
+
+
+def per_price(prices, code):
+    amounts = []
+    for price in prices:
+        rate = ExchangeRate.objects.values_list('rate', flat=True).get(currency=code)
+        amounts.append((price * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+    return amounts
+
+
+def per_price_cached(prices, code):
+    return [(price * rate_table.rate(code)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) for price in prices]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--prices', type=int, default=200, help='Prices per page.')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    prices = [Decimal(random.randint(100, 2000000)) / 100 for _ in range(args.prices)]
+    with test_database():
+        call_command('load_exchange_rates', '--rate=BDT=117.125', '--rate=INR=83.4')
+        assert per_price(prices, 'BDT') == convert_prices(prices, 'BDT')[1]
+        print(f'{args.prices} prices per page')
+        for label, func in (('query per price', per_price), ('cached rate per price', per_price_cached),
+                            ('batched convert_prices', lambda p, c: convert_prices(p, c))):
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                func(prices, 'BDT')
+            report(f'{label} ({queries.count} queries)', timeit(lambda: func(prices, 'BDT'), repeat=args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Upload-to-available latency for product photos: inline resizing vs the thumbnail process pool."""
+import argparse
+import io
+import statistics
+import tempfile
+import time
+
+from common import test_database
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import override_settings
+from PIL import Image
+
+from silk_products.images import get_executor
+from silk_products.models import SilkProduct
+
+
+def photo(size, seed):
+    image = Image.effect_noise(size, 40 + seed % 20).convert('RGB')
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=90)
+    return out.getvalue()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run(owner, photos, mode):
+    request_times, ready_times = [], {}
+    started = {}
+    with override_settings(IMAGE_PROCESSING=mode):
+        for i, data in enumerate(photos):
+            start = time.perf_counter()
+            product = SilkProduct.objects.create(
+                name=f'{mode} {i}', type='saree', price=1000, owner=owner,
+                image=SimpleUploadedFile(f'{i}.jpg', data, content_type='image/jpeg'),
+            )
+            elapsed = time.perf_counter() - start
+            request_times.append(elapsed)
+            if mode == 'sync':
+                ready_times[product.pk] = elapsed
+            else:
+                started[product.pk] = start
+
+        pending = set(started)
+        while pending:
+            done = SilkProduct.objects.filter(pk__in=pending).exclude(thumbnail='').values_list('pk', flat=True)
+            now = time.perf_counter()
+            for pk in done:
+                ready_times[pk] = now - started[pk]
+                pending.discard(pk)
+            time.sleep(0.005)
+
+    ready = list(ready_times.values())
+    print(f'{mode:<8} upload request p50 {statistics.median(request_times) * 1000:>8.1f} ms '
+          f'p95 {percentile(request_times, 0.95) * 1000:>8.1f} ms | '
+          f'available p50 {statistics.median(ready) * 1000:>8.1f} ms p95 {percentile(ready, 0.95) * 1000:>8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--uploads', type=int, default=20, help='Uploaded back to back, so pool results include queueing.')
+    parser.add_argument('--width', type=int, default=3000)
+    parser.add_argument('--height', type=int, default=2000)
+    args = parser.parse_args()
+
+    photos = [photo((args.width, args.height), i) for i in range(args.uploads)]
+    print(f'{args.uploads} uploads of {args.width}x{args.height} JPEG (~{len(photos[0]) // 1024} KiB)')
+    with test_database(), tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+        owner = User.objects.create_user(username='seller')
+        # Start the pool up front so the first upload doesn't pay for spawning workers.
+        get_executor().submit(int).result()
+        run(owner, photos, 'sync')
+        run(owner, photos, 'process')
+
+
+if __name__ == '__main__':
+    main()
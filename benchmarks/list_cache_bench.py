@@ -0,0 +1,57 @@
+"""Product list API latency for repeated filter combinations with and without the id-list cache."""
+import argparse
+import random
+
+from common import report, test_database, timeit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from silk_products.listcache import product_list_cache
+from silk_products.models import SilkProduct
+
+TYPES = [value for value, _ in SilkProduct.TYPE_CHOICES]
+WORDS = ['red', 'blue', 'golden', 'jamdani', 'katan', 'muslin', 'silk', 'cotton']
+QUERIES = [
+    {'type': 'saree'},
+    {'type': 'saree', 'available': 'true'},
+    {'search': 'silk'},
+    {'search': 'golden', 'type': 'scarf'},
+    {'available': 'true', 'page': 3},
+]
+
+UNTHROTTLED = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with test_database():
+        owner = User.objects.create_user(username='seller')
+        SilkProduct.objects.bulk_create([
+            SilkProduct(name=f'{random.choice(WORDS).title()} {random.choice(WORDS)} {i}', type=random.choice(TYPES),
+                        price=random.randint(500, 20000), availability=random.random() < 0.8, owner=owner)
+            for i in range(args.rows)
+        ], batch_size=2000)
+        client = APIClient()
+        client.force_authenticate(owner)
+
+        print(f'{args.rows} products')
+        for size, label in ((0, 'no cache'), (256, 'id-list cache')):
+            product_list_cache.clear()
+            product_list_cache.reset_stats()
+            with override_settings(PRODUCT_LIST_CACHE_SIZE=size, REST_FRAMEWORK=UNTHROTTLED):
+                for params in QUERIES:
+                    seconds = timeit(lambda: client.get('/api/products/', params), repeat=args.repeat)
+                    report(f'{label}: {params}', seconds)
+            print(f'  {product_list_cache.stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Memory and latency of list queries with and without the stored summary column."""
+import argparse
+import time
+import tracemalloc
+
+from common import test_database
+
+from django.contrib.auth.models import User
+from django.template.loader import render_to_string
+from django.utils.text import Truncator
+
+from silk_products.models import SilkProduct
+
+PARAGRAPH = 'Handwoven Rajshahi silk with a traditional border and rich pallu. '
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<44} {elapsed * 1000:>9.1f} ms {peak / 2 ** 20:>9.1f} MiB peak')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--description-words', type=int, default=400)
+    parser.add_argument('--page', type=int, default=500, help='Rows rendered through the list template.')
+    args = parser.parse_args()
+
+    description = (PARAGRAPH * (args.description_words // 10 + 1))
+    summary = SilkProduct.summarize(description)
+    with test_database():
+        owner = User.objects.create_user(username='seller')
+        SilkProduct.objects.bulk_create([
+            SilkProduct(name=f'Saree {i}', type='saree', price=1000, owner=owner,
+                        description=description, summary=summary, type_label='Saree')
+            for i in range(args.rows)
+        ], batch_size=2000)
+        print(f'{args.rows} rows, description {len(description)} chars')
+
+        full = SilkProduct.objects.select_related('owner')
+        lean = SilkProduct.objects.select_related('owner').defer(*SilkProduct.LIST_DEFERRED_FIELDS)
+        measure('fetch all rows, full description', lambda: len(list(full.all())))
+        measure('fetch all rows, description deferred', lambda: len(list(lean.all())))
+
+        def render_old():
+            products = list(full[:args.page])
+            return [Truncator(p.description).words(15, truncate=' …') + p.get_type_display() for p in products]
+
+        measure(f'first {args.page}: description + truncatewords', render_old)
+        measure(f'first {args.page}: stored summary', lambda: [p.summary + p.type_label for p in list(lean[:args.page])])
+        measure(f'render product_list.html ({args.page} rows)', lambda: render_to_string(
+            'silk_products/product_list.html', {'products': lean[:args.page]}))
+
+
+if __name__ == '__main__':
+    main()
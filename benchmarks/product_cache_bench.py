@@ -0,0 +1,52 @@
+"""Fetching a cart of products: N detail calls vs one `?ids=` batch call, with a cold and a warm product cache."""
+import argparse
+import random
+
+from common import report, test_database, timeit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from silk_products.models import SilkProduct
+
+UNTHROTTLED = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--cart', type=int, default=20, help='Products per cart.')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with test_database(), override_settings(REST_FRAMEWORK=UNTHROTTLED):
+        owner = User.objects.create_user(username='seller')
+        SilkProduct.objects.bulk_create([
+            SilkProduct(name=f'Saree {i}', type='saree', price=1000 + i, owner=owner, description='Handwoven ' * 50)
+            for i in range(args.rows)
+        ], batch_size=2000)
+        pks = list(SilkProduct.objects.values_list('pk', flat=True))
+        cart = random.sample(pks, args.cart)
+        client = APIClient()
+        client.force_authenticate(owner)
+
+        def detail_calls():
+            for pk in cart:
+                client.get(f'/api/products/{pk}/')
+
+        def batch_call():
+            client.get('/api/products/', {'ids': ','.join(map(str, cart))})
+
+        print(f'{args.rows} products, cart of {args.cart}')
+        for label, func in ((f'{args.cart} detail calls', detail_calls), ('one ?ids= call', batch_call)):
+            report(f'{label}, cold cache', timeit(lambda: (cache.clear(), func()), repeat=args.repeat))
+            func()
+            report(f'{label}, warm cache', timeit(func, repeat=args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Cost of the sampling profiler middleware: per-call overhead around a no-op
+view when unsampled and when sampled, and product detail latency end to end.
+"""
+import argparse
+import tempfile
+
+from common import report, test_database, timeit
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from silk_products.models import SilkProduct
+from silk_products.profiling import SamplingProfilerMiddleware
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    with test_database(), tempfile.TemporaryDirectory() as profiles:
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        response = HttpResponse()
+        middleware = SamplingProfilerMiddleware(lambda request: response)
+        report('no-op view, bare', timeit(lambda: middleware.get_response(request), repeat=args.repeat))
+        for rate in (0, 1):
+            with override_settings(PROFILE_SAMPLE_RATE=rate, PROFILE_DIR=profiles):
+                report(f'no-op view, profiler rate {rate}', timeit(lambda: middleware(request), repeat=args.repeat))
+
+        owner = User.objects.create_user(username='seller')
+        product = SilkProduct.objects.create(name='Saree', type='saree', price=1000, owner=owner)
+        url = reverse('product_detail', args=[product.pk])
+        client = Client()
+        for rate in (0, 1):
+            with override_settings(PROFILE_SAMPLE_RATE=rate, PROFILE_DIR=profiles):
+                client.get(url)
+                report(f'product detail, profiler rate {rate}', timeit(lambda: client.get(url), repeat=args.repeat // 4))
+
+
+if __name__ == '__main__':
+    main()
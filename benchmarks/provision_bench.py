@@ -0,0 +1,48 @@
+"""
+Provisioning N seller accounts: one create_user() + profile insert per row
+(what the registration views do) vs provision_users with inline hashing and
+with a hashing process pool.
+"""
+import argparse
+import os
+import time
+
+from common import test_database
+
+from django.contrib.auth.models import User
+
+from silk_products.models import UserProfile
+from silk_products.provisioning import provision_users
+
+PASSWORD = 'Weave-Rajshahi-24'
+
+
+def rows(prefix, count):
+    return [(n, {'username': f'{prefix}{n}', 'email': f'{prefix}{n}@example.com', 'password': PASSWORD})
+            for n in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with test_database():
+        start = time.perf_counter()
+        for _, row in rows('single', args.users):
+            user = User.objects.create_user(row['username'], row['email'], row['password'])
+            UserProfile.objects.create(user=user, role='seller')
+        elapsed = time.perf_counter() - start
+        print(f'{"create_user per row":<32} {args.users / elapsed:>8.1f} users/s')
+
+        for label, workers in (('provision_users, inline hash', 0),
+                               (f'provision_users, {args.workers} workers', args.workers)):
+            result = provision_users(rows(f'w{workers}-', args.users), workers=workers)
+            assert result.created == args.users, result.errors
+            timings = ', '.join(f'{step} {seconds:.2f}s' for step, seconds in result.timings.items())
+            print(f'{label:<32} {result.created / result.elapsed:>8.1f} users/s ({timings})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Analytics query latency against rollups at growing catalog sizes, and incremental refresh cost."""
+import argparse
+import random
+from datetime import timedelta
+
+from common import report, test_database, timeit
+
+from django.contrib.auth.models import User
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from silk_products.models import DailyRollup, SilkProduct
+from silk_products.rollups import refresh_rollups, series
+
+TYPES = [value for value, _ in SilkProduct.TYPE_CHOICES]
+
+
+def add_products(owners, count):
+    SilkProduct.objects.bulk_create([
+        SilkProduct(name=f'Product {i}', type=random.choice(TYPES), price=random.randint(500, 20000),
+                    availability=random.random() < 0.8, owner=random.choice(owners))
+        for i in range(count)
+    ], batch_size=2000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 300000])
+    parser.add_argument('--sellers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--touched', type=int, default=50, help='Products changed between incremental refreshes.')
+    args = parser.parse_args()
+
+    random.seed(0)
+    with test_database():
+        owners = User.objects.bulk_create([User(username=f'seller{i}') for i in range(args.sellers)])
+        total = 0
+        for size in args.sizes:
+            add_products(owners, size - total)
+            total = size
+            today = timezone.now()
+            refresh_rollups(full=True, now=today)
+            # Copy today's snapshot back over --days so every key has a full history.
+            snapshot = list(DailyRollup.objects.filter(date=timezone.localdate(today)))
+            DailyRollup.objects.exclude(date=timezone.localdate(today)).delete()
+            DailyRollup.objects.bulk_create([
+                DailyRollup(date=row.date - timedelta(days=day), dimension=row.dimension, key=row.key,
+                            listing_count=row.listing_count, available_count=row.available_count,
+                            price_total=row.price_total)
+                for day in range(1, args.days) for row in snapshot
+            ], batch_size=2000)
+
+            start = timezone.localdate(today) - timedelta(days=30)
+            print(f'--- {size} products, {args.sellers} sellers')
+            report('rollup series: type, 30 days', timeit(lambda: series('type', start=start), repeat=50))
+            report('rollup series: one seller, 30 days',
+                   timeit(lambda: series('seller', keys=[owners[0].pk], start=start), repeat=50))
+            report('live aggregate per type (no rollups)', timeit(lambda: list(
+                SilkProduct.objects.order_by().values('type').annotate(
+                    n=Count('id'), avail=Count('id', filter=Q(availability=True)), avg=Avg('price'))
+            ), repeat=5))
+
+            ids = list(SilkProduct.objects.order_by('?').values_list('pk', flat=True)[:args.touched])
+            SilkProduct.objects.filter(pk__in=ids).update(availability=False, updated_at=timezone.now())
+            report(f'incremental refresh ({args.touched} touched)', timeit(refresh_rollups, repeat=1))
+            report('full refresh', timeit(lambda: refresh_rollups(full=True), repeat=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Requests/sec for the create-product-then-redirect-to-list flow under each session/message setup."""
+import argparse
+import time
+
+from common import test_database
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from silk_products.models import SilkProduct, UserProfile
+
+CONFIGS = [
+    ('db sessions + session messages', 'django.contrib.sessions.backends.db',
+     'django.contrib.messages.storage.session.SessionStorage'),
+    ('cached_db sessions + cookie messages', 'django.contrib.sessions.backends.cached_db',
+     'django.contrib.messages.storage.cookie.CookieStorage'),
+    ('cache sessions + cookie messages', 'django.contrib.sessions.backends.cache',
+     'django.contrib.messages.storage.cookie.CookieStorage'),
+]
+
+
+def run_flow(client, requests):
+    create_url = reverse('product_create')
+    for i in range(requests // 2):
+        response = client.post(create_url, {
+            'name': f'Saree {i}', 'type': 'saree', 'price': '1500.00',
+            'description': 'Handwoven silk', 'availability': 'on',
+        })
+        assert response.status_code == 302, response.status_code
+        response = client.get(response['Location'])
+        assert b'Product created successfully' in response.content
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=400, help='Requests per run (half POST, half GET).')
+    args = parser.parse_args()
+
+    with test_database():
+        seller = User.objects.create_user(username='seller', password='benchpass123')
+        UserProfile.objects.create(user=seller, role='seller')
+        for label, engine, storage in CONFIGS:
+            # The list page is unpaginated, so start every configuration from an empty catalog.
+            SilkProduct.objects.all().delete()
+            with override_settings(SESSION_ENGINE=engine, MESSAGE_STORAGE=storage):
+                client = Client()
+                client.login(username='seller', password='benchpass123')
+                run_flow(client, 20)
+                with CaptureQueriesContext(connection) as queries:
+                    run_flow(client, 20)
+                session_queries = sum('django_session' in q['sql'] for q in queries.captured_queries)
+
+                start = time.perf_counter()
+                run_flow(client, args.requests)
+                elapsed = time.perf_counter() - start
+            print(f'{label:<40} {args.requests / elapsed:>8.1f} req/s '
+                  f'{session_queries / 20:>5.1f} session queries/request')
+
+
+if __name__ == '__main__':
+    main()
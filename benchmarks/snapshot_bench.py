@@ -0,0 +1,49 @@
+"""Static snapshot: full rebuild inline vs in a process pool, and incremental runs after a few edits."""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import test_database
+
+from django.contrib.auth.models import User
+
+from silk_products.models import SilkProduct, UserProfile
+from silk_products.snapshot import build_snapshot
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {elapsed:>8.2f} s  ({result.rendered} rendered, {result.removed} removed)')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--changed', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with test_database(), tempfile.TemporaryDirectory() as directory:
+        owner = User.objects.create_user(username='seller')
+        UserProfile.objects.create(user=owner, role='seller')
+        SilkProduct.objects.bulk_create([
+            SilkProduct(name=f'Saree {i}', type='saree', price=1000, owner=owner, description='Handwoven silk. ' * 20)
+            for i in range(args.products)
+        ], batch_size=2000)
+
+        timed('full rebuild, this process', lambda: build_snapshot(directory, full=True, workers=0))
+        timed(f'full rebuild, {args.workers} worker(s)', lambda: build_snapshot(directory, full=True, workers=args.workers))
+        timed('incremental, nothing changed', lambda: build_snapshot(directory))
+        for product in SilkProduct.objects.order_by('?')[:args.changed]:
+            product.price += 1
+            product.save()
+        timed(f'incremental, {args.changed} changed', lambda: build_snapshot(directory))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Payload size and latency of the product list and batch APIs with and without `?fields=`."""
+import argparse
+
+from common import report, test_database, timeit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from silk_products.models import SilkProduct
+
+UNTHROTTLED = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
+MOBILE_FIELDS = 'id,name,price,availability'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    with test_database(), override_settings(REST_FRAMEWORK=UNTHROTTLED):
+        owner = User.objects.create_user(username='seller')
+        SilkProduct.objects.bulk_create([
+            SilkProduct(name=f'Saree {i}', type='saree', price=1000 + i, owner=owner,
+                        description='Handwoven Rajshahi silk with a golden border. ' * 40,
+                        summary='Handwoven Rajshahi silk with a golden border.')
+            for i in range(args.rows)
+        ], batch_size=2000)
+        ids = ','.join(map(str, SilkProduct.objects.values_list('pk', flat=True)[:20]))
+        client = APIClient()
+        client.force_authenticate(owner)
+
+        print(f'{args.rows} products, 20 per page')
+        for label, params in (
+            ('list', {}),
+            ('list ?fields', {'fields': MOBILE_FIELDS}),
+            ('batch ?ids', {'ids': ids}),
+            ('batch ?ids&fields', {'ids': ids, 'fields': MOBILE_FIELDS}),
+        ):
+            size = len(client.get('/api/products/', params).content)
+            seconds = timeit(lambda: client.get('/api/products/', params), repeat=args.repeat)
+            report(f'{label} ({size / 1024:.1f} KiB)', seconds)
+
+
+if __name__ == '__main__':
+    main()
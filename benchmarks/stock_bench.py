@@ -0,0 +1,82 @@
+"""
+Reservations/sec on one hot product under thread contention, and oversell:
+conditional UPDATE vs read-modify-write. SQLite serialises writers with table
+locks, so the read-modify-write variant only oversells on databases that let
+transactions read concurrently (e.g. PostgreSQL under READ COMMITTED).
+"""
+import argparse
+import threading
+import time
+
+from common import test_database
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from silk_products.models import SilkProduct, StockHold
+from silk_products.stock import OutOfStock, reserve
+
+
+def naive_reserve(product_id, buyer, quantity=1):
+    with transaction.atomic():
+        stock = SilkProduct.objects.values_list('stock', flat=True).get(pk=product_id)
+        if stock < quantity:
+            raise OutOfStock
+        SilkProduct.objects.filter(pk=product_id).update(stock=stock - quantity)
+        return StockHold.objects.create(product_id=product_id, buyer=buyer, quantity=quantity,
+                                        expires_at=timezone.now())
+
+
+def run(label, func, product, buyer, threads, attempts):
+    held = [0] * threads
+    retries = [0] * threads
+
+    def worker(n):
+        try:
+            for _ in range(attempts):
+                while True:
+                    try:
+                        func(product.pk, buyer)
+                        held[n] += 1
+                    except OutOfStock:
+                        pass
+                    except OperationalError:
+                        retries[n] += 1
+                        time.sleep(0.0005)
+                        continue
+                    break
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stock = SilkProduct.objects.values_list('stock', flat=True).get(pk=product.pk)
+    oversold = sum(held) - product.stock
+    print(f'{label:<26} {threads * attempts / elapsed:>9.0f} attempts/s {sum(held) / elapsed:>8.0f} holds/s '
+          f'held {sum(held):>5} of {product.stock} stock, left {stock}, oversold {max(oversold, 0)}, '
+          f'lock retries {sum(retries)}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=100, help='Reservation attempts per thread.')
+    parser.add_argument('--stock', type=int, default=400)
+    args = parser.parse_args()
+
+    with test_database():
+        seller = User.objects.create_user(username='seller')
+        buyer = User.objects.create_user(username='buyer')
+        for label, func in (('conditional UPDATE', reserve), ('read-modify-write', naive_reserve)):
+            product = SilkProduct.objects.create(name=label, type='saree', price=1000, owner=seller, stock=args.stock)
+            run(label, func, product, buyer, args.threads, args.attempts)
+
+
+if __name__ == '__main__':
+    main()
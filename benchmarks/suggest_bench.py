@@ -0,0 +1,31 @@
+"""Measure typeahead lookups against an in-memory prefix index."""
+import random
+import time
+
+from common import report, timeit
+
+from silk_products.suggest import PrefixIndex
+
+WORDS = ['rajshahi', 'silk', 'saree', 'katan', 'muslin', 'tussar', 'jamdani', 'handloom',
+         'printed', 'royal', 'blue', 'red', 'golden', 'bridal', 'cotton', 'murshidabad']
+TYPES = ['saree', 'fabric', 'scarf', 'shawl']
+
+
+def main(products=100000):
+    rng = random.Random(42)
+    rows = [
+        (pk, ' '.join(rng.choices(WORDS, k=3)) + f' {pk}', rng.choice(TYPES))
+        for pk in range(1, products + 1)
+    ]
+    index = PrefixIndex()
+    start = time.perf_counter()
+    index.rebuild(rows, version=None)
+    print(f'rebuild of {products} products: {time.perf_counter() - start:.2f} s')
+
+    for prefix in ['r', 'si', 'tus', 'rajshahi silk', 'bridal golden sa']:
+        report(f'suggest({prefix!r}, 10)', timeit(lambda: index.suggest(prefix, 10), 2000))
+    report('add_product', timeit(lambda: index.add_product(products + 1, 'Royal Silk Saree', 'saree'), 2000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""Measure cache round trips and latency of one throttle check."""
+from common import report, timeit
+
+from django.core.cache import cache
+
+from silk_products.testing import CountingCache
+from silk_products.throttling import TokenBucket
+
+
+def main(checks=10000):
+    cache.clear()
+    counting = CountingCache(cache)
+    bucket = TokenBucket(checks * 2, 3600, cache=counting)
+    bucket.consume('bench')
+    counting.calls = 0
+    for _ in range(checks):
+        bucket.consume('bench')
+    print(f'cache round trips per check: {counting.calls / checks:.2f}')
+
+    bucket = TokenBucket(10 ** 9, 3600)
+    report('TokenBucket.consume (locmem)', timeit(lambda: bucket.consume('bench'), checks))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Trending page cost: scoring every product per request vs reading the indexed trending_score column."""
+import argparse
+import math
+import random
+from datetime import timedelta
+
+from common import report, test_database, timeit
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.utils import timezone
+
+from silk_products.models import ProductViewCount, SilkProduct
+from silk_products.trending import decay_rate, refresh_trending
+from silk_products.viewcounts import add_counts, add_views
+
+
+def score_per_request(limit=20):
+    # What a trending sort costs without a stored score: load every counter and rank in Python.
+    now = timezone.now()
+    rate = decay_rate()
+    rows = ProductViewCount.objects.values_list('product_id', 'views', 'contacts', 'updated_at')
+    scores = sorted(
+        ((views + 10 * contacts) * math.exp(-rate * (now - updated_at).total_seconds()), pk)
+        for pk, views, contacts, updated_at in rows
+    )
+    pks = [pk for _, pk in scores[-limit:]][::-1]
+    return list(SilkProduct.objects.in_bulk(pks).values())
+
+
+def indexed(limit=20):
+    return list(SilkProduct.objects.order_by(*SilkProduct.SORT_ORDERS['trending'])[:limit])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--touched', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with test_database():
+        owner = User.objects.create_user(username='seller')
+        SilkProduct.objects.bulk_create([
+            SilkProduct(name=f'Saree {i}', type='saree', price=1000, owner=owner) for i in range(args.products)
+        ], batch_size=2000)
+        pks = list(SilkProduct.objects.values_list('pk', flat=True))
+        add_views({pk: random.randint(1, 500) for pk in pks})
+        add_counts({pk: random.randint(1, 5) for pk in random.sample(pks, len(pks) // 10)}, 'contacts')
+        ProductViewCount.objects.update(updated_at=F('updated_at') - timedelta(days=1))
+
+        report('full refresh_trending', timeit(lambda: refresh_trending(full=True), repeat=1))
+        add_views({pk: 1 for pk in random.sample(pks, args.touched)})
+        report(f'incremental refresh, {args.touched} touched', timeit(refresh_trending, repeat=1))
+
+        report('top 20, scored per request', timeit(score_per_request, repeat=args.repeat))
+        report('top 20, trending_score index', timeit(indexed, repeat=args.repeat))
+        print(SilkProduct.objects.order_by(*SilkProduct.SORT_ORDERS['trending'])[:20].explain())
+
+
+if __name__ == '__main__':
+    main()
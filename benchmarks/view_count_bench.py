@@ -0,0 +1,58 @@
+"""Cost per product view: an UPDATE per hit vs buffering in memory and flushing with one batched upsert."""
+import argparse
+import random
+import time
+
+from common import test_database
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.test.utils import override_settings
+
+from silk_products.models import ProductViewCount, SilkProduct
+from silk_products.viewcounts import view_buffer
+
+
+def write_per_hit(product_id):
+    updated = ProductViewCount.objects.filter(product_id=product_id).update(views=F('views') + 1)
+    if not updated:
+        ProductViewCount.objects.create(product_id=product_id, views=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--views', type=int, default=20000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with test_database():
+        owner = User.objects.create_user(username='seller')
+        SilkProduct.objects.bulk_create([
+            SilkProduct(name=f'Saree {i}', type='saree', price=1000, owner=owner) for i in range(args.products)
+        ], batch_size=2000)
+        pks = list(SilkProduct.objects.values_list('pk', flat=True))
+        # Popular listings get most of the traffic.
+        hits = random.choices(pks, weights=[1 / (rank + 1) for rank in range(len(pks))], k=args.views)
+
+        start = time.perf_counter()
+        for pk in hits:
+            write_per_hit(pk)
+        per_hit = time.perf_counter() - start
+        ProductViewCount.objects.all().delete()
+
+        with override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600, VIEW_COUNT_FLUSH_HITS=1000):
+            start = time.perf_counter()
+            for pk in hits:
+                view_buffer.record(pk)
+            view_buffer.flush()
+            buffered = time.perf_counter() - start
+        assert sum(ProductViewCount.objects.values_list('views', flat=True)) == args.views
+
+        print(f'{args.views} views over {args.products} products')
+        print(f'{"UPDATE per hit":<32} {per_hit / args.views * 1e6:>8.1f} us/view')
+        print(f'{"buffered, flush every 1000":<32} {buffered / args.views * 1e6:>8.1f} us/view')
+
+
+if __name__ == '__main__':
+    main()
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'silk_catalog.settings')
 
 application = get_asgi_application()
+
+from silk_products.viewcounts import flush_in_background, flush_on_exit  # noqa: E402
+from silk_products.warmup import warm_up_on_startup  # noqa: E402
+
+warm_up_on_startup()
+flush_on_exit()
+flush_in_background()
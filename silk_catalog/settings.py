@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -22,6 +23,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'silk_products.log.RequestLogMiddleware',
+    'silk_products.profiling.SamplingProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,6 +47,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'silk_products.currency.currency_context',
             ],
         },
     },
@@ -55,6 +59,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -81,12 +87,182 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+# Internal nginx location that maps to MEDIA_ROOT (e.g. /protected-media/). When
+# set, image variants are sent by nginx through X-Accel-Redirect instead of by Django.
+MEDIA_ACCEL_REDIRECT = os.environ.get('SILK_MEDIA_ACCEL_REDIRECT', '')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# With several workers, set SILK_REDIS_URL (e.g. redis://localhost:6379/0; needs
+# the `redis` package) so every worker shares the caches. Without it they are
+# per-process LocMem caches, which only suit a single worker.
+REDIS_URL = os.environ.get('SILK_REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'silk',
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'silk-sessions',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'silk-catalog',
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'silk-sessions',
+        },
+    }
+
+# Sessions are only cached when the sessions cache is shared: with a per-process
+# cache, logging out in one worker would leave the session cached (and valid) in
+# every other one. cached_db reads from the cache and writes through to the
+# database; SILK_SESSION_ENGINE overrides the choice (`manage.py check --deploy`
+# flags a cached engine on a per-process cache).
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get(
+    'SILK_SESSION_ENGINE', 'cached_db' if REDIS_URL else 'db',
+)
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Flash messages ride in a signed cookie instead of modifying the session.
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
+PRODUCT_CHANGE_RETENTION_DAYS = 365
+
+# The typeahead index is built at warm-up and kept current by this process's
+# own writes; a change made elsewhere is picked up by a rebuild in a background
+# thread ('background') or inline in the request ('sync', used by the tests).
+SUGGEST_VERSION_CHECK_INTERVAL = 5
+SUGGEST_REBUILD = 'background'
+
+# Per-process caches compare their version (stored in the database, so writes
+# from any worker or management command count) at most this often, in seconds.
+SHARED_VERSION_CHECK_INTERVAL = 5
+
+# refresh_rollups re-reads changes this far back from its last run, so rows
+# committed late by long transactions aren't skipped.
+ROLLUP_WATERMARK_LAG_MINUTES = 10
+
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+ARCHIVE_UNAVAILABLE_AFTER_DAYS = 180
+
+# Prices are stored in BASE_CURRENCY and shown in the visitor's choice of
+# CURRENCIES (symbol, decimal places), converted with the rates loaded by
+# `manage.py load_exchange_rates`.
+BASE_CURRENCY = 'USD'
+DEFAULT_CURRENCY = 'USD'
+CURRENCIES = {
+    'USD': ('$', 2),
+    'BDT': ('৳', 2),
+    'INR': ('₹', 2),
+}
+
+# How long reserved stock stays held before release_expired_holds returns it.
+STOCK_HOLD_MINUTES = 15
+
+# Product photos are resized into these bounding boxes by a process pool
+# ('process') or inline during the request ('sync', used by the tests).
+IMAGE_VARIANTS = {
+    'thumb': (240, 240),
+    'medium': (640, 640),
+    'large': (1280, 1280),
+}
+IMAGE_PROCESSING = os.environ.get('SILK_IMAGE_PROCESSING', 'process')
+IMAGE_WORKERS = 2
+
+# Per-process LRU of ordered product ids per API list filter combination.
+# Lists longer than PRODUCT_LIST_CACHE_MAX_IDS are not cached; size 0 disables it.
+# Entries are dropped after PRODUCT_LIST_CACHE_MAX_AGE seconds, which bounds how
+# long a write that skips the signals (raw SQL, another app) goes unseen.
+PRODUCT_LIST_CACHE_SIZE = 256
+PRODUCT_LIST_CACHE_MAX_IDS = 20000
+PRODUCT_LIST_CACHE_MAX_AGE = 60
+
+# Cache-aside copies of individual products (with owner) for the detail views
+# and the `?ids=` batch API; dropped on save, delete, bulk edits and stock changes.
+# Only a shared cache drops them in every worker: on the per-process LocMem cache
+# the other workers keep serving their copy until it expires, so it expires soon.
+PRODUCT_CACHE_TIMEOUT = 300 if REDIS_URL else 10
+PRODUCT_BATCH_MAX_IDS = 100
+
+# Product views are counted in memory per worker and upserted into
+# ProductViewCount every interval or after this many hits, whichever comes first.
+VIEW_COUNT_FLUSH_INTERVAL = 30
+VIEW_COUNT_FLUSH_HITS = 1000
+
+# `?sort=trending` orders by a time-decayed score of views, seller contacts and
+# recency, refreshed by `manage.py refresh_trending`. Activity loses half its
+# weight every TRENDING_HALF_LIFE_HOURS.
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_WEIGHTS = {'view': 1, 'contact': 10, 'new': 5}
+# Each run re-reads activity this far back from the last one (see refresh_trending).
+TRENDING_WATERMARK_LAG_MINUTES = 10
+
+# Server-Sent Events feed: the bus fans events out to every worker's broadcaster.
+# RedisBus reaches every worker; InMemoryBus only streams in the same process.
+PRODUCT_EVENT_BUS = 'silk_products.events.RedisBus' if REDIS_URL else 'silk_products.events.InMemoryBus'
+PRODUCT_EVENT_BUFFER = 1000
+PRODUCT_EVENT_HEARTBEAT = 15
+PRODUCT_EVENT_RETRY_MS = 3000
+
+# wsgi.py/asgi.py preload URLs, templates, imports and DB connections before serving.
+WARMUP_ON_STARTUP = os.environ.get('SILK_WARMUP', '1') != '0'
+# Budget for `manage.py profile_startup`: process start to first response.
+STARTUP_TARGET_MS = 1500
+
+# Sampling profiler: this share of requests (plus any with a signed X-Silk-Profile
+# header, see `profile_summary --token`) have their stack sampled every
+# PROFILE_INTERVAL_MS and saved as collapsed stacks under PROFILE_DIR/<url name>/.
+PROFILE_SAMPLE_RATE = float(os.environ.get('SILK_PROFILE_RATE', '0'))
+PROFILE_INTERVAL_MS = 5
+PROFILE_TOKEN_MAX_AGE = 3600
+PROFILE_DIR = BASE_DIR / 'profiles'
+# Newest profiles kept per URL name; older ones are deleted as new ones are written.
+PROFILE_MAX_FILES = 200
+
+# `manage.py build_snapshot` renders the public catalog here as <url>/index.html
+# for the web server to serve to anonymous visitors (see README).
+SNAPSHOT_DIR = Path(os.environ.get('SILK_SNAPSHOT_DIR', BASE_DIR / 'snapshot'))
+
+# JSON logs go through a bounded in-memory queue to a background writer thread,
+# so a slow disk never blocks a request. Each process (forked workers included)
+# opens the file and starts its writer on its first record. SILK_LOG_FILE=-
+# writes to stdout.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'silk_products.log.JsonFormatter'},
+    },
+    'handlers': {
+        'queue': {
+            '()': 'silk_products.log.QueueingHandler',
+            'filename': os.environ.get('SILK_LOG_FILE', str(BASE_DIR / 'logs' / 'silk.log')),
+            'maxsize': 10000,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'django': {'handlers': ['queue'], 'level': 'WARNING'},
+        'silk_products': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@silkproducts.com'
 
@@ -99,6 +275,15 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'silk_products.throttling.SearchRateThrottle',
+        'silk_products.throttling.BucketRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'search': '60/min',
+        'register': '20/hour',
+        'token': '30/min',
+    },
 }
 
 SIMPLE_JWT = {
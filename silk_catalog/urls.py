@@ -1,11 +1,17 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from django.urls import path, include, re_path
+from rest_framework_simplejwt.views import TokenRefreshView
+from silk_products.api_views import TokenObtainPairView
+from silk_products.views import product_image_variant
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/', include('silk_products.api_urls')),
+    re_path(rf'^{settings.MEDIA_URL.strip("/")}/products/variants/(?P<path>[0-9a-f]{{2}}/[0-9a-f]{{64}}\.jpg)$',
+            product_image_variant, name='product_image_variant'),
     path('', include('silk_products.urls')),
-]
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,5 +1,69 @@
 from django.contrib import admin
-from .models import SilkProduct, UserProfile
+from django.contrib.admin import helpers
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models.functions import Upper
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from .bulk import reprice, set_availability
+from .changelog import record_changes
+from .forms import RepriceForm
+from .archive import restore_products
+from .models import ArchivedSilkProduct, ExchangeRate, ProductChange, SilkProduct, StockHold, UserProfile
+from .pagination import EstimatedCountPaginator
+
+
+class OwnerFilter(admin.SimpleListFilter):
+    """Filter by seller username typed into an autocompleting text box."""
+    title = 'owner'
+    parameter_name = 'owner'
+    template = 'admin/silk_products/owner_filter.html'
+
+    def lookups(self, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            owner_id = User.objects.filter(username=self.value()).values_list('pk', flat=True).first()
+            return queryset.filter(owner_id=owner_id)
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'value': self.value() or '',
+            'params': [(k, v) for k, v in changelist.params.items() if k != self.parameter_name],
+            'clear_url': changelist.get_query_string(remove=[self.parameter_name]),
+            'autocomplete_url': reverse('admin:autocomplete'),
+        }
+
+
+def ascii_upper(text):
+    # SQLite's UPPER() only folds ASCII letters.
+    return ''.join(char.upper() if char.isascii() else char for char in text)
+
+
+class NamePrefixSearchMixin:
+    """
+    Searches for names starting with the whole search term, in a way the name
+    indexes can serve. Admin's own ``^name`` compares UPPER(name) with LIKE,
+    which SQLite never runs on an index; here it becomes a range on
+    UPPER(name), read from the functional index. On PostgreSQL the LIKE is
+    kept and served by the varchar_pattern_ops index (migration 0016), since
+    a range in the database collation isn't a prefix match.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        prefix = search_term.strip()
+        if not prefix:
+            return queryset, False
+        if connections[queryset.db].vendor == 'postgresql':
+            return queryset.filter(name__istartswith=prefix), False
+        low = ascii_upper(prefix)
+        high = low[:-1] + chr(ord(low[-1]) + 1)
+        return queryset.alias(name_upper=Upper('name')).filter(name_upper__gte=low, name_upper__lt=high), False
 
 
 @admin.register(UserProfile)
@@ -10,20 +74,125 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 
 @admin.register(SilkProduct)
-class SilkProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'type', 'price', 'owner', 'availability', 'created_at')
-    list_filter = ('type', 'availability', 'created_at', 'owner')
-    search_fields = ('name', 'type', 'owner__username')
+class SilkProductAdmin(NamePrefixSearchMixin, admin.ModelAdmin):
+    list_display = ('name', 'type', 'price', 'stock', 'owner', 'availability', 'created_at')
+    list_filter = ('type', 'availability', 'created_at', OwnerFilter)
+    list_select_related = ('owner',)
+    search_fields = ('^name',)
     list_editable = ('availability',)
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'updated_at')
+    autocomplete_fields = ('owner',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('mark_available', 'mark_unavailable', 'reprice_products')
     
     fieldsets = (
         ('Product Information', {
-            'fields': ('name', 'type', 'price', 'availability')
+            'fields': ('name', 'type', 'price', 'availability', 'owner', 'description')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('description')
+
+    def confirm_bulk_action(self, request, queryset, action, title, count, form=None):
+        return TemplateResponse(request, 'admin/silk_products/bulk_action_confirm.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': title,
+            'action': action,
+            'count': count,
+            'form': form,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    def bulk_set_availability(self, request, queryset, available, action, title):
+        if 'apply' not in request.POST:
+            count = set_availability(queryset, available, dry_run=True)
+            return self.confirm_bulk_action(request, queryset, action, title, count)
+        updated = set_availability(queryset, available, user=request.user)
+        self.message_user(request, f'{updated} product(s) updated.')
+
+    @admin.action(description='Mark selected products as available')
+    def mark_available(self, request, queryset):
+        return self.bulk_set_availability(request, queryset, True, 'mark_available', 'Mark products as available')
+
+    @admin.action(description='Mark selected products as unavailable')
+    def mark_unavailable(self, request, queryset):
+        return self.bulk_set_availability(request, queryset, False, 'mark_unavailable', 'Mark products as unavailable')
+
+    @admin.action(description='Reprice selected products')
+    def reprice_products(self, request, queryset):
+        submitted = 'apply' in request.POST or 'preview' in request.POST
+        form = RepriceForm(request.POST if submitted else None)
+        if 'apply' in request.POST and form.is_valid():
+            updated = reprice(queryset, user=request.user, **form.reprice_kwargs())
+            self.message_user(request, f'{updated} product(s) repriced.')
+            return None
+        count = queryset.count()
+        return self.confirm_bulk_action(request, queryset, 'reprice_products', 'Reprice products', count, form)
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'POST':
+            return super().changelist_view(request, extra_context)
+        with record_changes(request.user):
+            return super().changelist_view(request, extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        with record_changes(request.user):
+            return super().changeform_view(request, object_id, form_url, extra_context)
+
+
+@admin.register(ProductChange)
+class ProductChangeAdmin(admin.ModelAdmin):
+    list_display = ('product_id', 'field', 'old_value', 'new_value', 'changed_by', 'changed_at')
+    list_filter = ('field',)
+    list_select_related = ('changed_by',)
+    raw_id_fields = ('product', 'owner', 'changed_by')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedSilkProduct)
+class ArchivedSilkProductAdmin(NamePrefixSearchMixin, admin.ModelAdmin):
+    list_display = ('id', 'name', 'type', 'price', 'owner', 'archived_at')
+    list_filter = ('type', 'archived_at')
+    list_select_related = ('owner',)
+    search_fields = ('^name',)
+    raw_id_fields = ('owner',)
+    actions = ('restore_selected',)
+
+    @admin.action(description='Restore selected products to the catalog')
+    def restore_selected(self, request, queryset):
+        restored = restore_products(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'{len(restored)} product(s) restored.')
+
+
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product_id', 'buyer', 'quantity', 'status', 'expires_at')
+    list_filter = ('status',)
+    list_select_related = ('buyer',)
+    raw_id_fields = ('product', 'buyer')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ('currency', 'rate', 'updated_at')
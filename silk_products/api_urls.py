@@ -7,5 +7,14 @@ urlpatterns = [
     path('logout/', api_views.logout_user, name='api_logout'),
     path('products/', api_views.SilkProductListCreateAPIView.as_view(), name='api_product_list_create'),
     path('products/<int:pk>/', api_views.SilkProductRetrieveUpdateDestroyAPIView.as_view(), name='api_product_detail'),
+    path('products/<int:pk>/holds/', api_views.product_reserve, name='api_product_reserve'),
+    path('holds/<int:pk>/', api_views.hold_release, name='api_hold_release'),
+    path('holds/<int:pk>/confirm/', api_views.hold_confirm, name='api_hold_confirm'),
+    path('products/list-cache/', api_views.product_list_cache_stats, name='api_product_list_cache'),
     path('products/stats/', api_views.product_stats, name='api_product_stats'),
+    path('products/bulk-update/', api_views.product_bulk_update, name='api_product_bulk_update'),
+    path('products/events/', api_views.product_events, name='api_product_events'),
+    path('products/suggest/', api_views.product_suggest, name='api_product_suggest'),
+    path('analytics/', api_views.product_analytics, name='api_product_analytics'),
+    path('dashboard/', api_views.SellerDashboardAPIView.as_view(), name='api_seller_dashboard'),
 ]
\ No newline at end of file
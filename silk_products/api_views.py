@@ -1,27 +1,45 @@
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_scope
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt import views as jwt_views
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Q
-from .models import SilkProduct, UserProfile
-from .serializers import UserRegistrationSerializer, UserSerializer, SilkProductSerializer
+from django.db.models.functions import Coalesce
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from functools import partial
+from .models import ArchivedSilkProduct, SilkProduct, StockHold
+from .pagination import KnownCountPaginator
+from .changelog import record_changes
+from .suggest import get_index
+from .rollups import series
+from .events import get_broadcaster, stream
+from .listcache import list_cache_key, normalize_search, product_list_cache
+from .productcache import get_product, get_products
+from .viewcounts import record_view
+from .serializers import (
+    UserRegistrationSerializer, UserSerializer, SilkProductSerializer, BulkProductUpdateSerializer,
+    ArchivedSilkProductSerializer, SilkProductListSerializer, SilkProductDetailSerializer,
+    AnalyticsQuerySerializer, StockHoldSerializer, SellerProductSerializer,
+)
+from .bulk import reprice, set_availability
+from .stock import OutOfStock, confirm, release, reserve
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_scope('register')
 def register_user(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        
-        UserProfile.objects.create(
-            user=user,
-            role=request.data.get('role', 'buyer'),
-            phone=request.data.get('phone', '')
-        )
-        
         refresh = RefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
@@ -56,35 +74,122 @@ def logout_user(request):
         return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SilkProductListCreateAPIView(generics.ListCreateAPIView):
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    throttle_scope = 'token'
+
+
+class SparseColumnsViewMixin:
+    """
+    ``?fields=id,name,price`` on GET: serialize only those fields and, for
+    lists, load only their columns. Names are checked against
+    ``sparse_fields_serializer_class`` (default: the view's serializer).
+    """
+
+    sparse_fields_serializer_class = None
+
+    def sparse_fields(self):
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = None
+            if self.request.method == 'GET':
+                allowed = self.sparse_fields_serializer_class or self.get_serializer_class()
+                self._sparse_fields = allowed.parse_fields(self.request.query_params.get('fields'))
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.sparse_fields()
+        return context
+
+    def prune_columns(self, queryset):
+        fields = self.sparse_fields()
+        if fields is None:
+            return queryset.defer(*SilkProduct.LIST_DEFERRED_FIELDS)
+        return queryset.only(*self.get_serializer_class().columns(fields))
+
+
+class SilkProductListCreateAPIView(SparseColumnsViewMixin, generics.ListCreateAPIView):
     queryset = SilkProduct.objects.all()
     serializer_class = SilkProductSerializer
     permission_classes = [IsAuthenticated]
+    # ``?ids=`` serializes full records, but takes the same ``?fields=`` as the list.
+    sparse_fields_serializer_class = SilkProductListSerializer
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and 'ids' not in self.request.query_params:
+            return SilkProductListSerializer
+        return SilkProductSerializer
 
     def get_queryset(self):
-        queryset = SilkProduct.objects.all()
+        queryset = self.prune_columns(SilkProduct.objects.all())
         search = self.request.query_params.get('search', None)
         product_type = self.request.query_params.get('type', None)
         available_only = self.request.query_params.get('available', None)
 
         if search:
+            search = normalize_search(search)
             queryset = queryset.filter(Q(name__icontains=search) | Q(type__icontains=search))
         if product_type:
             queryset = queryset.filter(type=product_type)
         if available_only and available_only.lower() == 'true':
             queryset = queryset.filter(availability=True)
+        sort = self.request.query_params.get('sort') or 'newest'
+        if sort not in SilkProduct.SORT_ORDERS:
+            raise ValidationError({'sort': f"sort must be one of {', '.join(SilkProduct.SORT_ORDERS)}"})
 
-        return queryset
+        return queryset.order_by(*SilkProduct.SORT_ORDERS[sort])
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.batch(request.query_params['ids'])
+        # Cache the ordered ids per filter combination and hydrate only the requested page.
+        ids = product_list_cache.get_ids(
+            list_cache_key(request.query_params),
+            lambda limit: self.get_queryset().values_list('pk', flat=True)[:limit],
+        )
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+        page_ids = self.paginate_queryset(ids)
+        products = self.prune_columns(SilkProduct.objects.all()).in_bulk(page_ids)
+        serializer = self.get_serializer([products[pk] for pk in page_ids if pk in products], many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def batch(self, ids):
+        """``?ids=1,2,3``: full records in the requested order, resolved through the product cache."""
+        try:
+            pks = list(dict.fromkeys(int(pk) for pk in ids.split(',') if pk.strip()))
+        except ValueError:
+            return Response({'error': 'ids must be a comma-separated list of integers'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        if len(pks) > settings.PRODUCT_BATCH_MAX_IDS:
+            return Response({'error': f'At most {settings.PRODUCT_BATCH_MAX_IDS} ids per request'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        products = get_products(pks)
+        serializer = self.get_serializer([products[pk] for pk in pks if pk in products], many=True)
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in pks if pk not in products],
+        })
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
-class SilkProductRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class SilkProductRetrieveUpdateDestroyAPIView(SparseColumnsViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = SilkProduct.objects.all()
-    serializer_class = SilkProductSerializer
+    serializer_class = SilkProductDetailSerializer
     permission_classes = [IsAuthenticated]
 
+    def retrieve(self, request, *args, **kwargs):
+        product = get_product(kwargs['pk'])
+        if product is None:
+            archived = ArchivedSilkProduct.objects.filter(pk=kwargs['pk']).first()
+            if archived is None:
+                raise Http404
+            return Response(ArchivedSilkProductSerializer(archived).data)
+        self.check_object_permissions(request, product)
+        record_view(product.pk)
+        return Response(self.get_serializer(product).data)
+
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
         if instance.owner != request.user:
@@ -92,6 +197,10 @@ class SilkProductRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIV
                           status=status.HTTP_403_FORBIDDEN)
         return super().update(request, *args, **kwargs)
 
+    def perform_update(self, serializer):
+        with record_changes(self.request.user):
+            serializer.save()
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         if instance.owner != request.user:
@@ -112,4 +221,193 @@ def product_stats(request):
         'available_products': available_products,
         'unavailable_products': total_products - available_products,
         'product_types': product_types,
-    })
\ No newline at end of file
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def product_analytics(request):
+    serializer = AnalyticsQuerySerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    keys = [data['key']] if data.get('key') else None
+    if not request.user.is_staff:
+        if data['dimension'] != 'seller':
+            return Response({'error': 'Only staff can view catalog-wide analytics'},
+                          status=status.HTTP_403_FORBIDDEN)
+        keys = [request.user.pk]
+
+    rows = series(data['dimension'], keys=keys, start=data.get('start'), end=data.get('end'))
+    return Response({
+        'dimension': data['dimension'],
+        'results': [
+            {
+                'date': day,
+                'key': key,
+                'listing_count': row.listing_count,
+                'available_count': row.available_count,
+                'average_price': row.average_price,
+                'availability_ratio': row.availability_ratio,
+            }
+            for day, key, row in rows
+        ],
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def product_bulk_update(request):
+    serializer = BulkProductUpdateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    queryset = SilkProduct.objects.filter(owner=request.user)
+    if data.get('ids'):
+        queryset = queryset.filter(pk__in=data['ids'])
+    if data.get('search'):
+        queryset = queryset.filter(Q(name__icontains=data['search']) | Q(type__icontains=data['search']))
+    if data.get('type'):
+        queryset = queryset.filter(type=data['type'])
+    if data['available'] is not None:
+        queryset = queryset.filter(availability=data['available'])
+
+    if data['set_availability'] is not None:
+        count = set_availability(queryset, data['set_availability'], user=request.user, dry_run=data['dry_run'])
+    else:
+        count = reprice(
+            queryset,
+            percent=data.get('price_percent'),
+            amount=data.get('price_amount'),
+            user=request.user,
+            dry_run=data['dry_run'],
+        )
+    return Response({'matched' if data['dry_run'] else 'updated': count, 'dry_run': data['dry_run']})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def product_list_cache_stats(request):
+    return Response(product_list_cache.stats())
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def product_reserve(request, pk):
+    serializer = StockHoldSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        hold = reserve(pk, request.user, serializer.validated_data['quantity'])
+    except OutOfStock as exc:
+        if not SilkProduct.objects.filter(pk=pk).exists():
+            raise Http404
+        return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+    return Response(StockHoldSerializer(hold).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def hold_release(request, pk):
+    hold = get_object_or_404(StockHold, pk=pk, buyer=request.user)
+    if not release(hold):
+        hold.refresh_from_db(fields=['status'])
+        return Response({'error': f'Hold is already {hold.status}'}, status=status.HTTP_409_CONFLICT)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def hold_confirm(request, pk):
+    hold = get_object_or_404(StockHold, pk=pk, buyer=request.user)
+    if not confirm(hold):
+        hold.refresh_from_db(fields=['status'])
+        return Response({'error': f'Hold is {hold.status} and can no longer be confirmed'},
+                        status=status.HTTP_409_CONFLICT)
+    hold.refresh_from_db()
+    return Response(StockHoldSerializer(hold).data)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_suggest(request):
+    prefix = request.query_params.get('prefix', '')
+    try:
+        limit = min(int(request.query_params.get('limit', 10)), 20)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'prefix': prefix,
+        'suggestions': get_index().suggest(prefix, limit),
+    })
+
+
+class SellerDashboardAPIView(SparseColumnsViewMixin, generics.ListAPIView):
+    serializer_class = SellerProductSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return self.prune_columns(self.request.user.products.all()).annotate(
+            views=Coalesce('view_count__views', 0),
+        )
+
+    def list(self, request, *args, **kwargs):
+        profile = getattr(request.user, 'userprofile', None)
+        if profile is None or profile.role != 'seller':
+            return Response({'error': 'Only sellers have a dashboard'},
+                          status=status.HTTP_403_FORBIDDEN)
+
+        self.paginator.django_paginator_class = partial(KnownCountPaginator, count=profile.product_count)
+        response = super().list(request, *args, **kwargs)
+        response.data['counts'] = {
+            'total_products': profile.product_count,
+            'available_products': profile.available_count,
+            'by_type': {
+                value: getattr(profile, f'{value}_count')
+                for value, _ in SilkProduct.TYPE_CHOICES
+            },
+        }
+        return response
+
+
+async def product_events(request):
+    """
+    Server-Sent Events stream of product created/updated/deleted events,
+    optionally filtered by ``type`` and ``owner``. Needs a JWT like the rest
+    of the API. Only served under ASGI: under WSGI an async stream would tie
+    up a worker thread and never flush, so it answers 501 instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'The event stream is only served under ASGI'}, status=501)
+    authentication = JWTAuthentication()
+    try:
+        authenticated = await sync_to_async(authentication.authenticate)(request)
+    except AuthenticationFailed as exc:
+        authenticated, detail = None, exc.detail
+    else:
+        detail = 'Authentication credentials were not provided.'
+    if authenticated is None:
+        response = JsonResponse(detail if isinstance(detail, dict) else {'detail': detail}, status=401)
+        response['WWW-Authenticate'] = authentication.authenticate_header(request)
+        return response
+
+    types = request.GET.getlist('type')
+    valid_types = {value for value, _ in SilkProduct.TYPE_CHOICES}
+    if any(value not in valid_types for value in types):
+        return JsonResponse({'error': f'type must be one of {sorted(valid_types)}'}, status=400)
+    try:
+        owners = [int(owner) for owner in request.GET.getlist('owner')]
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({'error': 'owner and Last-Event-ID must be integers'}, status=400)
+
+    response = StreamingHttpResponse(
+        stream(get_broadcaster(), types, owners, last_event_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
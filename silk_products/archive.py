@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedSilkProduct, ProductViewCount, SilkProduct
+
+
+def stale_products(days=None):
+    """Products unavailable (and untouched) for ``days`` days, with no units still on hold."""
+    if days is None:
+        days = settings.ARCHIVE_UNAVAILABLE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    return SilkProduct.objects.filter(availability=False, updated_at__lt=cutoff).exclude(holds__status='held')
+
+
+def archive_batch(ids, days=None):
+    """
+    Copy one batch of products into the archive and delete them from the hot
+    table. The staleness filter is applied again under row locks, so a product
+    made available, edited or put on hold since it was picked stays. View
+    totals move with the product; its hold history and similar-product links
+    are deleted with it. Returns the number archived.
+    """
+    with transaction.atomic():
+        products = list(stale_products(days).select_for_update().filter(pk__in=ids))
+        counts = ProductViewCount.objects.in_bulk([p.pk for p in products])
+        archived = []
+        for product in products:
+            copy = ArchivedSilkProduct.from_product(product)
+            if product.pk in counts:
+                copy.views, copy.contacts = counts[product.pk].views, counts[product.pk].contacts
+            archived.append(copy)
+        ArchivedSilkProduct.objects.bulk_create(archived)
+        SilkProduct.objects.filter(pk__in=[p.pk for p in products]).delete()
+    return len(products)
+
+
+def archive_stale_products(days=None, batch_size=500):
+    archived = 0
+    candidates = stale_products(days).order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        # Walk by id: products skipped by archive_batch stay in the table.
+        ids = list(candidates.filter(pk__gt=last)[:batch_size])
+        if not ids:
+            return archived
+        archived += archive_batch(ids, days)
+        last = ids[-1]
+
+
+def restore_products(ids):
+    restored = []
+    for archived in ArchivedSilkProduct.objects.filter(pk__in=ids):
+        restored.append(archived.restore())
+    return restored
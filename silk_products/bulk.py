@@ -0,0 +1,95 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Now, Round
+from django.dispatch import Signal
+
+from .changelog import record_changes
+from .counters import apply_deltas
+from .models import SilkProduct
+
+# Sent after a set-based UPDATE with the primary keys of the affected rows,
+# since queryset.update() bypasses the model save signals.
+products_bulk_updated = Signal()
+
+CHUNK_SIZE = 500
+
+PRICE_FIELD = SilkProduct._meta.get_field('price')
+
+
+def chunked(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def locked_rows(queryset, *fields, **recheck):
+    """
+    Lock and read the rows of ``queryset``; must run inside a transaction.
+    ``recheck`` filters are evaluated again once each row is locked. Writing
+    to exactly these primary keys afterwards keeps the changelog and counter
+    deltas in step with the UPDATE, even if other writers change which rows
+    the queryset matches meanwhile.
+    """
+    return list(
+        SilkProduct.objects.select_for_update().filter(pk__in=queryset.values('pk'), **recheck)
+        .order_by('pk').values_list('pk', *fields)
+    )
+
+
+def update_rows(pks, **values):
+    return sum(SilkProduct.objects.filter(pk__in=chunk).update(**values) for chunk in chunked(pks))
+
+
+def set_availability(queryset, available, user=None, dry_run=False):
+    """Set availability on every product in ``queryset``, one UPDATE per chunk of locked rows."""
+    queryset = queryset.exclude(availability=available)
+    if dry_run:
+        return queryset.count()
+
+    with record_changes(user) as batch:
+        rows = locked_rows(queryset, 'owner_id', availability=not available)
+        updated = update_rows([pk for pk, _ in rows], availability=available, updated_at=Now())
+
+        deltas = defaultdict(lambda: defaultdict(int))
+        for pk, owner_id in rows:
+            deltas[owner_id]['available_count'] += 1 if available else -1
+            batch.add(pk, owner_id, [('availability', not available, available)])
+        apply_deltas(deltas)
+
+    products_bulk_updated.send(sender=SilkProduct, pks=[pk for pk, _ in rows])
+    return updated
+
+
+def price_expression(percent=None, amount=None):
+    if percent is not None:
+        factor = Decimal(1) + Decimal(percent) / Decimal(100)
+        new_price = Round(F('price') * Value(factor, output_field=PRICE_FIELD), 2, output_field=PRICE_FIELD)
+    else:
+        new_price = F('price') + Value(Decimal(amount), output_field=PRICE_FIELD)
+    return Greatest(new_price, Value(0), output_field=PRICE_FIELD)
+
+
+def reprice(queryset, percent=None, amount=None, user=None, dry_run=False):
+    """
+    Change prices by ``percent`` or by a fixed ``amount``, one UPDATE per
+    chunk of locked rows. Prices never drop below zero.
+    """
+    if (percent is None) == (amount is None):
+        raise ValueError('Pass exactly one of percent or amount.')
+    if dry_run:
+        return queryset.count()
+
+    with record_changes(user) as batch:
+        old_prices = {pk: (owner_id, price) for pk, owner_id, price in locked_rows(queryset, 'owner_id', 'price')}
+        pks = list(old_prices)
+        updated = update_rows(pks, price=price_expression(percent, amount), updated_at=Now())
+
+        for chunk in chunked(pks):
+            for pk, price in SilkProduct.objects.filter(pk__in=chunk).values_list('pk', 'price'):
+                owner_id, old_price = old_prices[pk]
+                if price != old_price:
+                    batch.add(pk, owner_id, [('price', old_price, price)])
+
+    products_bulk_updated.send(sender=SilkProduct, pks=pks)
+    return updated
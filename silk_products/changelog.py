@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import models, transaction
+
+from .models import ProductChange, SilkProduct
+
+LOGGED_FIELDS = ('name', 'type', 'price', 'availability', 'description', 'owner_id')
+
+# Decimal fields are compared and logged at their stored precision, so 100 from a
+# form and 100.00 from the database are the same price and read the same.
+DECIMAL_QUANTA = {
+    field.attname: Decimal(1).scaleb(-field.decimal_places)
+    for field in SilkProduct._meta.concrete_fields
+    if isinstance(field, models.DecimalField) and field.attname in LOGGED_FIELDS
+}
+
+_active_batch = ContextVar('product_change_batch', default=None)
+
+
+def as_text(value):
+    return '' if value is None else str(value)
+
+
+def normalize(field, value):
+    quantum = DECIMAL_QUANTA.get(field)
+    if quantum is None or value is None:
+        return value
+    return SilkProduct._meta.get_field(field).to_python(value).quantize(quantum)
+
+
+def diff_values(old_values, new_values):
+    diffs = []
+    for field in LOGGED_FIELDS:
+        if field not in old_values:
+            continue
+        old, new = normalize(field, old_values[field]), normalize(field, new_values[field])
+        if old != new:
+            diffs.append((field, old, new))
+    return diffs
+
+
+class ChangeBatch:
+    def __init__(self, user=None):
+        self.user = user
+        self.changes = []
+
+    def add(self, product_id, owner_id, diffs):
+        changed_by = self.user if self.user is not None and self.user.is_authenticated else None
+        for field, old, new in diffs:
+            self.changes.append(ProductChange(
+                product_id=product_id,
+                owner_id=owner_id,
+                changed_by=changed_by,
+                field=field.removesuffix('_id'),
+                old_value=as_text(normalize(field, old)),
+                new_value=as_text(normalize(field, new)),
+            ))
+
+    def flush(self):
+        if self.changes:
+            ProductChange.objects.bulk_create(self.changes)
+            self.changes = []
+
+
+@contextmanager
+def record_changes(user=None):
+    """
+    Collect the product diffs saved inside the block and write them in one
+    bulk insert, inside the same transaction as the saves themselves.
+    """
+    if _active_batch.get() is not None:
+        yield _active_batch.get()
+        return
+    batch = ChangeBatch(user)
+    token = _active_batch.set(batch)
+    try:
+        with transaction.atomic():
+            yield batch
+            batch.flush()
+    finally:
+        _active_batch.reset(token)
+
+
+def log_product_changes(product, old_values, new_values):
+    diffs = diff_values(old_values, new_values)
+    if not diffs:
+        return
+    batch = _active_batch.get()
+    if batch is not None:
+        batch.add(product.pk, product.owner_id, diffs)
+    else:
+        batch = ChangeBatch()
+        batch.add(product.pk, product.owner_id, diffs)
+        batch.flush()
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Backends whose entries live in one process; writes and deletes in one worker
+# are invisible to the others.
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+# Event buses that only reach streams served by the publishing process.
+PROCESS_LOCAL_BUSES = ('silk_products.events.InMemoryBus',)
+
+
+def is_process_local(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches, deploy=True)
+def check_session_cache(app_configs, **kwargs):
+    engine = settings.SESSION_ENGINE.rsplit('.', 1)[-1]
+    if engine in ('cache', 'cached_db') and is_process_local(settings.SESSION_CACHE_ALIAS):
+        return [Error(
+            f'SESSION_ENGINE {engine!r} uses the per-process {settings.SESSION_CACHE_ALIAS!r} cache.',
+            hint='A session logged out or flushed in one worker stays cached in the others. '
+                 'Set SILK_REDIS_URL or use the db session engine.',
+            id='silk_products.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_product_cache(app_configs, **kwargs):
+    if is_process_local('default'):
+        return [Warning(
+            "Cached products live in the per-process 'default' cache.",
+            hint='An edit only drops the copy cached by the worker that made it; the other workers '
+                 'serve theirs for up to PRODUCT_CACHE_TIMEOUT seconds. Set SILK_REDIS_URL when '
+                 'running several workers.',
+            id='silk_products.W001',
+        )]
+    return []
+
+
+@register(deploy=True)
+def check_event_bus(app_configs, **kwargs):
+    if settings.PRODUCT_EVENT_BUS in PROCESS_LOCAL_BUSES:
+        return [Warning(
+            f'PRODUCT_EVENT_BUS {settings.PRODUCT_EVENT_BUS!r} only reaches streams in the publishing process.',
+            hint='Product changes made through one worker never reach event streams served by the '
+                 'others. Set SILK_REDIS_URL when running several workers.',
+            id='silk_products.W002',
+        )]
+    return []
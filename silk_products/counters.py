@@ -0,0 +1,77 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, Q
+
+from .models import SilkProduct, UserProfile
+
+TYPE_COUNTER_FIELDS = {value: f'{value}_count' for value, _ in SilkProduct.TYPE_CHOICES}
+COUNTER_FIELDS = ('product_count', 'available_count') + tuple(TYPE_COUNTER_FIELDS.values())
+
+
+def product_state(values):
+    """The (owner_id, type, availability) triple the counters depend on."""
+    return values.get('owner_id'), values.get('type'), values.get('availability')
+
+
+def add_state(deltas, state, sign):
+    owner_id, product_type, available = state
+    if owner_id is None:
+        return
+    owner_deltas = deltas[owner_id]
+    owner_deltas['product_count'] += sign
+    if available:
+        owner_deltas['available_count'] += sign
+    if product_type in TYPE_COUNTER_FIELDS:
+        owner_deltas[TYPE_COUNTER_FIELDS[product_type]] += sign
+
+
+def state_deltas(old_state=None, new_state=None):
+    deltas = defaultdict(lambda: defaultdict(int))
+    if old_state is not None:
+        add_state(deltas, old_state, -1)
+    if new_state is not None:
+        add_state(deltas, new_state, 1)
+    return deltas
+
+
+def apply_deltas(deltas):
+    for owner_id, fields in deltas.items():
+        changes = {field: F(field) + delta for field, delta in fields.items() if delta}
+        if changes:
+            UserProfile.objects.filter(user_id=owner_id).update(**changes)
+
+
+def count_products(owner_ids=None):
+    """Recount the dashboard counters straight from the product table."""
+    products = SilkProduct.objects.order_by()
+    if owner_ids is not None:
+        products = products.filter(owner_id__in=owner_ids)
+    aggregates = {
+        'product_count': Count('id'),
+        'available_count': Count('id', filter=Q(availability=True)),
+    }
+    for product_type, field in TYPE_COUNTER_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(type=product_type))
+    rows = products.values('owner_id').annotate(**aggregates)
+    return {row.pop('owner_id'): row for row in rows}
+
+
+def reconcile_counters(owner_ids=None, dry_run=False, batch_size=1000):
+    """Rewrite drifted counters and return the profiles that were off."""
+    counts = count_products(owner_ids)
+    profiles = UserProfile.objects.only('user_id', *COUNTER_FIELDS).order_by('pk')
+    if owner_ids is not None:
+        profiles = profiles.filter(user_id__in=owner_ids)
+
+    empty = dict.fromkeys(COUNTER_FIELDS, 0)
+    drifted = []
+    for profile in profiles.iterator(chunk_size=batch_size):
+        expected = counts.get(profile.user_id, empty)
+        if any(getattr(profile, field) != expected[field] for field in COUNTER_FIELDS):
+            for field in COUNTER_FIELDS:
+                setattr(profile, field, expected[field])
+            drifted.append(profile)
+
+    if drifted and not dry_run:
+        UserProfile.objects.bulk_update(drifted, COUNTER_FIELDS, batch_size=batch_size)
+    return drifted
@@ -0,0 +1,109 @@
+import threading
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .models import ExchangeRate
+from .versions import VersionCounter
+
+SESSION_KEY = 'currency'
+
+Currency = namedtuple('Currency', 'code symbol places')
+
+
+def currencies():
+    return {code: Currency(code, symbol, places) for code, (symbol, places) in settings.CURRENCIES.items()}
+
+
+rates = VersionCounter('rates')
+
+
+def rates_version():
+    return rates.get()
+
+
+def bump_rates_version():
+    rates.bump()
+
+
+class RateTable:
+    """
+    Per-process copy of the ExchangeRate table, reloaded when the rates
+    version in the database changes: load_exchange_rates and admin edits
+    bump it on commit, and every process sees that within
+    SHARED_VERSION_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self.rates = {}
+        self.version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = rates_version()
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    self.rates = dict(ExchangeRate.objects.values_list('currency', 'rate'))
+                    self.version = version
+        return self.rates
+
+    def rate(self, code):
+        if code == settings.BASE_CURRENCY:
+            return Decimal(1)
+        return self.get().get(code)
+
+
+rate_table = RateTable()
+
+
+def convert_prices(prices, code):
+    """
+    Convert base-currency prices to ``code`` in one pass with a single rate
+    lookup, rounding half-up to the currency's minor unit. Returns
+    ``(currency, amounts)``; without a loaded rate the base currency is used.
+    """
+    table = currencies()
+    rate = rate_table.rate(code) if code in table else None
+    if rate is None:
+        code, rate = settings.BASE_CURRENCY, Decimal(1)
+    currency = table[code]
+    quantum = Decimal(1).scaleb(-currency.places)
+    with localcontext() as ctx:
+        ctx.prec = 28
+        return currency, [(Decimal(price) * rate).quantize(quantum, rounding=ROUND_HALF_UP) for price in prices]
+
+
+def format_price(amount, currency):
+    return f'{currency.symbol}{amount}'
+
+
+def apply_prices(products, code):
+    """Set ``display_price`` on every product with one conversion pass; returns the currency used."""
+    currency, amounts = convert_prices([product.price for product in products], code)
+    for product, amount in zip(products, amounts):
+        product.display_price = format_price(amount, currency)
+    return currency
+
+
+def get_currency(request):
+    """``?currency=`` (remembered in the session), else the session's choice, else DEFAULT_CURRENCY."""
+    code = request.GET.get('currency', '').upper()
+    if code in settings.CURRENCIES:
+        if request.session.get(SESSION_KEY) != code:
+            request.session[SESSION_KEY] = code
+        return code
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        # No session to remember a choice: leave it unread, so the response doesn't vary on Cookie.
+        return settings.DEFAULT_CURRENCY
+    return request.session.get(SESSION_KEY) or settings.DEFAULT_CURRENCY
+
+
+def currency_context(request):
+    """Resolved on first use, so pages that never show the switcher don't read the session."""
+    return {
+        'currencies': list(settings.CURRENCIES),
+        'currency': SimpleLazyObject(lambda: get_currency(request)),
+    }
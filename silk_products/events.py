@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from itertools import count
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', ['id', 'kind', 'data'])
+
+EVENT_FIELDS = ('id', 'name', 'type', 'price', 'availability', 'owner_id', 'updated_at')
+
+
+def product_event_data(values):
+    data = {field: values[field] for field in EVENT_FIELDS if field in values}
+    data['owner'] = data.pop('owner_id', None)
+    return data
+
+
+def format_event(event):
+    return f'id: {event.id}\nevent: {event.kind}\ndata: {json.dumps(event.data, cls=DjangoJSONEncoder)}\n\n'
+
+
+class Subscription:
+    """One client stream. Events are queued on the client's event loop."""
+
+    def __init__(self, loop, types=None, owners=None, max_queue=256):
+        self.loop = loop
+        self.types = set(types) if types else None
+        self.owners = set(owners) if owners else None
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def matches(self, event):
+        if self.types is not None and event.data.get('type') not in self.types:
+            return False
+        if self.owners is not None and event.data.get('owner') not in self.owners:
+            return False
+        return True
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow client: end its stream so it reconnects and replays from Last-Event-ID.
+            self.close()
+
+    def close(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    """
+    Per-worker fan-out of product events to open streams. The last
+    ``buffer_size`` events are kept so a reconnecting client can resume
+    from its Last-Event-ID.
+    """
+
+    def __init__(self, buffer_size=1000):
+        self.buffer = deque(maxlen=buffer_size)
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+
+    def receive(self, event):
+        """Called by the bus, from any thread, with events in id order."""
+        with self.lock:
+            if self.buffer and event.id != self.buffer[-1].id + 1:
+                # Events were missed (the bus reconnected or restarted): nothing
+                # before this one can be replayed, and open streams are ended so
+                # their clients reconnect and get a reset.
+                self.buffer.clear()
+                closed, self.subscriptions = self.subscriptions, set()
+            else:
+                closed = ()
+            self.buffer.append(event)
+            subscriptions = [sub for sub in self.subscriptions if sub.matches(event)]
+        for sub in closed:
+            try:
+                sub.loop.call_soon_threadsafe(sub.close)
+            except RuntimeError:
+                pass
+        for sub in subscriptions:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, event)
+            except RuntimeError:
+                self.unsubscribe(sub)
+
+    def replay(self, last_event_id):
+        """
+        Buffered events after ``last_event_id``, or None if some have already
+        been dropped, or if the id is ahead of the newest event: ids start
+        again at 1 when the bus restarts, so the client has missed an unknown
+        number of events.
+        """
+        if last_event_id is None:
+            return []
+        latest = self.buffer[-1].id if self.buffer else 0
+        if last_event_id > latest or (self.buffer and self.buffer[0].id > last_event_id + 1):
+            return None
+        return [event for event in self.buffer if event.id > last_event_id]
+
+    def subscribe(self, types=None, owners=None, last_event_id=None):
+        sub = Subscription(asyncio.get_running_loop(), types, owners)
+        # Replay and register under one lock so no event falls between the two.
+        with self.lock:
+            backlog = self.replay(last_event_id)
+            self.subscriptions.add(sub)
+        if backlog is not None:
+            backlog = [event for event in backlog if sub.matches(event)]
+        return sub, backlog
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscriptions.discard(sub)
+
+
+class InMemoryBus:
+    """
+    Process-local bus: events only reach streams served by the worker that
+    published them, so it suits a single worker (and tests). It numbers
+    events so ids are shared by all attached broadcasters.
+    """
+
+    def __init__(self):
+        self.ids = count(1)
+        self.lock = threading.Lock()
+        self.broadcasters = []
+
+    def attach(self, broadcaster):
+        self.broadcasters.append(broadcaster)
+
+    def publish(self, kind, data):
+        # Delivered under the lock so broadcasters see ids in order.
+        with self.lock:
+            event = Event(next(self.ids), kind, data)
+            for broadcaster in list(self.broadcasters):
+                broadcaster.receive(event)
+        return event
+
+
+class RedisBus:
+    """
+    Fans events out to every worker through a Redis pub/sub channel
+    (``SILK_REDIS_URL``). A script numbers and publishes each event in one
+    atomic step, so ids are shared by all workers and arrive in order. Each
+    process listens on a daemon thread, reconnecting if Redis goes away;
+    events missed meanwhile end its open streams with a reset.
+    """
+
+    CHANNEL = 'silk:product-events'
+    COUNTER = 'silk:product-events:id'
+    PUBLISH_SCRIPT = (
+        "local id = redis.call('INCR', KEYS[1]) "
+        "redis.call('PUBLISH', KEYS[2], id .. ' ' .. ARGV[1]) "
+        "return id"
+    )
+    RECONNECT_DELAY = 1
+
+    def __init__(self, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(settings.REDIS_URL)
+        self.client = client
+        self.script = client.register_script(self.PUBLISH_SCRIPT)
+        self.broadcasters = []
+        self.listener = None
+        self.lock = threading.Lock()
+
+    def attach(self, broadcaster):
+        self.broadcasters.append(broadcaster)
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name='product-events', daemon=True)
+                self.listener.start()
+
+    def publish(self, kind, data):
+        payload = json.dumps({'kind': kind, 'data': data}, cls=DjangoJSONEncoder)
+        event_id = self.script(keys=[self.COUNTER, self.CHANNEL], args=[payload])
+        return Event(int(event_id), kind, data)
+
+    def receive(self, message):
+        if isinstance(message, bytes):
+            message = message.decode()
+        event_id, payload = message.split(' ', 1)
+        payload = json.loads(payload)
+        event = Event(int(event_id), payload['kind'], payload['data'])
+        for broadcaster in list(self.broadcasters):
+            broadcaster.receive(event)
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self.receive(message['data'])
+            except Exception:
+                logger.exception('Product event listener lost its Redis connection')
+            time.sleep(self.RECONNECT_DELAY)
+
+
+_bus = None
+_broadcaster = None
+_setup_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _bus, _broadcaster
+    with _setup_lock:
+        if _broadcaster is None:
+            _bus = import_string(settings.PRODUCT_EVENT_BUS)()
+            _broadcaster = Broadcaster(settings.PRODUCT_EVENT_BUFFER)
+            _bus.attach(_broadcaster)
+    return _broadcaster
+
+
+def publish(kind, data):
+    get_broadcaster()
+    return _bus.publish(kind, data)
+
+
+async def stream(broadcaster, types=None, owners=None, last_event_id=None, heartbeat=None):
+    """Yield SSE frames for one client until it disconnects or falls too far behind."""
+    if heartbeat is None:
+        heartbeat = settings.PRODUCT_EVENT_HEARTBEAT
+    sub, backlog = broadcaster.subscribe(types, owners, last_event_id)
+    try:
+        yield f'retry: {settings.PRODUCT_EVENT_RETRY_MS}\n\n'
+        if backlog is None:
+            # Too far behind to replay: the client should refetch the list.
+            yield 'event: reset\ndata: {}\n\n'
+        else:
+            for event in backlog:
+                yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is None:
+                return
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(sub)
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from .models import SilkProduct, UserProfile
 
 
@@ -28,27 +29,41 @@ class CustomUserCreationForm(UserCreationForm):
         user.first_name = self.cleaned_data['first_name']
         user.last_name = self.cleaned_data['last_name']
         if commit:
-            user.save()
-            UserProfile.objects.create(
-                user=user,
-                role=self.cleaned_data['role'],
-                phone=self.cleaned_data['phone']
-            )
+            with transaction.atomic():
+                user.save()
+                UserProfile.objects.create(
+                    user=user,
+                    role=self.cleaned_data['role'],
+                    phone=self.cleaned_data['phone']
+                )
         return user
 
 
 class SilkProductForm(forms.ModelForm):
     class Meta:
         model = SilkProduct
-        fields = ['name', 'type', 'price', 'availability', 'description']
+        fields = ['name', 'type', 'price', 'stock', 'availability', 'description', 'image']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'type': forms.Select(attrs={'class': 'form-control'}),
             'price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0'}),
+            'stock': forms.NumberInput(attrs={'class': 'form-control', 'min': '0'}),
             'availability': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+            'image': forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': 'image/*'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['stock'].required = False
+
+    def clean_stock(self):
+        stock = self.cleaned_data.get('stock')
+        if stock is None:
+            # Left blank: keep the current level (or the model default for a new product).
+            return self.instance.stock
+        return stock
+
     def clean_price(self):
         price = self.cleaned_data.get('price')
         if price is not None and price < 0:
@@ -58,4 +73,25 @@ class SilkProductForm(forms.ModelForm):
 
 class ContactSellerForm(forms.Form):
     subject = forms.CharField(max_length=200, widget=forms.TextInput(attrs={'class': 'form-control'}))
-    message = forms.CharField(widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 5}))
\ No newline at end of file
+    message = forms.CharField(widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 5}))
+
+
+class RepriceForm(forms.Form):
+    MODE_CHOICES = [
+        ('percent', 'Percentage'),
+        ('amount', 'Fixed amount'),
+    ]
+
+    mode = forms.ChoiceField(choices=MODE_CHOICES)
+    value = forms.DecimalField(max_digits=10, decimal_places=2,
+                               help_text='Negative values lower prices. Prices never go below zero.')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('mode') == 'percent' and cleaned_data.get('value') is not None:
+            if cleaned_data['value'] < -100:
+                raise ValidationError('A price cannot drop by more than 100%.')
+        return cleaned_data
+
+    def reprice_kwargs(self):
+        return {self.cleaned_data['mode']: self.cleaned_data['value']}
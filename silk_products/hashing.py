@@ -0,0 +1,13 @@
+"""Password hashing for the provisioning process pool; Django is only set up inside the workers."""
+import os
+
+
+def init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords):
+    from django.contrib.auth.hashers import make_password
+    return [make_password(password) for password in passwords]
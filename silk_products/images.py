@@ -0,0 +1,80 @@
+import hashlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+
+from .imaging import render_variants
+from .models import SilkProduct
+from .productcache import invalidate_products
+
+logger = logging.getLogger(__name__)
+
+VARIANT_PREFIX = 'products/variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Forking a threaded server can deadlock the children, so start them fresh.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _executor
+
+
+def variant_name(data):
+    """Content-addressed storage name, so a variant's URL never changes its bytes."""
+    digest = hashlib.sha256(data).hexdigest()
+    return f'{VARIANT_PREFIX}/{digest[:2]}/{digest}.jpg'
+
+
+def store_variants(product_id, image_name, variants):
+    names = {}
+    for size, data in variants.items():
+        name = variant_name(data)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(data))
+        names[size] = name
+    # Only apply if the product still has the image these were made from.
+    updated = SilkProduct.objects.filter(pk=product_id, image=image_name).update(
+        thumbnail=names.get('thumb', ''), image_variants=names,
+    )
+    if updated:
+        invalidate_products([product_id])
+    return updated
+
+
+def _finish(product_id, image_name, future):
+    close_old_connections()
+    try:
+        store_variants(product_id, image_name, future.result())
+    except Exception:
+        logger.exception('Could not generate image variants for product %s', product_id)
+    finally:
+        close_old_connections()
+
+
+def generate_variants(product_id, image_name):
+    """
+    Resize ``image_name`` into every IMAGE_VARIANTS size. With
+    IMAGE_PROCESSING = 'process' the work runs in the process pool and the
+    results are stored from the pool's callback thread; 'sync' does it inline.
+    """
+    with default_storage.open(image_name, 'rb') as source:
+        data = source.read()
+    if settings.IMAGE_PROCESSING == 'sync':
+        return store_variants(product_id, image_name, render_variants(data, settings.IMAGE_VARIANTS))
+    future = get_executor().submit(render_variants, data, settings.IMAGE_VARIANTS)
+    future.add_done_callback(lambda f: _finish(product_id, image_name, f))
+    return future
@@ -0,0 +1,22 @@
+"""Image resizing that runs inside the thumbnail process pool; kept free of Django imports."""
+import io
+
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 85
+
+
+def render_variants(data, sizes):
+    """Resize image bytes to each ``{name: (width, height)}`` bounding box; returns ``{name: jpeg bytes}``."""
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'L'):
+            source = source.convert('RGB')
+        variants = {}
+        for name, size in sizes.items():
+            image = source.copy()
+            image.thumbnail(size, Image.LANCZOS)
+            out = io.BytesIO()
+            image.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            variants[name] = out.getvalue()
+    return variants
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .versions import VersionCounter
+
+# Stored in place of an id list that exceeded max_ids, so it isn't recomputed per request.
+TOO_LARGE = object()
+
+catalog = VersionCounter('catalog')
+
+
+def catalog_version():
+    return catalog.get()
+
+
+def bump_catalog_version():
+    catalog.bump()
+
+
+def bump_catalog_version_on_commit(using=None):
+    """
+    Bump the catalog version when the current transaction commits, once per
+    transaction however many products it writes. The pending callback and its
+    place in the on-commit queue are kept on the connection; a rollback drops
+    the callback from the queue, so the next write queues a new one.
+    """
+    connection = transaction.get_connection(using)
+    pending = getattr(connection, 'pending_catalog_bump', None)
+    if pending is not None:
+        callback, index = pending
+        queued = connection.run_on_commit
+        if index < len(queued) and queued[index][1] is callback:
+            return
+
+    def callback():
+        connection.pending_catalog_bump = None
+        bump_catalog_version()
+
+    connection.pending_catalog_bump = (callback, len(connection.run_on_commit))
+    transaction.on_commit(callback, using=using)
+
+
+def normalize_search(text):
+    return ' '.join(text.lower().split())
+
+
+def list_cache_key(params):
+    """Normalized filter key for the product list query parameters."""
+    available = (params.get('available') or '').lower() == 'true'
+    return (
+        normalize_search(params.get('search') or ''),
+        params.get('type') or '',
+        available,
+        params.get('sort') or 'newest',
+    )
+
+
+class IdListCache:
+    """
+    Per-process LRU of ordered product id lists, keyed by filter and catalog
+    version. A committed write bumps the version in the database, so other
+    processes stop reading their stale entries within
+    SHARED_VERSION_CHECK_INTERVAL; entries older than ``max_age`` seconds
+    are never read either way.
+    """
+
+    def __init__(self, max_entries=None, max_ids=None, max_age=None):
+        self._max_entries = max_entries
+        self._max_ids = max_ids
+        self._max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def max_entries(self):
+        return settings.PRODUCT_LIST_CACHE_SIZE if self._max_entries is None else self._max_entries
+
+    @property
+    def max_ids(self):
+        return settings.PRODUCT_LIST_CACHE_MAX_IDS if self._max_ids is None else self._max_ids
+
+    @property
+    def max_age(self):
+        return settings.PRODUCT_LIST_CACHE_MAX_AGE if self._max_age is None else self._max_age
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = self.uncacheable = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_ids(self, key, compute):
+        """
+        Return the cached id list for ``key``, calling ``compute(limit)`` on a
+        miss. Returns None when caching is off or the list is longer than
+        ``max_ids``; the caller should then paginate in the database.
+        """
+        if not self.max_entries:
+            return None
+        # Read the version before computing: a write that lands meanwhile
+        # bumps it, and whatever is stored under the old version is never read.
+        full_key = (catalog_version(), key)
+        now = time.monotonic()
+        with self._lock:
+            ids, stored_at = self._entries.get(full_key, (None, None))
+            if ids is not None and now - stored_at >= self.max_age:
+                del self._entries[full_key]
+                ids = None
+            if ids is not None:
+                self._entries.move_to_end(full_key)
+                if ids is TOO_LARGE:
+                    self.uncacheable += 1
+                    return None
+                self.hits += 1
+                return ids
+            self.misses += 1
+
+        ids = tuple(compute(self.max_ids + 1))
+        if len(ids) > self.max_ids:
+            self.uncacheable += 1
+            ids = TOO_LARGE
+        with self._lock:
+            self._entries[full_key] = (ids, now)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return None if ids is TOO_LARGE else ids
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else None,
+            'evictions': self.evictions,
+            'uncacheable': self.uncacheable,
+        }
+
+
+product_list_cache = IdListCache()
@@ -0,0 +1,196 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import WatchedFileHandler
+from pathlib import Path
+
+from django.db import connection
+
+access_logger = logging.getLogger('silk_products.access')
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``.
+RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and any ``extra`` fields."""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class QueueingHandler(logging.Handler):
+    """
+    Hands records to a bounded queue that a background thread writes out, so
+    a slow disk never blocks the request thread. When the queue is full the
+    record is dropped and counted; the writer reports drops as a warning.
+
+    Nothing is opened or started until the first record: the writer thread
+    and its queue belong to the process that started them, so a worker
+    forked after logging was configured starts its own instead of queueing
+    to a thread that only exists in its parent.
+    """
+
+    def __init__(self, filename=None, maxsize=10000, level=logging.NOTSET):
+        super().__init__(level)
+        self.filename = filename if filename and filename != '-' else None
+        self.maxsize = maxsize
+        self.target = None
+        self.queue = None
+        self.dropped = Counter()
+        self._reported = 0
+        self._writer = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def _open_target(self):
+        if self.filename:
+            Path(self.filename).parent.mkdir(parents=True, exist_ok=True)
+            target = WatchedFileHandler(self.filename, encoding='utf-8')
+        else:
+            target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(self.formatter)
+        return target
+
+    def _start(self):
+        """Start a writer for this process; called from emit(), under the handler lock."""
+        if self.target is None:
+            self.target = self._open_target()
+        self.queue = queue.Queue(self.maxsize)
+        self.dropped = Counter()
+        self._reported = 0
+        self._writer = threading.Thread(target=self._write, args=(self.queue,), name='log-writer', daemon=True)
+        self._writer.start()
+        self._pid = os.getpid()
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        if self.target is not None:
+            self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Resolve the message (and traceback) now, while the arguments are still valid,
+        # but leave the JSON formatting to the writer thread.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            if self._pid != os.getpid():
+                self._start()
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped[record.levelname] += 1
+        except Exception:
+            self.handleError(record)
+
+    def stats(self):
+        return {'queued': self.queue.qsize() if self.queue else 0, 'dropped': dict(self.dropped)}
+
+    def _running(self):
+        return self._pid == os.getpid() and self._writer.is_alive()
+
+    def _write(self, records):
+        while True:
+            record = records.get()
+            try:
+                if record is None:
+                    return
+                self.target.handle(record)
+                self._report_drops()
+            except Exception:
+                self.handleError(record)
+            finally:
+                records.task_done()
+
+    def _report_drops(self):
+        total = sum(self.dropped.values())
+        if total > self._reported:
+            warning = logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f'Log queue full: dropped {total - self._reported} record(s)',
+                'dropped_total': dict(self.dropped),
+            })
+            self._reported = total
+            self.target.handle(warning)
+
+    def flush(self):
+        """Wait until every queued record has been written."""
+        if self._running():
+            self.queue.join()
+        if self.target is not None:
+            self.target.flush()
+
+    def close(self):
+        if self._running():
+            try:
+                self.queue.put(None, timeout=1)
+                self._writer.join(timeout=5)
+            except queue.Full:
+                pass
+        if self.target is not None:
+            self.target.close()
+        super().close()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class RequestLogMiddleware:
+    """Log one structured access record per request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        status = response.status_code
+        level = logging.ERROR if status >= 500 else logging.WARNING if status >= 400 else logging.INFO
+        access_logger.log(level, '%s %s %s', request.method, request.path, status, extra={
+            'method': request.method,
+            'path': request.path,
+            'url_name': match.view_name if match else None,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'queries': counter.count,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+        })
+        return response
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from silk_products.archive import archive_stale_products, restore_products, stale_products
+
+
+class Command(BaseCommand):
+    help = 'Move products unavailable for longer than --days into the archive table, or restore archived ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_UNAVAILABLE_AFTER_DAYS,
+                            help='Archive products unavailable and unchanged for this many days.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many products would move.')
+        parser.add_argument('--restore', type=int, nargs='+', metavar='ID',
+                            help='Move these archived product ids back into the catalog.')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            restored = restore_products(options['restore'])
+            self.stdout.write(self.style.SUCCESS(f'Restored {len(restored)} product(s).'))
+            return
+
+        if options['dry_run']:
+            count = stale_products(options['days']).count()
+            self.stdout.write(f'{count} product(s) would be archived.')
+            return
+
+        archived = archive_stale_products(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} product(s).'))
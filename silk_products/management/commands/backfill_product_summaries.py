@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from silk_products.models import SilkProduct
+
+
+class Command(BaseCommand):
+    help = 'Compute the stored summary and type label for existing products.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        products = SilkProduct.objects.only('pk', 'type', 'description', 'summary', 'type_label').order_by('pk')
+        last_pk = 0
+        updated = 0
+        while True:
+            batch = list(products.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            changed = []
+            for product in batch:
+                before = (product.summary, product.type_label)
+                product.refresh_derived_fields()
+                if (product.summary, product.type_label) != before:
+                    changed.append(product)
+            with transaction.atomic():
+                SilkProduct.objects.bulk_update(changed, ['summary', 'type_label'])
+            updated += len(changed)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} product summaries.'))
@@ -0,0 +1,23 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from silk_products.snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    help = ('Render the product list and product pages to static HTML under SNAPSHOT_DIR, '
+            'only re-rendering pages that changed since the last run.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Defaults to SNAPSHOT_DIR.')
+        parser.add_argument('--full', action='store_true', help='Re-render every page, e.g. after a template change.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Rendering processes for a full rebuild; 0 renders in this process.')
+
+    def handle(self, *args, **options):
+        result = build_snapshot(options['output'], full=options['full'], workers=options['workers'])
+        kind = 'full rebuild' if result.full else 'incremental'
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {result.rendered} product page(s), removed {result.removed} ({kind}).'
+        ))
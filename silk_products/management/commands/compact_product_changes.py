@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from silk_products.models import ProductChange
+
+
+class Command(BaseCommand):
+    help = (
+        'Apply the product change log retention policy: delete entries older than '
+        '--days and collapse repeated edits of the same field older than --compact-days.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.PRODUCT_CHANGE_RETENTION_DAYS,
+                            help='Delete change log entries older than this many days.')
+        parser.add_argument('--compact-days', type=int, default=None,
+                            help='Collapse per-field edit chains older than this many days into one entry.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = options['batch_size']
+
+        deleted = self.delete_expired(now - timedelta(days=options['days']), batch_size)
+        self.stdout.write(f'Deleted {deleted} expired change log entries.')
+
+        if options['compact_days'] is not None:
+            compacted = self.compact(now - timedelta(days=options['compact_days']), batch_size)
+            self.stdout.write(f'Collapsed {compacted} change log entries.')
+
+        self.stdout.write(self.style.SUCCESS('Change log retention applied.'))
+
+    def delete_expired(self, cutoff, batch_size):
+        deleted = 0
+        expired = ProductChange.objects.filter(changed_at__lt=cutoff).order_by('pk')
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += ProductChange.objects.filter(pk__in=ids).delete()[0]
+
+    def compact(self, cutoff, batch_size):
+        chains = (
+            ProductChange.objects.filter(changed_at__lt=cutoff)
+            .order_by()
+            .values('product_id', 'field')
+            .annotate(entries=Count('id'), first_id=Min('id'), last_id=Max('id'))
+            .filter(entries__gt=1)
+        )
+        collapsed = 0
+        chains = list(chains)
+        for start in range(0, len(chains), batch_size):
+            with transaction.atomic():
+                for chain in chains[start:start + batch_size]:
+                    first = ProductChange.objects.only('old_value').get(pk=chain['first_id'])
+                    ProductChange.objects.filter(pk=chain['last_id']).update(old_value=first.old_value)
+                    collapsed += ProductChange.objects.filter(
+                        product_id=chain['product_id'],
+                        field=chain['field'],
+                        changed_at__lt=cutoff,
+                        pk__lt=chain['last_id'],
+                    ).delete()[0]
+        return collapsed
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from silk_products.models import SilkProduct, SimilarProduct
+from silk_products.similarity import (
+    build_vocabulary, document_frequencies, product_tokens, tfidf_rows, top_k_neighbours,
+)
+
+
+class Command(BaseCommand):
+    help = 'Precompute "similar products" with TF-IDF cosine similarity over name, type and description.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=6)
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows per similarity block; bounds memory at a few chunk-size x max-features floats.')
+        parser.add_argument('--max-features', type=int, default=4096, help='Vocabulary size cap.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        # Two streaming passes (document frequencies, then sparse rows), so the
+        # token lists are never all held in memory.
+        document_frequency, total = document_frequencies(tokens for _, tokens in self.documents())
+        vocabulary = build_vocabulary(document_frequency, options['max_features'])
+        ids = []
+
+        def documents():
+            for pk, tokens in self.documents():
+                ids.append(pk)
+                yield tokens
+
+        matrix = tfidf_rows(documents(), vocabulary, document_frequency, total)
+        self.stdout.write(f'Vectorised {len(ids)} products over {matrix.columns} terms.')
+
+        product_ids = []
+        links = []
+        written = 0
+        for row, neighbours, scores in top_k_neighbours(matrix, options['top_k'], options['chunk_size']):
+            product_ids.append(ids[row])
+            links.extend(
+                SimilarProduct(product_id=ids[row], similar_id=ids[n], score=float(s), rank=rank)
+                for rank, (n, s) in enumerate(zip(neighbours, scores))
+            )
+            if len(product_ids) >= 500:
+                written += self.replace_links(product_ids, links)
+                product_ids, links = [], []
+        if product_ids:
+            written += self.replace_links(product_ids, links)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} similar-product links in {elapsed:.1f} s.'))
+
+    def documents(self):
+        rows = SilkProduct.objects.order_by('pk').values_list('pk', 'name', 'type', 'description')
+        for pk, name, product_type, description in rows.iterator(chunk_size=2000):
+            yield pk, product_tokens(name, product_type, description)
+
+    def replace_links(self, product_ids, links):
+        with transaction.atomic():
+            SimilarProduct.objects.filter(product_id__in=product_ids).delete()
+            SimilarProduct.objects.bulk_create(links)
+        return len(links)
@@ -0,0 +1,63 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from silk_products.currency import bump_rates_version
+from silk_products.models import ExchangeRate
+
+
+def parse_rate(currency, value):
+    currency = currency.strip().upper()
+    if currency not in settings.CURRENCIES or currency == settings.BASE_CURRENCY:
+        others = sorted(set(settings.CURRENCIES) - {settings.BASE_CURRENCY})
+        raise CommandError(f'{currency}: currency must be one of {", ".join(others)}')
+    try:
+        rate = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise CommandError(f'{currency}: invalid rate {value!r}')
+    if not rate.is_finite() or rate <= 0:
+        raise CommandError(f'{currency}: rate must be positive')
+    return currency, rate
+
+
+class Command(BaseCommand):
+    help = (f'Load exchange rates (units per 1 {settings.BASE_CURRENCY}) from a CSV file with currency,rate '
+            f'columns, a JSON object of {{"BDT": "117.5"}}, or --rate BDT=117.5.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?')
+        parser.add_argument('--rate', action='append', default=[], metavar='CODE=RATE')
+
+    def handle(self, *args, **options):
+        pairs = []
+        if options['path']:
+            path = Path(options['path'])
+            try:
+                with path.open(newline='', encoding='utf-8') as f:
+                    if path.suffix == '.json':
+                        pairs += json.load(f).items()
+                    else:
+                        pairs += [(row['currency'], row['rate']) for row in csv.DictReader(f)]
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f'Could not read {path}: {exc}')
+        for item in options['rate']:
+            currency, _, rate = item.partition('=')
+            pairs.append((currency, rate))
+        if not pairs:
+            raise CommandError('Give a file or at least one --rate.')
+
+        rates = dict(parse_rate(currency, rate) for currency, rate in pairs)
+        with transaction.atomic():
+            ExchangeRate.objects.bulk_create(
+                [ExchangeRate(currency=currency, rate=rate) for currency, rate in rates.items()],
+                update_conflicts=True, unique_fields=['currency'], update_fields=['rate', 'updated_at'],
+            )
+            transaction.on_commit(bump_rates_version)
+        self.stdout.write(self.style.SUCCESS(
+            'Loaded ' + ', '.join(f'{currency} {rate}' for currency, rate in sorted(rates.items()))
+        ))
@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: build the WSGI app (including warm-up) and serve two requests.
+PROBE = '''
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+
+spawned = float(sys.argv[2])
+start = time.perf_counter()
+from silk_catalog.wsgi import application
+loaded = time.perf_counter()
+
+def request(path):
+    environ = {'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    statuses = []
+    began = time.perf_counter()
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(response)
+    response.close()
+    return statuses[0], time.perf_counter() - began
+
+status, first = request(sys.argv[1])
+first_response = time.time()
+_, second = request(sys.argv[1])
+print(json.dumps({
+    'status': status,
+    'app_load': loaded - start,
+    'first_request': first,
+    'second_request': second,
+    'time_to_first_response': first_response - spawned,
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """Parse ``-X importtime`` output into ``[(module, self_us, cumulative_us)]``."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Boot the WSGI app in a fresh process and report per-module import time and time-to-first-request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/', help='Path requested once the app has loaded.')
+        parser.add_argument('--top', type=int, default=20, help='Number of slowest modules to list.')
+        parser.add_argument('--target-ms', type=float, default=settings.STARTUP_TARGET_MS,
+                            help='Time-to-first-response budget in milliseconds.')
+        parser.add_argument('--no-warmup', action='store_true', help='Boot with the warm-up hook disabled.')
+        parser.add_argument('--fail-over-target', action='store_true',
+                            help='Exit with an error when the budget is exceeded.')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'silk_catalog.settings')}
+        env['SILK_WARMUP'] = '0' if options['no_warmup'] else '1'
+        spawned = time.time()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, options['url'], repr(spawned)],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Startup probe failed:\n{result.stderr[-2000:]}')
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+
+        packages = {}
+        for name, self_us, _ in modules:
+            top = name.split('.')[0]
+            packages[top] = packages.get(top, 0) + self_us
+
+        self.stdout.write(f'Slowest {options["top"]} imports (cumulative):')
+        for name, self_us, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:options['top']]:
+            self.stdout.write(f'  {cumulative_us / 1000:>8.1f} ms  {self_us / 1000:>7.1f} ms self  {name}')
+        self.stdout.write('Import time by package (self):')
+        for name, total in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:10]:
+            self.stdout.write(f'  {total / 1000:>8.1f} ms  {name}')
+        self.stdout.write(f'Total import time: {sum(m[1] for m in modules) / 1000:.1f} ms')
+
+        self.stdout.write(f'App load (incl. warm-up): {timings["app_load"] * 1000:.1f} ms')
+        self.stdout.write(f'First request {options["url"]} ({timings["status"]}): {timings["first_request"] * 1000:.1f} ms')
+        self.stdout.write(f'Second request: {timings["second_request"] * 1000:.1f} ms')
+
+        total_ms = timings['time_to_first_response'] * 1000
+        line = f'Time to first response: {total_ms:.1f} ms (target {options["target_ms"]:.0f} ms)'
+        if total_ms <= options['target_ms']:
+            self.stdout.write(self.style.SUCCESS(line))
+        elif options['fail_over_target']:
+            raise CommandError(line)
+        else:
+            self.stdout.write(self.style.WARNING(line))
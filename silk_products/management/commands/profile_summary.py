@@ -0,0 +1,74 @@
+import shutil
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from silk_products.profiling import profile_token, read_profiles
+
+
+def function_totals(stacks):
+    """Samples per function: ``self`` where it was the leaf, ``total`` anywhere on the stack."""
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for name in set(frames):
+            total[name] += count
+    return own, total
+
+
+class Command(BaseCommand):
+    help = 'List sampled request profiles per URL name and summarize where the time went.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url_name', nargs='?', help='Only summarize this URL name (e.g. api_product_list_create).')
+        parser.add_argument('--top', type=int, default=15, help='Number of functions to list per URL name.')
+        parser.add_argument('--collapsed', metavar='FILE',
+                            help='Write the merged stacks of the selected URL name to FILE for flamegraph.pl/speedscope.')
+        parser.add_argument('--token', action='store_true',
+                            help='Print a signed X-Silk-Profile header value that forces profiling.')
+        parser.add_argument('--clear', action='store_true', help='Delete the saved profiles.')
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(profile_token())
+            return
+        if options['clear']:
+            shutil.rmtree(settings.PROFILE_DIR, ignore_errors=True)
+            self.stdout.write(self.style.SUCCESS(f'Removed profiles in {settings.PROFILE_DIR}.'))
+            return
+
+        profiles = read_profiles()
+        url_name = options['url_name']
+        if url_name:
+            key = url_name.replace(':', '.')
+            if key not in profiles:
+                raise CommandError(f'No profiles recorded for {url_name}.')
+            profiles = {key: profiles[key]}
+        elif options['collapsed']:
+            raise CommandError('--collapsed needs a URL name.')
+        if not profiles:
+            self.stdout.write(f'No profiles in {settings.PROFILE_DIR}.')
+            return
+
+        if options['collapsed']:
+            _, stacks = profiles[key]
+            Path(options['collapsed']).write_text(
+                ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+            )
+            self.stdout.write(self.style.SUCCESS(f'Wrote {len(stacks)} stacks to {options["collapsed"]}.'))
+            return
+
+        for name, (requests, stacks) in profiles.items():
+            samples = sum(stacks.values())
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}: {requests} request(s), {samples} sample(s)'))
+            if not samples:
+                continue
+            own, total = function_totals(stacks)
+            self.stdout.write(f'  {"self":>6} {"total":>6}  function')
+            for function, count in own.most_common(options['top']):
+                self.stdout.write(
+                    f'  {count / samples:>6.1%} {total[function] / samples:>6.1%}  {function}'
+                )
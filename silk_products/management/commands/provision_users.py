@@ -0,0 +1,48 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from silk_products.models import UserProfile
+from silk_products.provisioning import provision_users, read_rows
+
+
+class Command(BaseCommand):
+    help = ('Create user accounts with profiles from a CSV (with header) or JSONL file of '
+            'username, email, password, first_name, last_name, role, phone.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--role', choices=[value for value, _ in UserProfile.ROLE_CHOICES], default='seller',
+                            help='Role for rows that do not set one.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users inserted per transaction.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Password hashing processes; 0 hashes in this process.')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the rows.')
+
+    def handle(self, *args, **options):
+        try:
+            rows, errors = read_rows(options['path'], options['format'])
+        except (OSError, UnicodeDecodeError) as exc:
+            raise CommandError(f'Could not read {options["path"]}: {exc}')
+
+        result = provision_users(
+            rows, default_role=options['role'], batch_size=options['batch_size'],
+            workers=options['workers'], dry_run=options['dry_run'],
+        )
+        total = len(rows) + len(errors)
+        errors = sorted(errors + result.errors)
+        for error in errors:
+            label = f'line {error.line}' + (f' ({error.username})' if error.username else '')
+            self.stderr.write(f'{label}: {error.message}')
+
+        if options['dry_run']:
+            self.stdout.write(f'{total - len(errors)} of {total} row(s) valid.')
+            return
+        timings = result.timings
+        rate = result.created / result.elapsed if result.elapsed else 0
+        self.stdout.write(
+            f"Read {total} row(s): created {result.created} user(s) in {result.elapsed:.2f}s "
+            f"({rate:.0f} users/s; validate {timings['validate']:.2f}s, hash {timings['hash']:.2f}s, "
+            f"insert {timings['insert']:.2f}s), {len(errors)} error(s)."
+        )
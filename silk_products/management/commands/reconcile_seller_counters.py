@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from silk_products.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-seller product counters on UserProfile and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drifted = reconcile_counters(dry_run=options['dry_run'], batch_size=options['batch_size'])
+        for profile in drifted:
+            self.stdout.write(f'  {profile.user_id}: counters out of date')
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drifted)} drifted seller profile(s).'))
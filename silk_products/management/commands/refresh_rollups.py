@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from silk_products.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Refresh the analytics rollup tables from products changed since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Ignore the watermark and rebuild every seller from scratch.')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed rollups for {refreshed} seller(s).'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from silk_products.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Fold new listings, views and seller contacts since the last run into the trending scores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Ignore the watermark and recompute every score from the stored totals.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rescored = refresh_trending(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rescored {rescored} product(s).'))
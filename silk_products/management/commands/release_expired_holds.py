@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from silk_products.stock import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Return the stock of expired holds to their products. Run every minute or so from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        released = release_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired hold(s).'))
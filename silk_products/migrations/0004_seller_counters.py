@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_seller_counters(apps, schema_editor):
+    SilkProduct = apps.get_model('silk_products', 'SilkProduct')
+    UserProfile = apps.get_model('silk_products', 'UserProfile')
+    aggregates = {
+        'product_count': Count('id'),
+        'available_count': Count('id', filter=Q(availability=True)),
+    }
+    for product_type in ('saree', 'fabric', 'scarf', 'shawl'):
+        aggregates[f'{product_type}_count'] = Count('id', filter=Q(type=product_type))
+    rows = SilkProduct.objects.order_by().values('owner_id').annotate(**aggregates)
+    for row in rows:
+        owner_id = row.pop('owner_id')
+        UserProfile.objects.filter(user_id=owner_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0003_silkproduct_description_silkproduct_owner_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='available_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='fabric_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='product_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='saree_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='scarf_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='shawl_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='silkproduct',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='silkproduct',
+            index=models.Index(fields=['owner', '-created_at'], name='product_owner_created_idx'),
+        ),
+        migrations.RunPython(backfill_seller_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0005_product_change_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='silkproduct',
+            index=models.Index(fields=['-created_at', '-id'], name='product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='silkproduct',
+            index=models.Index(fields=['name'], name='product_name_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0006_product_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSilkProduct',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('type', models.CharField(choices=[('saree', 'Saree'), ('fabric', 'Fabric'), ('scarf', 'Scarf'), ('shawl', 'Shawl')], max_length=50)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('availability', models.BooleanField(default=False)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='silkproduct',
+            index=models.Index(condition=models.Q(('availability', False)), fields=['updated_at'], name='product_unavailable_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedsilkproduct',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_products', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedsilkproduct',
+            index=models.Index(fields=['owner', '-archived_at'], name='archived_owner_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0007_archived_products'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='silkproduct',
+            name='summary',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='silkproduct',
+            name='type_label',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+    ]
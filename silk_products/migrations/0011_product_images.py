@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0010_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsilkproduct',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='products/originals/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='silkproduct',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='products/originals/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='silkproduct',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='silkproduct',
+            name='thumbnail',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0013_exchange_rates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductViewCount',
+            fields=[
+                ('product', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='view_count', serialize=False, to='silk_products.silkproduct')),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
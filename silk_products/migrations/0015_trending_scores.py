@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0014_product_view_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productviewcount',
+            name='contacts',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='productviewcount',
+            name='scored_contacts',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='productviewcount',
+            name='scored_views',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='silkproduct',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='productviewcount',
+            index=models.Index(fields=['updated_at'], name='viewcount_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='silkproduct',
+            index=models.Index(fields=['-trending_score', '-id'], name='product_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:38
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+# PostgreSQL runs the admin's prefix search as UPPER(name::text) LIKE 'X%', which
+# only a pattern_ops index on that exact expression can serve.
+PATTERN_INDEXES = (
+    ('product_name_pattern_idx', 'silk_products_silkproduct'),
+    ('archived_name_pattern_idx', 'silk_products_archivedsilkproduct'),
+)
+
+
+def create_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table in PATTERN_INDEXES:
+        schema_editor.execute(f'CREATE INDEX {name} ON {table} (UPPER(name::text) varchar_pattern_ops)')
+
+
+def drop_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in PATTERN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0015_trending_scores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='silkproduct',
+            name='product_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='archivedsilkproduct',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='archived_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='silkproduct',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='product_name_upper_idx'),
+        ),
+        migrations.RunPython(create_pattern_indexes, drop_pattern_indexes),
+    ]
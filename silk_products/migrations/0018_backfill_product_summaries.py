@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.utils.text import Truncator
+
+BATCH_SIZE = 1000
+# SilkProduct.SUMMARY_WORDS when this migration was written; historical models have no class attributes.
+SUMMARY_WORDS = 15
+
+
+def backfill_product_summaries(apps, schema_editor):
+    """Fill in the summary and type label of rows that existed before 0008 added them."""
+    SilkProduct = apps.get_model('silk_products', 'SilkProduct')
+    labels = dict(SilkProduct._meta.get_field('type').choices)
+    max_length = SilkProduct._meta.get_field('summary').max_length
+    products = SilkProduct.objects.filter(type_label='').only('pk', 'type', 'description').order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(products.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        for product in batch:
+            product.type_label = labels.get(product.type, product.type)
+            product.summary = Truncator(
+                Truncator(product.description).words(SUMMARY_WORDS, truncate=' …')
+            ).chars(max_length)
+        SilkProduct.objects.bulk_update(batch, ['summary', 'type_label'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0017_shared_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_product_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('silk_products', '0018_backfill_product_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedsilkproduct',
+            name='contacts',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='archivedsilkproduct',
+            name='views',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
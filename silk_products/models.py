@@ -1,5 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Upper
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.text import Truncator
 
 
 class UserProfile(models.Model):
@@ -11,6 +16,12 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='buyer')
     phone = models.CharField(max_length=20, blank=True)
+    product_count = models.IntegerField(default=0)
+    available_count = models.IntegerField(default=0)
+    saree_count = models.IntegerField(default=0)
+    fabric_count = models.IntegerField(default=0)
+    scarf_count = models.IntegerField(default=0)
+    shawl_count = models.IntegerField(default=0)
     
     def __str__(self):
         return f"{self.user.username} ({self.get_role_display()})"
@@ -28,13 +39,313 @@ class SilkProduct(models.Model):
     type = models.CharField(max_length=50, choices=TYPE_CHOICES)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     availability = models.BooleanField(default=True)
+    stock = models.PositiveIntegerField(default=1)
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
     description = models.TextField(blank=True)
+    summary = models.CharField(max_length=300, blank=True, editable=False)
+    type_label = models.CharField(max_length=50, blank=True, editable=False)
+    image = models.ImageField(upload_to='products/originals/%Y/%m/', blank=True)
+    # Storage names of the resized copies, filled in by the thumbnail pool (see images.py).
+    thumbnail = models.CharField(max_length=200, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Log of the time-decayed activity score, maintained by refresh_trending (see trending.py).
+    trending_score = models.FloatField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    SUMMARY_WORDS = 15
+    # ``?sort=`` values for the list views.
+    SORT_ORDERS = {
+        'newest': ('-created_at',),
+        'trending': ('-trending_score', '-id'),
+    }
+    LIST_DEFERRED_FIELDS = ('description', 'image', 'image_variants')
+    CONCURRENT_FIELDS = ('thumbnail', 'image_variants', 'stock', 'trending_score')
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', '-created_at'], name='product_owner_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='product_created_idx'),
+            models.Index(Upper('name'), name='product_name_upper_idx'),
+            models.Index(fields=['updated_at'], condition=models.Q(availability=False), name='product_unavailable_idx'),
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+            models.Index(fields=['-trending_score', '-id'], name='product_trending_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def summarize(cls, description):
+        summary = Truncator(description).words(cls.SUMMARY_WORDS, truncate=' …')
+        return Truncator(summary).chars(cls._meta.get_field('summary').max_length)
+
+    def refresh_derived_fields(self):
+        """Recompute the stored summary and type label; returns the fields that were set."""
+        fields = ['type_label']
+        self.type_label = self.get_type_display()
+        if 'description' not in self.get_deferred_fields():
+            self.summary = self.summarize(self.description)
+            fields.append('summary')
+        if 'image' not in self.get_deferred_fields() and self.image_changed():
+            self.thumbnail = ''
+            self.image_variants = {}
+            fields += ['thumbnail', 'image_variants']
+        return fields
+
+    def image_changed(self):
+        return (self.image.name or '') != (getattr(self, '_loaded_values', {}).get('image') or '')
+
+    @property
+    def thumbnail_url(self):
+        return default_storage.url(self.thumbnail) if self.thumbnail else ''
+
+    def image_variant_urls(self):
+        return {name: default_storage.url(path) for name, path in self.image_variants.items()}
+
+    def stock_delta(self):
+        loaded = getattr(self, '_loaded_values', {}).get('stock')
+        if 'stock' in self.get_deferred_fields() or loaded is None:
+            return 0
+        return self.stock - loaded
+
+    def save(self, *args, **kwargs):
+        derived = self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        stock_delta = 0
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(derived)
+        elif not self._state.adding:
+            # The thumbnail pool, stock holds and refresh_trending write these columns concurrently;
+            # don't overwrite them from a stale instance.
+            skip = set(self.CONCURRENT_FIELDS) - set(derived)
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred and field.name not in skip
+            ]
+            stock_delta = self.stock_delta()
+        super().save(*args, **kwargs)
+        if stock_delta:
+            # Apply an edited stock level as a delta so holds taken meanwhile still count.
+            products = type(self).objects.filter(pk=self.pk)
+            products.update(stock=Greatest(F('stock') + stock_delta, 0))
+            self.stock = products.values_list('stock', flat=True).get()
+            self._loaded_values['stock'] = self.stock
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+
+class ProductChange(models.Model):
+    product = models.ForeignKey(SilkProduct, on_delete=models.DO_NOTHING, db_constraint=False, related_name='changes')
+    owner = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='product_changes')
+    field = models.CharField(max_length=50)
+    old_value = models.TextField(blank=True)
+    new_value = models.TextField(blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['product', '-changed_at'], name='change_product_idx'),
+            models.Index(fields=['owner', '-changed_at'], name='change_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.field}: {self.old_value} -> {self.new_value}"
+
+
+
+class SimilarProduct(models.Model):
+    """Precomputed nearest neighbours of a product, written by compute_similar_products."""
+    product = models.ForeignKey(SilkProduct, on_delete=models.CASCADE, related_name='similar_links')
+    similar = models.ForeignKey(SilkProduct, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_similar_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} ~ {self.similar_id} ({self.score:.3f})"
+
+
+class ArchivedSilkProduct(models.Model):
+    """Cold storage for listings moved out of SilkProduct; keeps the original id."""
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    type = models.CharField(max_length=50, choices=SilkProduct.TYPE_CHOICES)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    availability = models.BooleanField(default=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_products')
+    description = models.TextField(blank=True)
+    image = models.ImageField(upload_to='products/originals/%Y/%m/', blank=True)
+    stock = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    # ProductViewCount totals; the row is deleted with the product and recreated on restore.
+    views = models.PositiveBigIntegerField(default=0)
+    contacts = models.PositiveBigIntegerField(default=0)
+
+    ARCHIVED_FIELDS = (
+        'id', 'name', 'type', 'price', 'availability', 'owner_id', 'description', 'image', 'stock',
+        'created_at', 'updated_at',
+    )
+
+    class Meta:
+        ordering = ['-archived_at']
+        indexes = [
+            models.Index(fields=['owner', '-archived_at'], name='archived_owner_idx'),
+            models.Index(Upper('name'), name='archived_name_upper_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    @classmethod
+    def from_product(cls, product):
+        return cls(**{field: getattr(product, field) for field in cls.ARCHIVED_FIELDS})
+
+    def restore(self):
+        """Move this listing back into the hot table under its original id."""
+        with transaction.atomic():
+            fields = {field: getattr(self, field) for field in self.ARCHIVED_FIELDS if field != 'created_at'}
+            product = SilkProduct.objects.create(**fields)
+            SilkProduct.objects.filter(pk=product.pk).update(created_at=self.created_at)
+            product.created_at = self.created_at
+            if self.views or self.contacts:
+                # Already part of the old trending score, so not new activity.
+                ProductViewCount.objects.create(
+                    product=product, views=self.views, contacts=self.contacts,
+                    scored_views=self.views, scored_contacts=self.contacts,
+                )
+            self.delete()
+        return product
+
+
+
+class CatalogRollup(models.Model):
+    """Current listing totals per (seller, type), refreshed incrementally by refresh_rollups."""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    type = models.CharField(max_length=50, choices=SilkProduct.TYPE_CHOICES)
+    listing_count = models.IntegerField(default=0)
+    available_count = models.IntegerField(default=0)
+    price_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'type'], name='unique_catalog_rollup'),
+        ]
+
+
+class DailyRollup(models.Model):
+    DIMENSION_CHOICES = [
+        ('type', 'Product type'),
+        ('seller', 'Seller'),
+    ]
+
+    date = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=50)
+    listing_count = models.IntegerField(default=0)
+    available_count = models.IntegerField(default=0)
+    price_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key', 'date'], name='unique_daily_rollup'),
+        ]
+
+    @property
+    def average_price(self):
+        return self.price_total / self.listing_count if self.listing_count else None
+
+    @property
+    def availability_ratio(self):
+        return self.available_count / self.listing_count if self.listing_count else None
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+
+class SharedVersion(models.Model):
+    """A counter bumped on writes so every process can tell its caches are stale."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField()
+
+
+class RollupPendingOwner(models.Model):
+    """Sellers whose rollups must be recomputed because a product was deleted."""
+    owner_id = models.BigIntegerField(unique=True)
+
+
+class StockHold(models.Model):
+    """Units of a product set aside for a buyer until ``expires_at``."""
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+
+    product = models.ForeignKey(SilkProduct, on_delete=models.CASCADE, related_name='holds')
+    buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_holds')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['expires_at'], condition=models.Q(status='held'), name='hold_active_expiry_idx'),
+            models.Index(fields=['buyer', '-created_at'], name='hold_buyer_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} ({self.status})"
+
+
+class ExchangeRate(models.Model):
+    """Units of ``currency`` per one unit of settings.BASE_CURRENCY, loaded by load_exchange_rates."""
+    currency = models.CharField(max_length=3, unique=True)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.currency} {self.rate}"
+
+
+class ProductViewCount(models.Model):
+    """
+    View and seller-contact totals per product; views are buffered in memory
+    first (see viewcounts.py). The scored_* columns are the totals already
+    folded into the trending score.
+    """
+    product = models.OneToOneField(SilkProduct, on_delete=models.CASCADE, primary_key=True,
+                                   db_constraint=False, related_name='view_count')
+    views = models.PositiveBigIntegerField(default=0)
+    contacts = models.PositiveBigIntegerField(default=0)
+    scored_views = models.PositiveBigIntegerField(default=0)
+    scored_contacts = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='viewcount_updated_idx'),
+        ]
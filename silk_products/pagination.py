@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class KnownCountPaginator(Paginator):
+    """
+    A paginator that shows a precomputed total instead of running COUNT(*).
+    The total only sets the page numbers shown: each page is sliced from the
+    queryset with one extra row to tell whether another page follows, and
+    the total is corrected from what the slice returns. A counter that has
+    drifted can't hide rows or leave empty pages at the end.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+        self.__dict__['count'] = count
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + self.orphans + 1])
+        if len(rows) > self.per_page + self.orphans:
+            rows = rows[:self.per_page]
+            count = max(self.known_count, bottom + self.per_page + self.orphans + 1)
+        elif rows or number == 1:
+            count = bottom + len(rows)
+        else:
+            # Past the end: the counter was too high, so count for real.
+            count = self.object_list.count()
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage(self.error_messages['no_results'])
+        return self._get_page(rows, number, self)
+
+
+def estimate_row_count(model, using='default'):
+    """Row count from the database's planner statistics, or None if unavailable."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses planner statistics instead of COUNT(*) for unfiltered querysets on
+    large tables; filtered querysets and small tables still count exactly.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_row_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate >= settings.ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
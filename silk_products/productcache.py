@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import SilkProduct
+
+KEY_PREFIX = 'product:v1:'
+
+
+def product_key(pk):
+    return f'{KEY_PREFIX}{pk}'
+
+
+def product_queryset():
+    # Everything the detail page and API render, owner and profile included;
+    # the password hash stays out of the cache.
+    return SilkProduct.objects.select_related('owner', 'owner__userprofile').defer('owner__password')
+
+
+def get_products(pks):
+    """
+    Cache-aside lookup of several products: one ``get_many`` for all of them
+    and one ``pk__in`` query for the misses, which are then cached. Returns
+    ``{pk: product}``; ids that don't exist are left out.
+    """
+    pks = list(dict.fromkeys(int(pk) for pk in pks))
+    if not pks:
+        return {}
+    cached = cache.get_many([product_key(pk) for pk in pks])
+    products = {pk: cached[product_key(pk)] for pk in pks if product_key(pk) in cached}
+    missing = [pk for pk in pks if pk not in products]
+    if missing:
+        loaded = product_queryset().in_bulk(missing)
+        cache.set_many({product_key(pk): product for pk, product in loaded.items()},
+                       settings.PRODUCT_CACHE_TIMEOUT)
+        products.update(loaded)
+    return products
+
+
+def get_product(pk):
+    return get_products([pk]).get(int(pk))
+
+
+def invalidate_products(pks):
+    """
+    Drop cached copies now and again on commit, so a reader that loaded the
+    old row before the commit can't keep it cached for long. Anything that
+    still slips through, and every copy held by other processes when the
+    cache isn't shared, expires after PRODUCT_CACHE_TIMEOUT.
+    """
+    keys = [product_key(pk) for pk in pks]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_owner_products(owner_id):
+    invalidate_products(SilkProduct.objects.filter(owner_id=owner_id).values_list('pk', flat=True))
@@ -0,0 +1,147 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+PROFILE_HEADER = 'HTTP_X_SILK_PROFILE'
+TOKEN_SALT = 'silk_products.profiling'
+
+logger = logging.getLogger(__name__)
+
+
+def profile_token():
+    """Signed value for the ``X-Silk-Profile`` header that forces a request to be profiled."""
+    return signing.dumps('profile', salt=TOKEN_SALT)
+
+
+def valid_token(value):
+    try:
+        signing.loads(value, salt=TOKEN_SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}"
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack from a background thread every
+    ``interval`` seconds and counts identical stacks, root first.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+def write_profile(url_name, stacks, duration, directory=None):
+    """
+    Write one request's samples in collapsed-stack format (``a;b;c count``,
+    as read by flamegraph.pl and speedscope) under ``<dir>/<url_name>/``,
+    then drop that URL name's oldest files beyond PROFILE_MAX_FILES.
+    """
+    directory = Path(directory or settings.PROFILE_DIR) / url_name.replace(':', '.')
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{time.time_ns()}-{os.getpid()}-{int(duration * 1000)}ms.collapsed'
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(''.join(f'{stack} {count}\n' for stack, count in stacks.most_common()))
+    os.replace(tmp, path)
+    prune_profiles(directory, settings.PROFILE_MAX_FILES)
+    return path
+
+
+def prune_profiles(directory, keep):
+    """Delete all but the newest ``keep`` profiles in one URL name's directory."""
+    files = sorted(Path(directory).glob('*.collapsed'), key=lambda path: int(path.name.partition('-')[0]))
+    for path in files[:max(len(files) - keep, 0)]:
+        # Another worker may be pruning the same directory.
+        path.unlink(missing_ok=True)
+
+
+def read_profiles(directory=None):
+    """Aggregate every saved profile: ``{url_name: (requests, Counter of stacks)}``."""
+    directory = Path(directory or settings.PROFILE_DIR)
+    profiles = {}
+    if not directory.is_dir():
+        return profiles
+    for endpoint in sorted(p for p in directory.iterdir() if p.is_dir()):
+        stacks = Counter()
+        files = list(endpoint.glob('*.collapsed'))
+        for path in files:
+            for line in path.read_text().splitlines():
+                stack, _, count = line.rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+        profiles[endpoint.name] = (len(files), stacks)
+    return profiles
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profiles a random PROFILE_SAMPLE_RATE share of requests, plus any request
+    carrying a valid signed ``X-Silk-Profile`` header. Unsampled requests
+    cost one random() call and a header lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        rate = settings.PROFILE_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return True
+        token = request.META.get(PROFILE_HEADER)
+        return bool(token) and valid_token(token)
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), settings.PROFILE_INTERVAL_MS / 1000).start()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        url_name = match.view_name if match else 'unresolved'
+        try:
+            write_profile(url_name, stacks, duration)
+        except OSError:
+            logger.exception('Could not write profile for %s', url_name)
+        return response
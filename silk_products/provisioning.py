@@ -0,0 +1,217 @@
+import csv
+import json
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .hashing import hash_passwords, init_worker
+from .models import UserProfile
+
+FIELDS = ('username', 'email', 'password', 'first_name', 'last_name', 'role', 'phone')
+# Passwords per task sent to a hashing worker.
+HASH_CHUNK = 16
+
+RowError = namedtuple('RowError', 'line username message')
+
+
+class ProvisionResult:
+    def __init__(self):
+        self.read = 0
+        self.created = 0
+        self.errors = []
+        self.timings = {'validate': 0.0, 'hash': 0.0, 'insert': 0.0}
+
+    @property
+    def elapsed(self):
+        return sum(self.timings.values())
+
+
+def read_rows(path, fmt=None):
+    """
+    Read account rows from a CSV file with a header or a JSONL file. Returns
+    ``(rows, errors)`` where rows are ``(line, dict)`` pairs.
+    """
+    path = Path(path)
+    fmt = fmt or ('jsonl' if path.suffix in ('.jsonl', '.ndjson') else 'csv')
+    rows, errors = [], []
+    with path.open(newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                rows.append((reader.line_num, row))
+        else:
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError as exc:
+                    errors.append(RowError(line, '', f'Invalid JSON: {exc}'))
+                    continue
+                if not isinstance(row, dict):
+                    errors.append(RowError(line, '', 'Expected a JSON object'))
+                    continue
+                rows.append((line, row))
+    return rows, errors
+
+
+def clean_row(row, default_role):
+    """Validate one row the way the registration form would; raises ValidationError."""
+    data = {field: str(row.get(field) or '').strip() for field in FIELDS}
+    data['password'] = str(row.get('password') or '')
+    data['role'] = data['role'] or default_role
+
+    messages = []
+    if not data['username']:
+        messages.append('username is required')
+    else:
+        try:
+            User.username_validator(data['username'])
+        except ValidationError as exc:
+            messages.extend(exc.messages)
+    if data['email']:
+        try:
+            validate_email(data['email'])
+        except ValidationError as exc:
+            messages.extend(exc.messages)
+    if data['role'] not in dict(UserProfile.ROLE_CHOICES):
+        messages.append(f"role must be one of {', '.join(dict(UserProfile.ROLE_CHOICES))}")
+    for field in ('username', 'email', 'first_name', 'last_name'):
+        limit = User._meta.get_field(field).max_length
+        if len(data[field]) > limit:
+            messages.append(f'{field} is longer than {limit} characters')
+    if len(data['phone']) > UserProfile._meta.get_field('phone').max_length:
+        messages.append('phone is too long')
+    if data['password'] and not messages:
+        try:
+            validate_password(data['password'], User(
+                username=data['username'], email=data['email'],
+                first_name=data['first_name'], last_name=data['last_name'],
+            ))
+        except ValidationError as exc:
+            messages.extend(exc.messages)
+    if messages:
+        raise ValidationError(messages)
+    return data
+
+
+def existing_usernames(usernames, chunk_size=500):
+    usernames = sorted({name.lower() for name in usernames})
+    existing = set()
+    for start in range(0, len(usernames), chunk_size):
+        existing.update(
+            User.objects.annotate(lower=Lower('username'))
+            .filter(lower__in=usernames[start:start + chunk_size])
+            .values_list('lower', flat=True)
+        )
+    return existing
+
+
+def hash_all(passwords, workers):
+    """Hash in a spawned process pool (or inline with ``workers=0``); empty passwords become unusable."""
+    if not workers:
+        return hash_passwords([password or None for password in passwords])
+    chunks = [
+        [password or None for password in passwords[start:start + HASH_CHUNK]]
+        for start in range(0, len(passwords), HASH_CHUNK)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'silk_catalog.settings'),),
+    ) as pool:
+        return [encoded for chunk in pool.map(hash_passwords, chunks) for encoded in chunk]
+
+
+def build_user(data, encoded):
+    return User(
+        username=data['username'], email=data['email'], password=encoded,
+        first_name=data['first_name'], last_name=data['last_name'],
+    )
+
+
+def insert_chunk(chunk, result):
+    """Insert users and their profiles with two bulk INSERTs in one transaction."""
+    with transaction.atomic():
+        users = User.objects.bulk_create([build_user(data, encoded) for _, data, encoded in chunk])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, role=data['role'], phone=data['phone'])
+            for user, (_, data, _) in zip(users, chunk)
+        ])
+    result.created += len(users)
+
+
+def insert_rows_one_by_one(chunk, result):
+    # A conflicting insert (e.g. a username registered meanwhile) fails the whole
+    # chunk; retry its rows individually so only the offending ones are reported.
+    for line, data, encoded in chunk:
+        try:
+            with transaction.atomic():
+                user = build_user(data, encoded)
+                user.save()
+                UserProfile.objects.create(user=user, role=data['role'], phone=data['phone'])
+        except IntegrityError as exc:
+            result.errors.append(RowError(line, data['username'], f'Could not insert: {exc}'))
+        else:
+            result.created += 1
+
+
+def provision_users(rows, default_role='seller', batch_size=500, workers=None, dry_run=False):
+    """
+    Validate ``(line, row)`` pairs, hash their passwords in a process pool and
+    insert users with profiles in chunked transactions of ``batch_size``.
+    Invalid rows are skipped and reported in ``result.errors``.
+    """
+    result = ProvisionResult()
+    result.read = len(rows)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    valid, seen = [], set()
+    for line, row in rows:
+        try:
+            data = clean_row(row, default_role)
+        except ValidationError as exc:
+            result.errors.append(RowError(line, str(row.get('username') or ''), '; '.join(exc.messages)))
+            continue
+        key = data['username'].lower()
+        if key in seen:
+            result.errors.append(RowError(line, data['username'], 'Duplicate username in input'))
+            continue
+        seen.add(key)
+        valid.append((line, data))
+    existing = existing_usernames(seen)
+    for line, data in valid:
+        if data['username'].lower() in existing:
+            result.errors.append(RowError(line, data['username'], 'A user with that username already exists'))
+    valid = [(line, data) for line, data in valid if data['username'].lower() not in existing]
+    result.timings['validate'] = time.perf_counter() - start
+    if dry_run or not valid:
+        return result
+
+    start = time.perf_counter()
+    hashed = hash_all([data['password'] for _, data in valid], workers)
+    result.timings['hash'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prepared = [(line, data, encoded) for (line, data), encoded in zip(valid, hashed)]
+    for offset in range(0, len(prepared), batch_size):
+        chunk = prepared[offset:offset + batch_size]
+        try:
+            insert_chunk(chunk, result)
+        except IntegrityError:
+            insert_rows_one_by_one(chunk, result)
+    result.timings['insert'] = time.perf_counter() - start
+    return result
@@ -0,0 +1,150 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import CatalogRollup, DailyRollup, RollupPendingOwner, RollupWatermark, SilkProduct
+
+WATERMARK = 'catalog'
+OWNER_CHUNK_SIZE = 500
+
+
+def mark_owners_dirty(owner_ids):
+    """Queue sellers whose rollups can't be found from updated_at (deleted or moved products)."""
+    RollupPendingOwner.objects.bulk_create(
+        [RollupPendingOwner(owner_id=owner_id) for owner_id in owner_ids if owner_id is not None],
+        ignore_conflicts=True,
+    )
+
+
+def touched_owners(since):
+    """Sellers with a product changed after ``since``, plus any queued by deletes."""
+    products = SilkProduct.objects.all()
+    if since is not None:
+        products = products.filter(updated_at__gt=since)
+    owners = set(products.order_by().values_list('owner_id', flat=True).distinct())
+    pending = set(RollupPendingOwner.objects.values_list('owner_id', flat=True))
+    return owners | pending, pending
+
+
+def rebuild_catalog_rollups(owner_ids):
+    """Recompute the (seller, type) rows of ``owner_ids`` from the products table."""
+    owner_ids = list(owner_ids)
+    for start in range(0, len(owner_ids), OWNER_CHUNK_SIZE):
+        chunk = owner_ids[start:start + OWNER_CHUNK_SIZE]
+        groups = (
+            SilkProduct.objects.filter(owner_id__in=chunk)
+            .order_by()
+            .values('owner_id', 'type')
+            .annotate(
+                listing_count=Count('id'),
+                available_count=Count('id', filter=Q(availability=True)),
+                price_total=Sum('price'),
+            )
+        )
+        rows = [CatalogRollup(**group) for group in groups]
+        CatalogRollup.objects.filter(owner_id__in=chunk).delete()
+        CatalogRollup.objects.bulk_create(rows)
+
+
+def write_daily(date, dimension, totals):
+    DailyRollup.objects.filter(date=date, dimension=dimension, key__in=list(totals)).delete()
+    DailyRollup.objects.bulk_create([
+        DailyRollup(date=date, dimension=dimension, key=key, **values)
+        for key, values in totals.items()
+    ])
+
+
+def rollup_totals(group_by, **filters):
+    groups = (
+        CatalogRollup.objects.filter(**filters)
+        .order_by()
+        .values(group_by)
+        .annotate(
+            listing_count=Sum('listing_count'),
+            available_count=Sum('available_count'),
+            price_total=Sum('price_total'),
+        )
+    )
+    return {
+        str(group.pop(group_by)): {
+            'listing_count': group['listing_count'] or 0,
+            'available_count': group['available_count'] or 0,
+            'price_total': group['price_total'] or Decimal('0'),
+        }
+        for group in groups
+    }
+
+
+def refresh_rollups(full=False, now=None):
+    """
+    Bring the rollup tables up to date with products changed since the last
+    run. Only sellers with changed products are recomputed; today's per-type
+    rows are summed from CatalogRollup, so neither step scans the catalog.
+    Returns the number of sellers refreshed.
+
+    The watermark is set ROLLUP_WATERMARK_LAG_MINUTES before ``now``: a row
+    stamped before ``now`` by a transaction still open at that point only
+    becomes visible later, and the overlap lets the next run pick it up.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+        since = None if full or watermark is None else watermark.value
+        if since is None:
+            CatalogRollup.objects.all().delete()
+        owners, pending = touched_owners(since)
+
+        rebuild_catalog_rollups(owners)
+
+        seller_totals = rollup_totals('owner_id', owner_id__in=owners) if since is not None else rollup_totals('owner_id')
+        for owner_id in owners:
+            seller_totals.setdefault(str(owner_id), {
+                'listing_count': 0, 'available_count': 0, 'price_total': Decimal('0'),
+            })
+        write_daily(today, 'seller', seller_totals)
+
+        type_totals = rollup_totals('type')
+        for value, _ in SilkProduct.TYPE_CHOICES:
+            type_totals.setdefault(value, {'listing_count': 0, 'available_count': 0, 'price_total': Decimal('0')})
+        write_daily(today, 'type', type_totals)
+
+        RollupPendingOwner.objects.filter(owner_id__in=pending).delete()
+        lag = timedelta(minutes=settings.ROLLUP_WATERMARK_LAG_MINUTES)
+        RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': now - lag})
+    return len(owners)
+
+
+def series(dimension, keys=None, start=None, end=None):
+    """
+    Daily rows for ``dimension``, one per key and day. A seller only gets a
+    row on days their listings changed, so missing days carry the previous
+    row forward.
+    """
+    rows = DailyRollup.objects.filter(dimension=dimension)
+    if keys is not None:
+        rows = rows.filter(key__in=[str(key) for key in keys])
+    if end is not None:
+        rows = rows.filter(date__lte=end)
+
+    latest = {}
+    if start is not None:
+        for row in rows.filter(date__lt=start).order_by('key', '-date'):
+            latest.setdefault(row.key, row)
+        rows = rows.filter(date__gte=start)
+
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(row.date, []).append(row)
+
+    result = []
+    for day in sorted(by_day):
+        for row in by_day[day]:
+            latest[row.key] = row
+        for key, row in sorted(latest.items()):
+            result.append((day, key, row))
+    return result
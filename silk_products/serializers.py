@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import SilkProduct, UserProfile
+from django.db import transaction
+from .models import ArchivedSilkProduct, SilkProduct, StockHold, UserProfile
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -22,8 +23,10 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         validated_data.pop('password_confirm')
         role = validated_data.pop('role', 'buyer')
         phone = validated_data.pop('phone', '')
-        
-        user = User.objects.create_user(**validated_data)
+
+        with transaction.atomic():
+            user = User.objects.create_user(**validated_data)
+            UserProfile.objects.create(user=user, role=role, phone=phone)
         return user
 
 
@@ -33,9 +36,136 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'date_joined')
 
 
-class SilkProductSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Serialize only the fields named in the ``fields`` context entry (set from ``?fields=``)."""
+
+    # Model columns read by fields that aren't model fields themselves.
+    COMPUTED_FIELD_SOURCES = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        if requested is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in requested}
+
+    @classmethod
+    def parse_fields(cls, value):
+        """Validate a comma-separated ``?fields=`` value; returns the field names or None if not given."""
+        if not value:
+            return None
+        requested = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        allowed = cls().fields
+        unknown = [name for name in requested if name not in allowed]
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': f"Unknown field(s) {', '.join(unknown)}; choose from {', '.join(allowed)}",
+            })
+        return requested
+
+    @classmethod
+    def columns(cls, fields):
+        """Model fields to load with only() for the given serializer fields."""
+        columns = []
+        for name in fields:
+            columns.extend(cls.COMPUTED_FIELD_SOURCES.get(name, [name]))
+        return columns
+
+
+class SilkProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     owner = serializers.PrimaryKeyRelatedField(read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = SilkProduct
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    def absolute_url(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None and url else url or None
+
+    def get_thumbnail(self, obj):
+        return self.absolute_url(obj.thumbnail_url)
+
+    def get_image_variants(self, obj):
+        return {name: self.absolute_url(url) for name, url in obj.image_variant_urls().items()}
+
+
+class SilkProductDetailSerializer(SilkProductSerializer):
+    similar = serializers.SerializerMethodField()
+
+    COMPUTED_FIELD_SOURCES = {'similar': []}
+
+    def get_similar(self, obj):
+        return list(obj.similar_links.order_by('rank').values_list('similar_id', flat=True))
+
+
+class SilkProductListSerializer(SilkProductSerializer):
+    image_variants = None
+
+    class Meta:
+        model = SilkProduct
+        exclude = SilkProduct.LIST_DEFERRED_FIELDS
+
+
+class SellerProductSerializer(SilkProductListSerializer):
+    """Dashboard rows: list fields plus the flushed view count."""
+    views = serializers.IntegerField(read_only=True)
+
+    COMPUTED_FIELD_SOURCES = {'views': []}
+
+
+class ArchivedSilkProductSerializer(serializers.ModelSerializer):
+    owner = serializers.PrimaryKeyRelatedField(read_only=True)
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedSilkProduct
+        exclude = ('views', 'contacts')
+
+    def get_archived(self, obj):
+        return True
+
+
+class BulkProductUpdateSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=SilkProduct.TYPE_CHOICES, required=False)
+    available = serializers.BooleanField(required=False, allow_null=True, default=None)
+    search = serializers.CharField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    set_availability = serializers.BooleanField(required=False, allow_null=True, default=None)
+    price_percent = serializers.DecimalField(max_digits=6, decimal_places=2, required=False, min_value=-100)
+    price_amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        changes = [
+            attrs.get('set_availability') is not None,
+            'price_percent' in attrs,
+            'price_amount' in attrs,
+        ]
+        if sum(changes) != 1:
+            raise serializers.ValidationError(
+                "Provide exactly one of set_availability, price_percent or price_amount"
+            )
+        return attrs
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    dimension = serializers.ChoiceField(choices=['type', 'seller'], default='type')
+    key = serializers.CharField(required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+
+class StockHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockHold
+        fields = ['id', 'product', 'quantity', 'status', 'created_at', 'expires_at']
+        read_only_fields = ['product', 'status', 'created_at', 'expires_at']
+        extra_kwargs = {'quantity': {'min_value': 1}}
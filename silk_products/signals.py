@@ -0,0 +1,159 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .bulk import products_bulk_updated
+from .changelog import LOGGED_FIELDS, log_product_changes
+from .counters import apply_deltas, product_state, state_deltas
+from .events import EVENT_FIELDS, product_event_data, publish
+from .images import generate_variants
+from .listcache import bump_catalog_version_on_commit, product_list_cache
+from .currency import bump_rates_version
+from .models import ExchangeRate, SilkProduct, UserProfile
+from .productcache import invalidate_owner_products, invalidate_products
+from .rollups import mark_owners_dirty
+from . import suggest
+
+TRACKED_FIELDS = LOGGED_FIELDS
+
+# User fields copied into cached products (see productcache.product_queryset).
+CACHED_OWNER_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+def current_values(instance):
+    return {field: getattr(instance, field) for field in TRACKED_FIELDS}
+
+
+@receiver(pre_save, sender=SilkProduct)
+def load_previous_values(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    if all(field in loaded for field in TRACKED_FIELDS):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+    if previous is not None:
+        instance._loaded_values = {**previous, **loaded}
+
+
+@receiver(post_save, sender=SilkProduct)
+def product_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_values = current_values(instance)
+    old_values = None if created else getattr(instance, '_loaded_values', None)
+    if created or old_values is not None:
+        old_state = product_state(old_values) if old_values is not None else None
+        new_state = product_state(new_values)
+        if old_state != new_state:
+            apply_deltas(state_deltas(old_state, new_state))
+    if old_values is not None:
+        log_product_changes(instance, old_values, new_values)
+        if old_values['owner_id'] != new_values['owner_id']:
+            mark_owners_dirty([old_values['owner_id']])
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), **new_values}
+
+
+@receiver(pre_delete, sender=SilkProduct)
+def product_deleted(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    values = {field: loaded[field] if field in loaded else getattr(instance, field) for field in ('owner_id', 'type', 'availability')}
+    apply_deltas(state_deltas(old_state=product_state(values)))
+    mark_owners_dirty([values['owner_id']])
+
+
+# The index only learns about committed rows; a rolled back save or delete
+# leaves it untouched.
+@receiver(post_save, sender=SilkProduct)
+def update_suggest_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        pk, name, product_type = instance.pk, instance.name, instance.type
+        transaction.on_commit(lambda: suggest.product_saved(pk, name, product_type))
+
+
+@receiver(post_delete, sender=SilkProduct)
+def remove_from_suggest_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: suggest.product_deleted(pk))
+
+
+@receiver(post_save, sender=SilkProduct)
+def publish_product_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    data = product_event_data({field: getattr(instance, field) for field in EVENT_FIELDS})
+    kind = 'created' if created else 'updated'
+    transaction.on_commit(lambda: publish(kind, data))
+
+
+@receiver(post_delete, sender=SilkProduct)
+def publish_product_deleted(sender, instance, **kwargs):
+    data = product_event_data({'id': instance.pk, 'type': instance.type, 'owner_id': instance.owner_id})
+    transaction.on_commit(lambda: publish('deleted', data))
+
+
+@receiver(products_bulk_updated, sender=SilkProduct)
+def publish_bulk_updated(sender, pks, **kwargs):
+    rows = [product_event_data(values) for values in sender.objects.filter(pk__in=pks).values(*EVENT_FIELDS)]
+
+    def send():
+        for data in rows:
+            publish('updated', data)
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=SilkProduct)
+def schedule_image_variants(sender, instance, raw=False, **kwargs):
+    if raw or 'image' in instance.get_deferred_fields() or not instance.image_changed():
+        return
+    image_name = instance.image.name
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), 'image': image_name}
+    if image_name:
+        transaction.on_commit(lambda: generate_variants(instance.pk, image_name))
+
+
+@receiver(post_save, sender=SilkProduct)
+@receiver(post_delete, sender=SilkProduct)
+@receiver(products_bulk_updated, sender=SilkProduct)
+def invalidate_product_lists(sender, raw=False, **kwargs):
+    if raw:
+        return
+    # Drop this process's lists now so the transaction doesn't read its own
+    # stale lists, and bump the shared version once the write is visible so
+    # every other process drops theirs (once per transaction).
+    product_list_cache.clear()
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_save, sender=SilkProduct)
+@receiver(post_delete, sender=SilkProduct)
+def invalidate_cached_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_products([instance.pk])
+
+
+@receiver(products_bulk_updated, sender=SilkProduct)
+def invalidate_cached_products(sender, pks, **kwargs):
+    invalidate_products(pks)
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_cached_products(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logins save only last_login; skip those.
+    if raw or created or (update_fields is not None and not CACHED_OWNER_FIELDS & set(update_fields)):
+        return
+    invalidate_owner_products(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_profile_cached_products(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_owner_products(instance.user_id)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def invalidate_rate_tables(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(bump_rates_version)
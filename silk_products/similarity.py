@@ -0,0 +1,114 @@
+import math
+import re
+from array import array
+from collections import Counter, namedtuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r'[^\W\d_]{2,}')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def product_tokens(name, product_type, description):
+    # The name is the strongest signal, so it counts twice.
+    return tokenize(name) * 2 + tokenize(product_type) + tokenize(description)
+
+
+class SparseRows(namedtuple('SparseRows', 'indptr indices data columns')):
+    """Rows in CSR form: row i has values ``data[indptr[i]:indptr[i + 1]]`` in columns ``indices[...]``."""
+
+    @property
+    def rows(self):
+        return len(self.indptr) - 1
+
+    def dense(self, start, stop):
+        block = np.zeros((stop - start, self.columns), dtype=np.float32)
+        lo, hi = self.indptr[start], self.indptr[stop]
+        row_of = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        block[row_of, self.indices[lo:hi]] = self.data[lo:hi]
+        return block
+
+
+def document_frequencies(documents):
+    """Count the documents each term occurs in; returns ``(Counter, number of documents)``."""
+    document_frequency = Counter()
+    n = 0
+    for tokens in documents:
+        document_frequency.update(set(tokens))
+        n += 1
+    return document_frequency, n
+
+
+def build_vocabulary(document_frequency, max_features):
+    """Keep the ``max_features`` terms that occur in the most documents (ignoring singletons)."""
+    terms = [term for term, df in document_frequency.most_common(max_features) if df > 1]
+    return {term: i for i, term in enumerate(terms)}
+
+
+def tfidf_rows(documents, vocabulary, document_frequency, n):
+    """
+    Sparse float32 TF-IDF rows (sublinear tf, smoothed idf), L2-normalised so
+    a dot product is a cosine similarity. ``documents`` is iterated once and
+    only the non-zero weights are kept.
+    """
+    idf = {term: math.log((1 + n) / (1 + document_frequency[term])) + 1 for term in vocabulary}
+    indptr, indices, data = [0], array('i'), array('f')
+    for tokens in documents:
+        counts = Counter(token for token in tokens if token in vocabulary)
+        weights = {vocabulary[term]: (1 + math.log(count)) * idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        for column in sorted(weights):
+            indices.append(column)
+            data.append(weights[column] / norm)
+        indptr.append(len(indices))
+    return SparseRows(
+        np.array(indptr, dtype=np.int64),
+        np.frombuffer(indices, dtype=np.int32) if indices else np.zeros(0, dtype=np.int32),
+        np.frombuffer(data, dtype=np.float32) if data else np.zeros(0, dtype=np.float32),
+        len(vocabulary),
+    )
+
+
+def tfidf_matrix(documents, max_features=4096):
+    """TF-IDF rows for an in-memory list of token lists."""
+    document_frequency, n = document_frequencies(documents)
+    return tfidf_rows(documents, build_vocabulary(document_frequency, max_features), document_frequency, n)
+
+
+def top_k_neighbours(matrix, k, chunk_size=1000):
+    """
+    Yield ``(row, neighbour_rows, scores)`` for every row, best first (ties
+    by row). Each chunk of rows is scored against the catalog one dense
+    ``chunk_size`` block at a time, keeping a running top ``k``, so memory
+    is bounded by a few ``chunk_size x columns`` blocks whatever the size of
+    the catalog.
+    """
+    n = matrix.rows
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        rows = matrix.dense(start, stop)
+        best_scores = np.full((stop - start, k), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((stop - start, k), dtype=np.int64)
+        for block_start in range(0, n, chunk_size):
+            block_stop = min(block_start + chunk_size, n)
+            scores = rows @ matrix.dense(block_start, block_stop).T
+            # A row is not its own neighbour.
+            for row in range(max(start, block_start), min(stop, block_stop)):
+                scores[row - start, row - block_start] = -np.inf
+            block_ids = np.broadcast_to(np.arange(block_start, block_stop), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            ids = np.concatenate([best_ids, block_ids], axis=1)
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_ids = np.take_along_axis(ids, keep, axis=1)
+        for offset in range(stop - start):
+            order = np.lexsort((best_ids[offset], -best_scores[offset]))
+            neighbours, scores = best_ids[offset][order], best_scores[offset][order]
+            keep = scores > 0
+            yield start + offset, neighbours[keep], scores[keep]
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+from collections import defaultdict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .currency import apply_prices, convert_prices, rate_table
+from .hashing import init_worker
+from .models import SilkProduct, SimilarProduct
+from .productcache import product_queryset
+
+MANIFEST = '.manifest.json'
+MANIFEST_VERSION = 2
+# Product pages loaded, priced and sent to a render worker at a time.
+RENDER_CHUNK = 200
+
+# Everything a product page shows besides its similar products. Several of these
+# are written with queryset.update() and don't move updated_at, so they're
+# part of the page stamp as well.
+STAMP_FIELDS = (
+    'updated_at', 'summary', 'thumbnail', 'image_variants',
+    'owner__username', 'owner__first_name', 'owner__last_name', 'owner__email', 'owner__userprofile__phone',
+)
+
+SnapshotResult = namedtuple('SnapshotResult', 'rendered removed full')
+
+
+def page_path(directory, url):
+    return Path(directory) / url.strip('/') / 'index.html'
+
+
+def write_file(path, text):
+    """Write through a temporary file in the same directory and rename it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def anonymous_request(url):
+    # Just enough of a request for the context processors; pages are rendered as
+    # an anonymous visitor in DEFAULT_CURRENCY with no messages.
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = url
+    request.user = AnonymousUser()
+    request.session = {}
+    return request
+
+
+def render_page(directory, url, template, context):
+    write_file(page_path(directory, url), render_to_string(template, context, anonymous_request(url)))
+
+
+def render_details(items, directory):
+    """Render ``(product, similar_products)`` pairs loaded by the parent; no database access."""
+    for product, similar_products in items:
+        render_page(directory, reverse('product_detail', args=[product.pk]), 'silk_products/product_detail.html', {
+            'product': product,
+            'contact_form': None,
+            'similar_products': similar_products,
+            'view_beacon': True,
+        })
+    return len(items)
+
+
+def load_details(pks, currency):
+    products = product_queryset().in_bulk(pks)
+    similar = defaultdict(list)
+    links = (
+        SimilarProduct.objects.filter(product_id__in=pks)
+        .select_related('similar')
+        .defer('similar__description')
+        .order_by('product_id', 'rank')
+    )
+    for link in links:
+        similar[link.product_id].append(link.similar)
+    items = [(products[pk], similar[pk]) for pk in pks if pk in products]
+    apply_prices([page for product, similar_products in items for page in (product, *similar_products)], currency)
+    return items
+
+
+def page_stamps():
+    """``{pk: digest}`` of what each product's page shows, similar products included."""
+    similar = defaultdict(list)
+    for product_id, similar_id, updated_at in (
+        SimilarProduct.objects.order_by('product_id', 'rank')
+        .values_list('product_id', 'similar_id', 'similar__updated_at')
+    ):
+        similar[product_id].append((similar_id, updated_at))
+    return {
+        pk: hashlib.sha256(repr((values, similar[pk])).encode()).hexdigest()[:16]
+        for pk, *values in SilkProduct.objects.order_by().values_list('pk', *STAMP_FIELDS).iterator(chunk_size=5000)
+    }
+
+
+def read_manifest(directory):
+    try:
+        return json.loads((Path(directory) / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def render_all(chunks, directory, currency, workers):
+    if workers <= 1:
+        return sum(render_details(load_details(chunk, currency), directory) for chunk in chunks)
+    rendered = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'silk_catalog.settings'),),
+    ) as pool:
+        pending = set()
+        for chunk in chunks:
+            # Keep a couple of chunks per worker queued so the loaded pages don't pile up in memory.
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                rendered += sum(future.result() for future in done)
+            pending.add(pool.submit(render_details, load_details(chunk, currency), str(directory)))
+        rendered += sum(future.result() for future in pending)
+    return rendered
+
+
+def build_snapshot(directory=None, full=False, workers=None):
+    """
+    Render the product list and every product page to ``<directory>/<url>/index.html``
+    for a web server to serve to anonymous visitors. Only pages whose stamp
+    changed since the manifest was written are rendered again, and pages of
+    deleted products are removed; ``full`` (or a change of price currency or
+    rate) re-renders everything in a process pool of ``workers``.
+    """
+    directory = Path(directory or settings.SNAPSHOT_DIR)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    manifest = read_manifest(directory)
+    currency, _ = convert_prices([], settings.DEFAULT_CURRENCY)
+    prices = {'currency': currency.code, 'rate': str(rate_table.rate(currency.code))}
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('prices') != prices:
+        full = True
+
+    stamps = page_stamps()
+    previous = {int(pk): stamp for pk, stamp in manifest.get('pages', {}).items()}
+    changed = sorted(stamps) if full else sorted(pk for pk, stamp in stamps.items() if previous.get(pk) != stamp)
+    removed = sorted(set(previous) - set(stamps))
+
+    chunks = (changed[start:start + RENDER_CHUNK] for start in range(0, len(changed), RENDER_CHUNK))
+    rendered = render_all(chunks, directory, currency.code, workers if full else 0)
+    for pk in removed:
+        path = page_path(directory, reverse('product_detail', args=[pk]))
+        path.unlink(missing_ok=True)
+        try:
+            path.parent.rmdir()
+        except OSError:
+            pass
+
+    if changed or removed or not page_path(directory, reverse('product_list')).exists():
+        products = list(
+            SilkProduct.objects.select_related('owner').defer(*SilkProduct.LIST_DEFERRED_FIELDS)
+            .order_by(*SilkProduct.SORT_ORDERS['newest'])
+        )
+        apply_prices(products, currency.code)
+        render_page(directory, reverse('product_list'), 'silk_products/product_list.html',
+                    {'products': products, 'query': None, 'sort': 'newest'})
+
+    # Written last: if a run dies part way, the next one renders the same pages again.
+    write_file(directory / MANIFEST, json.dumps({
+        'version': MANIFEST_VERSION,
+        'generated_at': timezone.now().isoformat(),
+        'prices': prices,
+        'pages': {str(pk): stamp for pk, stamp in sorted(stamps.items())},
+    }))
+    return SnapshotResult(rendered, len(removed), full)
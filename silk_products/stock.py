@@ -0,0 +1,88 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SilkProduct, StockHold
+from .productcache import invalidate_products
+
+
+class OutOfStock(Exception):
+    pass
+
+
+def reserve(product_id, buyer, quantity=1, ttl=None):
+    """
+    Take ``quantity`` units with one conditional UPDATE, so concurrent buyers
+    can never drive stock below zero and no row lock outlives the statement.
+    Raises OutOfStock if the product is unavailable or short.
+    """
+    if quantity < 1:
+        raise ValueError('quantity must be at least 1')
+    if ttl is None:
+        ttl = timedelta(minutes=settings.STOCK_HOLD_MINUTES)
+    with transaction.atomic():
+        taken = SilkProduct.objects.filter(pk=product_id, availability=True, stock__gte=quantity).update(
+            stock=F('stock') - quantity,
+        )
+        if not taken:
+            raise OutOfStock(f'Product {product_id} has fewer than {quantity} unit(s) available')
+        invalidate_products([product_id])
+        return StockHold.objects.create(
+            product_id=product_id, buyer=buyer, quantity=quantity,
+            expires_at=timezone.now() + ttl,
+        )
+
+
+def claim(hold, status, **filters):
+    """Move a held hold to ``status``; only one caller can win the claim."""
+    return StockHold.objects.filter(pk=hold.pk, status='held', **filters).update(
+        status=status, released_at=timezone.now(),
+    )
+
+
+def release(hold):
+    """Give the units back. Returns False if the hold was already confirmed, released or expired."""
+    with transaction.atomic():
+        if not claim(hold, 'released'):
+            return False
+        SilkProduct.objects.filter(pk=hold.product_id).update(stock=F('stock') + hold.quantity)
+        invalidate_products([hold.product_id])
+    return True
+
+
+def confirm(hold):
+    """Turn an unexpired hold into a sale; the units stay taken."""
+    return bool(claim(hold, 'confirmed', expires_at__gt=timezone.now()))
+
+
+def release_expired(batch_size=500, now=None):
+    """
+    Sweep expired holds in batches: claim each batch with one UPDATE stamped
+    with this sweep's time, then return stock with one UPDATE per product.
+    Returns the number of holds released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        ids = list(
+            StockHold.objects.filter(status='held', expires_at__lte=now)
+            .order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return released
+        stamp = timezone.now()
+        with transaction.atomic():
+            StockHold.objects.filter(pk__in=ids, status='held').update(status='expired', released_at=stamp)
+            # Re-read by stamp: holds released or confirmed meanwhile are not ours to restock.
+            quantities = defaultdict(int)
+            claimed = StockHold.objects.filter(pk__in=ids, status='expired', released_at=stamp)
+            for product_id, quantity in claimed.values_list('product_id', 'quantity'):
+                quantities[product_id] += quantity
+                released += 1
+            for product_id, quantity in quantities.items():
+                SilkProduct.objects.filter(pk=product_id).update(stock=F('stock') + quantity)
+            invalidate_products(quantities)
@@ -0,0 +1,168 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connection
+
+from .models import SilkProduct
+from .versions import VersionCounter
+
+TYPE_LABELS = dict(SilkProduct.TYPE_CHOICES)
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def product_entries(name, product_type):
+    """Index every word start of the name, plus the type label."""
+    words = normalize(name).split()
+    entries = {(' '.join(words[i:]), name) for i in range(len(words))}
+    label = TYPE_LABELS.get(product_type, product_type)
+    entries.add((normalize(label), label))
+    return entries
+
+
+class PrefixIndex:
+    """
+    Per-process typeahead index: a sorted array of (normalized key, label)
+    pairs searched with bisect. Entries are reference counted so several
+    products can share a label.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._refs = {}
+        self._products = {}
+        self.version = None
+        self.checked_at = None
+
+    def rebuild(self, rows, version):
+        refs = {}
+        products = {}
+        for pk, name, product_type in rows:
+            entries = product_entries(name, product_type)
+            products[pk] = entries
+            for entry in entries:
+                refs[entry] = refs.get(entry, 0) + 1
+        with self._lock:
+            self._keys = sorted(refs)
+            self._refs = refs
+            self._products = products
+            self.version = version
+
+    def add_product(self, pk, name, product_type):
+        with self._lock:
+            self._remove(pk)
+            entries = product_entries(name, product_type)
+            self._products[pk] = entries
+            for entry in entries:
+                if entry not in self._refs:
+                    insort(self._keys, entry)
+                self._refs[entry] = self._refs.get(entry, 0) + 1
+
+    def remove_product(self, pk):
+        with self._lock:
+            self._remove(pk)
+
+    def _remove(self, pk):
+        for entry in self._products.pop(pk, ()):
+            self._refs[entry] -= 1
+            if not self._refs[entry]:
+                del self._refs[entry]
+                del self._keys[bisect_left(self._keys, entry)]
+
+    def suggest(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        suggestions = []
+        # add_product/remove_product shift _keys in place, so read it under the lock.
+        with self._lock:
+            keys = self._keys
+            i = bisect_left(keys, (prefix,))
+            while i < len(keys) and len(suggestions) < limit:
+                key, label = keys[i]
+                if not key.startswith(prefix):
+                    break
+                if label not in suggestions:
+                    suggestions.append(label)
+                i += 1
+        return suggestions
+
+
+index = PrefixIndex()
+
+# Bumped after every committed product save or delete, from any process.
+names = VersionCounter('suggest')
+rebuilding = threading.Lock()
+
+
+def rebuild_index():
+    # Read the version first: a change committed while the rows load bumps it
+    # past what the index records, and the next check rebuilds again.
+    version = names.get()
+    rows = SilkProduct.objects.order_by().values_list('pk', 'name', 'type').iterator(chunk_size=5000)
+    index.rebuild(rows, version)
+    return index
+
+
+def rebuild_in_background():
+    if not rebuilding.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            rebuild_index()
+        finally:
+            connection.close()
+            rebuilding.release()
+
+    threading.Thread(target=run, name='suggest-rebuild', daemon=True).start()
+
+
+def get_index():
+    """
+    Return the process index. The first call builds it (warm-up normally
+    has); after that the shared version is checked at most once every
+    SUGGEST_VERSION_CHECK_INTERVAL seconds, and a change made by another
+    process is picked up by a rebuild that runs in a background thread
+    (SUGGEST_REBUILD = 'background') while the old index keeps serving.
+    """
+    if index.version is None:
+        return rebuild_index()
+    now = time.monotonic()
+    if index.checked_at is None or now - index.checked_at >= settings.SUGGEST_VERSION_CHECK_INTERVAL:
+        index.checked_at = now
+        names.refresh()
+        if names.value != index.version:
+            if settings.SUGGEST_REBUILD == 'sync':
+                rebuild_index()
+            else:
+                rebuild_in_background()
+    return index
+
+
+def apply_change(change):
+    """
+    Apply a committed save or delete to this process's index and bump the
+    shared version for the others. When nothing else bumped it since the
+    index was built, the index is marked current so this process doesn't
+    rebuild for its own write.
+    """
+    if index.version is not None:
+        change()
+    version = names.bump()
+    with index._lock:
+        if index.version is not None and version == index.version + 1:
+            index.version = version
+
+
+def product_saved(pk, name, product_type):
+    apply_change(lambda: index.add_product(pk, name, product_type))
+
+
+def product_deleted(pk):
+    apply_change(lambda: index.remove_product(pk))
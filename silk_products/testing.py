@@ -0,0 +1,18 @@
+"""Helpers shared by the tests and the benchmarks."""
+
+
+class CountingCache:
+    """Wraps a cache backend and counts calls to its methods (round trips)."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.cache, name)
+        if callable(attr):
+            def counted(*args, **kwargs):
+                self.calls += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
@@ -1,13 +1,52 @@
 import json
-from django.test import TestCase, Client
+import math
+from datetime import timedelta
+from decimal import Decimal
+from importlib.util import find_spec
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from asgiref.sync import sync_to_async
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.contrib import admin
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 from django.core import mail
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import SilkProduct, UserProfile
+from .models import (
+    ArchivedSilkProduct, CatalogRollup, DailyRollup, ExchangeRate, ProductChange, ProductViewCount, SilkProduct,
+    SimilarProduct, StockHold, UserProfile,
+)
 from .forms import CustomUserCreationForm, SilkProductForm, ContactSellerForm
+from .throttling import TokenBucket
+from .testing import CountingCache
+from .pagination import EstimatedCountPaginator, KnownCountPaginator
+from .bulk import reprice, set_availability
+from .rollups import refresh_rollups
+from .warmup import warm_up
+from .events import Broadcaster, Event, InMemoryBus, RedisBus, get_broadcaster, stream
+from .images import get_executor
+from .imaging import render_variants
+from .stock import OutOfStock, confirm, release, release_expired, reserve
+from .listcache import IdListCache, catalog, product_list_cache
+from .versions import VersionCounter
+from .productcache import get_product, get_products
+from .currency import convert_prices, rate_table, rates
+from .viewcounts import ViewBuffer, add_counts, add_views, view_buffer
+from .trending import add_scores, event_score, refresh_trending
+from .snapshot import MANIFEST, build_snapshot
+from .log import JsonFormatter, QueueingHandler
+from .profiling import StackSampler, profile_token, read_profiles, write_profile
+from .management.commands.profile_startup import parse_importtime
+from . import suggest
 
 
 class SilkProductModelTest(TestCase):
@@ -726,3 +765,2124 @@ class IntegrationTest(TestCase):
         response = api_client.get(reverse('api_product_stats'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('total_products', response.data)
+
+
+THROTTLE_TEST_SETTINGS = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'silk_products.throttling.SearchRateThrottle',
+        'silk_products.throttling.BucketRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'search': '2/min',
+        'register': '1/hour',
+        'token': '2/min',
+    },
+}
+
+
+@override_settings(REST_FRAMEWORK=THROTTLE_TEST_SETTINGS)
+class ThrottleTest(APITestCase):
+    def setUp(self):
+        from unittest import mock
+
+        cache.clear()
+        # Pin the clock mid-window so a test never straddles a period boundary.
+        patcher = mock.patch('silk_products.throttling.clock', return_value=1_000_000_030.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='seller1', password='testpass123')
+        UserProfile.objects.create(user=self.user, role='seller')
+
+    def test_bucket_uses_one_round_trip_per_check(self):
+        counting = CountingCache(cache)
+        bucket = TokenBucket(3, 60, cache=counting, timer=lambda: 120.0)
+        self.assertEqual(bucket.consume('key'), (True, None))
+        counting.calls = 0
+        self.assertTrue(bucket.consume('key')[0])
+        self.assertTrue(bucket.consume('key')[0])
+        allowed, wait = bucket.consume('key')
+        self.assertFalse(allowed)
+        self.assertEqual(wait, 60)
+        self.assertEqual(counting.calls, 3)
+
+    def test_bucket_refills_next_period(self):
+        now = [0.0]
+        bucket = TokenBucket(1, 60, timer=lambda: now[0])
+        self.assertTrue(bucket.consume('key')[0])
+        self.assertFalse(bucket.consume('key')[0])
+        now[0] = 60.0
+        self.assertTrue(bucket.consume('key')[0])
+
+    def test_api_search_is_throttled(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        url = reverse('api_product_list_create')
+        for _ in range(2):
+            self.assertEqual(self.client.get(url, {'search': 'silk'}).status_code, status.HTTP_200_OK)
+        response = self.client.get(url, {'search': 'silk'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_token_endpoint_is_throttled(self):
+        url = reverse('token_obtain_pair')
+        data = {'username': 'seller1', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, data).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_html_search_and_register_are_throttled(self):
+        client = Client()
+        for _ in range(2):
+            self.assertEqual(client.get(reverse('product_list'), {'q': 'silk'}).status_code, 200)
+        response = client.get(reverse('product_list'), {'q': 'silk'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(client.get(reverse('product_list')).status_code, 200)
+
+        client.post(reverse('register'), {'username': 'x'})
+        self.assertEqual(client.post(reverse('register'), {'username': 'x'}).status_code, 429)
+        self.assertEqual(client.get(reverse('register')).status_code, 200)
+
+
+class SellerDashboardTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        self.buyer = User.objects.create_user(username='buyer1', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+        UserProfile.objects.create(user=self.buyer, role='buyer')
+
+    def create_product(self, **kwargs):
+        data = {'name': 'Test Saree', 'type': 'saree', 'price': 1500, 'owner': self.seller}
+        data.update(kwargs)
+        return SilkProduct.objects.create(**data)
+
+    def profile(self):
+        return UserProfile.objects.get(user=self.seller)
+
+    def test_counters_follow_create_update_delete(self):
+        saree = self.create_product()
+        self.create_product(name='Shawl', type='shawl', availability=False)
+        profile = self.profile()
+        self.assertEqual((profile.product_count, profile.available_count), (2, 1))
+        self.assertEqual((profile.saree_count, profile.shawl_count), (1, 1))
+
+        saree = SilkProduct.objects.get(pk=saree.pk)
+        saree.type = 'scarf'
+        saree.availability = False
+        saree.save()
+        profile = self.profile()
+        self.assertEqual((profile.available_count, profile.saree_count, profile.scarf_count), (0, 0, 1))
+
+        saree.delete()
+        profile = self.profile()
+        self.assertEqual((profile.product_count, profile.scarf_count), (1, 0))
+
+    def test_unrelated_update_does_not_touch_counters(self):
+        product = self.create_product()
+        product = SilkProduct.objects.get(pk=product.pk)
+        product.price = 2000
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        self.assertFalse(any('silk_products_userprofile' in q['sql'] for q in queries))
+
+    def test_html_dashboard(self):
+        self.create_product(name='My Saree')
+        client = Client()
+        client.login(username='seller1', password='testpass123')
+        response = client.get(reverse('seller_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'My Saree')
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+
+        client.login(username='buyer1', password='testpass123')
+        self.assertRedirects(client.get(reverse('seller_dashboard')), reverse('product_list'))
+
+    def test_api_dashboard(self):
+        self.create_product(name='My Saree')
+        self.create_product(name='Fabric', type='fabric', owner=self.buyer)
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        response = self.client.get(reverse('api_seller_dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual([p['name'] for p in response.data['results']], ['My Saree'])
+        self.assertEqual(response.data['counts']['by_type']['saree'], 1)
+
+        refresh = RefreshToken.for_user(self.buyer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        response = self.client.get(reverse('api_seller_dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_drifted_counter_does_not_hide_products(self):
+        for i in range(5):
+            self.create_product(name=f'Saree {i}')
+        products = SilkProduct.objects.order_by('pk')
+        low = KnownCountPaginator(products, 2, count=1)
+        self.assertEqual(low.num_pages, 1)
+        self.assertTrue(low.page(1).has_next())
+        self.assertEqual([p.name for p in low.page(3)], ['Saree 4'])
+        self.assertEqual((low.count, low.num_pages), (5, 3))
+
+        high = KnownCountPaginator(products, 2, count=9)
+        self.assertFalse(high.page(3).has_next())
+        self.assertEqual(high.count, 5)
+        self.assertEqual(high.get_page(5).number, 3)
+
+        UserProfile.objects.filter(user=self.seller).update(product_count=0)
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        response = self.client.get(reverse('api_seller_dashboard'))
+        self.assertEqual((response.data['count'], len(response.data['results'])), (5, 5))
+
+    def test_reconcile_command_fixes_drift(self):
+        self.create_product()
+        SilkProduct.objects.update(availability=False)
+        UserProfile.objects.filter(user=self.buyer).update(product_count=5)
+        out = StringIO()
+        call_command('reconcile_seller_counters', stdout=out)
+        self.assertIn('Fixed 2 drifted', out.getvalue())
+        self.assertEqual(self.profile().available_count, 0)
+        self.assertEqual(UserProfile.objects.get(user=self.buyer).product_count, 0)
+
+
+
+class ProductChangeLogTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+        self.product = SilkProduct.objects.create(
+            name='Test Saree', type='saree', price=1500, owner=self.seller, description='Silk'
+        )
+
+    def change_inserts(self, queries):
+        return [q for q in queries if q['sql'].startswith('INSERT') and 'productchange' in q['sql']]
+
+    def test_html_update_logs_field_diffs(self):
+        client = Client()
+        client.login(username='seller1', password='testpass123')
+        data = {'name': 'Test Saree', 'type': 'saree', 'price': 1800, 'description': 'Silk'}
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('product_update', kwargs={'pk': self.product.pk}), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(self.change_inserts(queries)), 1)
+
+        changes = {c.field: c for c in ProductChange.objects.filter(product=self.product)}
+        self.assertEqual(set(changes), {'price', 'availability'})
+        self.assertEqual(changes['price'].old_value, '1500.00')
+        self.assertEqual(changes['price'].new_value, '1800.00')
+        self.assertEqual(changes['availability'].new_value, 'False')
+        self.assertEqual(changes['price'].changed_by, self.seller)
+        self.assertEqual(changes['price'].owner, self.seller)
+
+    def test_api_update_logs_diffs(self):
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        url = reverse('api_product_detail', kwargs={'pk': self.product.pk})
+        response = self.client.patch(url, {'price': '1600.00'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        change = ProductChange.objects.get(product=self.product)
+        self.assertEqual((change.field, change.new_value), ('price', '1600.00'))
+
+    def test_price_precision_alone_is_not_a_change(self):
+        self.product.price = '1500'
+        self.product.save()
+        self.product.price = 1500.0
+        self.product.save()
+        self.assertFalse(ProductChange.objects.filter(product=self.product).exists())
+        self.product.price = 1500.5
+        self.product.save()
+        change = ProductChange.objects.get(product=self.product)
+        self.assertEqual((change.old_value, change.new_value), ('1500.00', '1500.50'))
+
+    def test_admin_bulk_edit_is_one_insert(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass123')
+        products = [self.product] + [
+            SilkProduct.objects.create(name=f'Scarf {i}', type='scarf', price=100, owner=self.seller)
+            for i in range(2)
+        ]
+        data = {
+            'form-TOTAL_FORMS': str(len(products)),
+            'form-INITIAL_FORMS': str(len(products)),
+            '_save': 'Save',
+        }
+        for i, product in enumerate(products):
+            data[f'form-{i}-id'] = str(product.pk)
+        client = Client()
+        client.force_login(admin_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('admin:silk_products_silkproduct_changelist'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(self.change_inserts(queries)), 1)
+        self.assertEqual(ProductChange.objects.filter(field='availability', changed_by=admin_user).count(), 3)
+
+    def test_unchanged_save_logs_nothing(self):
+        product = SilkProduct.objects.get(pk=self.product.pk)
+        product.save()
+        self.assertFalse(ProductChange.objects.exists())
+
+    def test_retention_command(self):
+        now = timezone.now()
+        for days, old, new in [(400, '1', '2'), (40, '2', '3'), (35, '3', '4'), (1, '4', '5')]:
+            ProductChange.objects.create(
+                product=self.product, owner=self.seller, field='price',
+                old_value=old, new_value=new, changed_at=now - timedelta(days=days),
+            )
+        call_command('compact_product_changes', days=365, compact_days=30, stdout=StringIO())
+        changes = list(ProductChange.objects.order_by('changed_at').values_list('old_value', 'new_value'))
+        self.assertEqual(changes, [('2', '4'), ('4', '5')])
+
+
+
+@override_settings(SUGGEST_VERSION_CHECK_INTERVAL=0, SUGGEST_REBUILD='sync')
+class ProductSuggestTest(APITestCase):
+    def setUp(self):
+        suggest.index.rebuild([], None)
+        suggest.index.checked_at = None
+        suggest.names.reset()
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        for name, product_type in [('Rajshahi Silk Saree', 'saree'), ('Silk Scarf', 'scarf'), ('Raw Fabric', 'fabric')]:
+            SilkProduct.objects.create(name=name, type=product_type, price=100, owner=self.seller)
+
+    def suggestions(self, prefix, **params):
+        response = self.client.get(reverse('api_product_suggest'), {'prefix': prefix, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['suggestions']
+
+    def test_prefix_matches_names_words_and_types(self):
+        self.assertEqual(self.suggestions('ra'), ['Rajshahi Silk Saree', 'Raw Fabric'])
+        self.assertEqual(self.suggestions('  SILK '), ['Rajshahi Silk Saree', 'Silk Scarf'])
+        self.assertEqual(self.suggestions('sar'), ['Rajshahi Silk Saree', 'Saree'])
+        self.assertEqual(self.suggestions('silk', limit=1), ['Rajshahi Silk Saree'])
+        self.assertEqual(self.suggestions(''), [])
+
+    def test_index_follows_save_and_delete(self):
+        self.suggestions('x')
+        product = SilkProduct.objects.get(name='Raw Fabric')
+        product.name = 'Tussar Fabric'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(suggest.index.suggest('tus'), ['Tussar Fabric'])
+        self.assertEqual(suggest.index.suggest('raw'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(suggest.index.suggest('tus'), [])
+        self.assertEqual(suggest.index.suggest('fab'), [])
+
+    def test_rolled_back_changes_leave_index_alone(self):
+        self.suggestions('x')
+        product = SilkProduct.objects.get(name='Raw Fabric')
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    product.name = 'Tussar Fabric'
+                    product.save()
+                    SilkProduct.objects.get(name='Silk Scarf').delete()
+                    raise DatabaseError('rolled back')
+            except DatabaseError:
+                pass
+        self.assertEqual(suggest.index.suggest('tus'), [])
+        self.assertEqual(suggest.index.suggest('raw'), ['Raw Fabric'])
+        self.assertIn('Silk Scarf', suggest.index.suggest('scarf'))
+
+    def test_own_writes_do_not_rebuild(self):
+        from unittest import mock
+
+        # As in production, where the first write ever has created the version row.
+        suggest.names.bump()
+        self.suggestions('x')
+        with self.captureOnCommitCallbacks(execute=True):
+            SilkProduct.objects.create(name='Tussar Shawl', type='shawl', price=100, owner=self.seller)
+            SilkProduct.objects.get(name='Raw Fabric').delete()
+        with mock.patch.object(suggest.index, 'rebuild') as rebuild:
+            self.assertEqual(self.suggestions('tus'), ['Tussar Shawl'])
+            self.assertEqual(self.suggestions('raw'), [])
+        rebuild.assert_not_called()
+
+    def test_rebuilds_when_another_process_writes(self):
+        self.assertEqual(self.suggestions('mur'), [])
+        # Another process's save: the row and the shared version change, this index doesn't.
+        SilkProduct.objects.filter(name='Raw Fabric').update(name='Murshidabad Fabric')
+        VersionCounter('suggest').bump()
+        self.assertEqual(self.suggestions('mur'), ['Murshidabad Fabric'])
+
+    def test_background_rebuild_keeps_serving_old_index(self):
+        from unittest import mock
+
+        self.suggestions('x')
+        SilkProduct.objects.filter(name='Raw Fabric').update(name='Murshidabad Fabric')
+        VersionCounter('suggest').bump()
+        with self.settings(SUGGEST_REBUILD='background'), \
+                mock.patch('silk_products.suggest.threading.Thread') as thread:
+            self.assertEqual(self.suggestions('mur'), [])
+            self.assertEqual(self.suggestions('raw'), ['Raw Fabric'])
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once_with()
+        suggest.rebuilding.release()
+
+    def test_shared_labels_are_reference_counted(self):
+        index = suggest.PrefixIndex()
+        index.add_product(1, 'Silk Saree', 'saree')
+        index.add_product(2, 'Silk Saree', 'saree')
+        index.remove_product(1)
+        self.assertEqual(index.suggest('silk'), ['Silk Saree'])
+        index.remove_product(2)
+        self.assertEqual(index.suggest('s'), [])
+
+
+
+class SilkProductAdminTest(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass123')
+        self.client.force_login(self.admin_user)
+        self.url = reverse('admin:silk_products_silkproduct_changelist')
+
+    def create_products(self, count, start=0):
+        for i in range(start, start + count):
+            owner = User.objects.create_user(username=f'seller{i}')
+            SilkProduct.objects.create(name=f'Saree {i}', type='saree', price=100, owner=owner)
+
+    def changelist_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.create_products(3)
+        small, _ = self.changelist_queries()
+        self.create_products(20, start=3)
+        large, response = self.changelist_queries()
+        self.assertEqual(small, large)
+        self.assertNotContains(response, 'seller7</a></li>')
+
+    def test_owner_filter_by_username(self):
+        self.create_products(3)
+        _, response = self.changelist_queries({'owner': 'seller1'})
+        self.assertEqual(list(response.context['cl'].result_list), list(SilkProduct.objects.filter(owner__username='seller1')))
+        self.assertContains(response, 'data-autocomplete-url')
+
+    def test_search_is_name_prefix(self):
+        self.create_products(2)
+        SilkProduct.objects.create(name='Katan Shawl', type='shawl', price=100, owner=self.admin_user)
+        SilkProduct.objects.create(name='Kataan', type='shawl', price=100, owner=self.admin_user)
+        SilkProduct.objects.create(name='Katb Saree', type='saree', price=100, owner=self.admin_user)
+        SilkProduct.objects.create(name='Kau Scarf', type='scarf', price=100, owner=self.admin_user)
+        _, response = self.changelist_queries({'q': 'kat'})
+        self.assertEqual(sorted(p.name for p in response.context['cl'].result_list), ['Kataan', 'Katan Shawl', 'Katb Saree'])
+        _, response = self.changelist_queries({'q': 'katan s'})
+        self.assertEqual([p.name for p in response.context['cl'].result_list], ['Katan Shawl'])
+
+    def test_search_uses_name_index(self):
+        admin_site = admin.site._registry[SilkProduct]
+        queryset, _ = admin_site.get_search_results(None, SilkProduct.objects.all(), 'Kat')
+        self.assertIn('product_name_upper_idx', queryset.explain())
+
+    def test_changelist_defers_description(self):
+        self.create_products(1)
+        _, response = self.changelist_queries()
+        product = response.context['cl'].result_list[0]
+        self.assertIn('description', product.get_deferred_fields())
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=2)
+    def test_estimated_count_for_unfiltered_changelist(self):
+        self.create_products(3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.create_products(1, start=3)
+        self.assertEqual(EstimatedCountPaginator(SilkProduct.objects.all(), 10).count, 3)
+        self.assertEqual(EstimatedCountPaginator(SilkProduct.objects.filter(type='saree'), 10).count, 4)
+
+
+
+class BulkProductActionTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        self.other = User.objects.create_user(username='seller2', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+        UserProfile.objects.create(user=self.other, role='seller')
+        for i, price in enumerate(['1500.00', '99.99', '10.00']):
+            SilkProduct.objects.create(name=f'Saree {i}', type='saree', price=price, owner=self.seller)
+        SilkProduct.objects.create(name='Other Scarf', type='scarf', price=500, owner=self.other)
+
+    def product_updates(self, queries):
+        return [q for q in queries if q['sql'].startswith('UPDATE "silk_products_silkproduct"')]
+
+    def test_set_availability_is_one_update(self):
+        before = SilkProduct.objects.get(name='Saree 0').updated_at
+        queryset = SilkProduct.objects.filter(owner=self.seller)
+        self.assertEqual(set_availability(queryset, False, dry_run=True), 3)
+        self.assertTrue(SilkProduct.objects.get(name='Saree 0').availability)
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = set_availability(queryset, False, user=self.seller)
+        self.assertEqual(updated, 3)
+        self.assertEqual(len(self.product_updates(queries)), 1)
+        self.assertFalse(SilkProduct.objects.filter(owner=self.seller, availability=True).exists())
+        self.assertGreater(SilkProduct.objects.get(name='Saree 0').updated_at, before)
+        self.assertEqual(UserProfile.objects.get(user=self.seller).available_count, 0)
+        self.assertEqual(ProductChange.objects.filter(field='availability', changed_by=self.seller).count(), 3)
+        self.assertEqual(set_availability(queryset, False, dry_run=True), 0)
+
+    def test_rows_matching_after_the_read_are_left_alone(self):
+        from unittest import mock
+        from . import bulk
+
+        late = SilkProduct.objects.create(name='Late Saree', type='saree', price=10, owner=self.seller,
+                                          availability=False)
+        read = bulk.locked_rows
+
+        def read_then_concurrent_write(*args, **kwargs):
+            rows = read(*args, **kwargs)
+            # Another writer makes a product match the filter after the read.
+            SilkProduct.objects.filter(pk=late.pk).update(availability=True)
+            return rows
+
+        with mock.patch.object(bulk, 'locked_rows', side_effect=read_then_concurrent_write):
+            self.assertEqual(set_availability(SilkProduct.objects.filter(owner=self.seller), False), 3)
+        self.assertTrue(SilkProduct.objects.get(pk=late.pk).availability)
+        self.assertFalse(ProductChange.objects.filter(product_id=late.pk).exists())
+
+    def test_reprice_percent_and_amount(self):
+        queryset = SilkProduct.objects.filter(owner=self.seller)
+        with CaptureQueriesContext(connection) as queries:
+            reprice(queryset, percent=Decimal('10'))
+        self.assertEqual(len(self.product_updates(queries)), 1)
+        prices = dict(SilkProduct.objects.values_list('name', 'price'))
+        self.assertEqual(prices['Saree 0'], Decimal('1650.00'))
+        self.assertEqual(prices['Saree 1'], Decimal('109.99'))
+        self.assertEqual(prices['Other Scarf'], Decimal('500.00'))
+
+        reprice(queryset, amount=Decimal('-100'))
+        prices = dict(SilkProduct.objects.values_list('name', 'price'))
+        self.assertEqual(prices['Saree 0'], Decimal('1550.00'))
+        self.assertEqual(prices['Saree 2'], Decimal('0.00'))
+        change = ProductChange.objects.filter(product__name='Saree 0', field='price').latest('pk')
+        self.assertEqual((change.old_value, change.new_value), ('1650.00', '1550.00'))
+
+    def test_api_bulk_update_only_touches_own_products(self):
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        url = reverse('api_product_bulk_update')
+
+        response = self.client.post(url, {'set_availability': False, 'dry_run': True}, format='json')
+        self.assertEqual(response.data, {'matched': 3, 'dry_run': True})
+
+        response = self.client.post(url, {'type': 'saree', 'price_percent': '-50'}, format='json')
+        self.assertEqual(response.data, {'updated': 3, 'dry_run': False})
+        self.assertEqual(SilkProduct.objects.get(name='Saree 0').price, Decimal('750.00'))
+        self.assertEqual(SilkProduct.objects.get(name='Other Scarf').price, Decimal('500.00'))
+
+        response = self.client.post(url, {'price_percent': '5', 'price_amount': '5'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_actions_preview_then_apply(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'adminpass123')
+        self.client.force_login(admin_user)
+        url = reverse('admin:silk_products_silkproduct_changelist')
+        data = {'action': 'reprice_products', 'select_across': '1', 'index': '0', '_selected_action': ['1']}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'This will update 4 products')
+
+        response = self.client.post(url, {**data, 'mode': 'amount', 'value': '100', 'apply': 'Apply'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(SilkProduct.objects.get(name='Other Scarf').price, Decimal('600.00'))
+
+        data = {'action': 'mark_unavailable', 'select_across': '1', 'index': '0', '_selected_action': ['1']}
+        self.assertContains(self.client.post(url, data), 'This will update 4 products')
+        self.client.post(url, {**data, 'apply': 'Apply'})
+        self.assertFalse(SilkProduct.objects.filter(availability=True).exists())
+
+
+
+class ProductArchiveTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+        old = timezone.now() - timedelta(days=400)
+        self.stale = SilkProduct.objects.create(name='Old Saree', type='saree', price=100, owner=self.seller, availability=False)
+        self.recent = SilkProduct.objects.create(name='Recent Saree', type='saree', price=100, owner=self.seller, availability=False)
+        self.live = SilkProduct.objects.create(name='Live Saree', type='saree', price=100, owner=self.seller)
+        SilkProduct.objects.filter(pk__in=[self.stale.pk, self.live.pk]).update(updated_at=old, created_at=old)
+
+    def test_archive_command_moves_only_stale_unavailable_products(self):
+        out = StringIO()
+        call_command('archive_products', days=180, batch_size=1, stdout=out)
+        self.assertIn('Archived 1 product(s)', out.getvalue())
+        self.assertFalse(SilkProduct.objects.filter(pk=self.stale.pk).exists())
+        self.assertEqual(set(SilkProduct.objects.values_list('name', flat=True)), {'Recent Saree', 'Live Saree'})
+        archived = ArchivedSilkProduct.objects.get(pk=self.stale.pk)
+        self.assertEqual(archived.name, 'Old Saree')
+        self.assertEqual(UserProfile.objects.get(user=self.seller).product_count, 2)
+
+    def test_archived_product_is_still_retrievable(self):
+        call_command('archive_products', stdout=StringIO())
+        response = self.client.get(reverse('product_detail', kwargs={'pk': self.stale.pk}))
+        self.assertContains(response, 'This listing has been archived')
+        self.assertNotContains(response, reverse('product_update', kwargs={'pk': self.stale.pk}))
+
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        response = self.client.get(reverse('api_product_detail', kwargs={'pk': self.stale.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['archived'])
+        response = self.client.get(reverse('api_product_detail', kwargs={'pk': 99999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_restore_keeps_id_and_created_at(self):
+        created_at = SilkProduct.objects.get(pk=self.stale.pk).created_at
+        call_command('archive_products', stdout=StringIO())
+        call_command('archive_products', restore=[self.stale.pk], stdout=StringIO())
+        restored = SilkProduct.objects.get(pk=self.stale.pk)
+        self.assertEqual(restored.created_at, created_at)
+        self.assertFalse(ArchivedSilkProduct.objects.exists())
+        self.assertEqual(UserProfile.objects.get(user=self.seller).product_count, 3)
+
+    def test_archive_skips_held_and_changed_products(self):
+        from .archive import archive_batch
+
+        buyer = User.objects.create_user(username='buyer1', password='testpass123')
+        StockHold.objects.create(product=self.stale, buyer=buyer, quantity=1,
+                                 expires_at=timezone.now() + timedelta(minutes=5))
+        out = StringIO()
+        call_command('archive_products', '--dry-run', stdout=out)
+        self.assertIn('0 product(s)', out.getvalue())
+        call_command('archive_products', batch_size=1, stdout=StringIO())
+        self.assertTrue(SilkProduct.objects.filter(pk=self.stale.pk).exists())
+
+        # Picked while stale, made available before its batch ran.
+        StockHold.objects.update(status='released')
+        SilkProduct.objects.filter(pk=self.stale.pk).update(availability=True)
+        self.assertEqual(archive_batch([self.stale.pk], days=180), 0)
+        self.assertTrue(SilkProduct.objects.filter(pk=self.stale.pk).exists())
+
+    def test_view_totals_survive_archive_and_restore(self):
+        ProductViewCount.objects.create(product=self.stale, views=40, contacts=3)
+        call_command('archive_products', stdout=StringIO())
+        self.assertFalse(ProductViewCount.objects.filter(product_id=self.stale.pk).exists())
+        self.assertEqual(ArchivedSilkProduct.objects.get(pk=self.stale.pk).views, 40)
+        call_command('archive_products', restore=[self.stale.pk], stdout=StringIO())
+        count = ProductViewCount.objects.get(product_id=self.stale.pk)
+        self.assertEqual((count.views, count.contacts, count.scored_views), (40, 3, 40))
+
+
+class ProductSummaryTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        self.description = ' '.join(f'word{i}' for i in range(40))
+
+    def test_summary_and_type_label_computed_on_save(self):
+        product = SilkProduct.objects.create(
+            name='Saree', type='saree', price=100, owner=self.seller, description=self.description
+        )
+        self.assertEqual(product.summary, ' '.join(f'word{i}' for i in range(15)) + ' …')
+        self.assertEqual(product.type_label, 'Saree')
+        product.type = 'shawl'
+        product.description = 'Short'
+        product.save(update_fields=['type', 'description'])
+        product.refresh_from_db()
+        self.assertEqual((product.summary, product.type_label), ('Short', 'Shawl'))
+
+    def test_list_pages_never_select_description(self):
+        SilkProduct.objects.create(name='Long Saree', type='saree', price=100, owner=self.seller, description=self.description)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product_list'))
+        self.assertContains(response, 'word14 …')
+        product_selects = [q['sql'] for q in queries if 'FROM "silk_products_silkproduct"' in q['sql']]
+        self.assertTrue(product_selects)
+        self.assertFalse(any('"description"' in sql for sql in product_selects))
+
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_product_list_create'))
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['type_label'], 'Saree')
+        self.assertFalse(any('"description"' in q['sql'] for q in queries))
+
+    def test_backfill_command(self):
+        product = SilkProduct.objects.create(name='Saree', type='saree', price=100, owner=self.seller, description='Silk')
+        SilkProduct.objects.update(summary='', type_label='')
+        out = StringIO()
+        call_command('backfill_product_summaries', stdout=out)
+        self.assertIn('Updated 1', out.getvalue())
+        product.refresh_from_db()
+        self.assertEqual((product.summary, product.type_label), ('Silk', 'Saree'))
+
+    def test_migration_backfills_existing_rows(self):
+        from importlib import import_module
+        from django.db.migrations.loader import MigrationLoader
+
+        migration = import_module('silk_products.migrations.0018_backfill_product_summaries')
+        apps = MigrationLoader(connection).project_state(('silk_products', '0018_backfill_product_summaries')).apps
+        product = SilkProduct.objects.create(
+            name='Scarf', type='scarf', price=100, owner=self.seller, description='Soft ' * 40)
+        SilkProduct.objects.update(summary='', type_label='')
+        migration.backfill_product_summaries(apps, None)
+        product.refresh_from_db()
+        self.assertEqual((product.summary, product.type_label), (SilkProduct.summarize(product.description), 'Scarf'))
+
+
+@skipUnless(find_spec('numpy'), 'compute_similar_products needs NumPy')
+class SimilarProductsTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        specs = [
+            ('Red Katan Saree', 'saree', 'Rajshahi katan silk saree with zari border'),
+            ('Blue Katan Saree', 'saree', 'Rajshahi katan silk saree for weddings'),
+            ('Warm Wool Shawl', 'shawl', 'Winter shawl with silk tassels'),
+            ('Winter Wool Shawl', 'shawl', 'Warm winter shawl'),
+        ]
+        self.products = {
+            name: SilkProduct.objects.create(name=name, type=t, price=100, owner=self.seller, description=d)
+            for name, t, d in specs
+        }
+
+    def test_command_links_nearest_neighbours(self):
+        call_command('compute_similar_products', top_k=1, chunk_size=3, stdout=StringIO())
+        nearest = {
+            link.product.name: link.similar.name
+            for link in SimilarProduct.objects.select_related('product', 'similar')
+        }
+        self.assertEqual(nearest['Red Katan Saree'], 'Blue Katan Saree')
+        self.assertEqual(nearest['Warm Wool Shawl'], 'Winter Wool Shawl')
+
+        call_command('compute_similar_products', top_k=2, stdout=StringIO())
+        self.assertEqual(SimilarProduct.objects.filter(product=self.products['Red Katan Saree']).count(), 2)
+
+    def test_chunking_does_not_change_results(self):
+        from .similarity import product_tokens, tfidf_matrix, top_k_neighbours
+
+        documents = [product_tokens(p.name, p.type, p.description) for p in self.products.values()]
+        matrix = tfidf_matrix(documents)
+        whole = [(row, list(n)) for row, n, _ in top_k_neighbours(matrix, 2, chunk_size=100)]
+        chunked = [(row, list(n)) for row, n, _ in top_k_neighbours(matrix, 2, chunk_size=1)]
+        self.assertEqual(whole, chunked)
+
+    def test_detail_page_and_api_read_precomputed_links(self):
+        call_command('compute_similar_products', top_k=1, stdout=StringIO())
+        product = self.products['Red Katan Saree']
+        response = self.client.get(reverse('product_detail', kwargs={'pk': product.pk}))
+        self.assertContains(response, 'Similar silk products')
+        self.assertEqual([p.name for p in response.context['similar_products']], ['Blue Katan Saree'])
+
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        response = self.client.get(reverse('api_product_detail', kwargs={'pk': product.pk}))
+        self.assertEqual(response.data['similar'], [self.products['Blue Katan Saree'].pk])
+
+
+class AnalyticsRollupTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        self.other = User.objects.create_user(username='seller2', password='testpass123')
+        self.staff = User.objects.create_user(username='manager', password='testpass123', is_staff=True)
+        self.saree = SilkProduct.objects.create(name='Saree', type='saree', price=1000, owner=self.seller)
+        SilkProduct.objects.create(name='Saree 2', type='saree', price=3000, owner=self.seller, availability=False)
+        self.scarf = SilkProduct.objects.create(name='Scarf', type='scarf', price=500, owner=self.other)
+
+    def authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def test_full_refresh_builds_type_and_seller_rows(self):
+        out = StringIO()
+        call_command('refresh_rollups', stdout=out)
+        self.assertIn('Refreshed rollups for 2 seller(s)', out.getvalue())
+        saree = CatalogRollup.objects.get(owner=self.seller, type='saree')
+        self.assertEqual((saree.listing_count, saree.available_count, saree.price_total), (2, 1, Decimal('4000')))
+        today = timezone.localdate()
+        row = DailyRollup.objects.get(date=today, dimension='type', key='saree')
+        self.assertEqual(row.average_price, Decimal('2000'))
+        self.assertEqual(row.availability_ratio, 0.5)
+        self.assertEqual(DailyRollup.objects.get(date=today, dimension='type', key='shawl').listing_count, 0)
+
+    @override_settings(ROLLUP_WATERMARK_LAG_MINUTES=0)
+    def test_incremental_refresh_only_touches_changed_sellers(self):
+        refresh_rollups()
+        self.assertEqual(refresh_rollups(), 0)
+
+        self.scarf.availability = False
+        self.scarf.save()
+        self.assertEqual(refresh_rollups(), 1)
+        self.assertEqual(CatalogRollup.objects.get(owner=self.other).available_count, 0)
+
+        self.saree.delete()
+        self.assertEqual(refresh_rollups(), 1)
+        rollup = CatalogRollup.objects.get(owner=self.seller, type='saree')
+        self.assertEqual((rollup.listing_count, rollup.price_total), (1, Decimal('3000')))
+
+    def test_late_commits_are_not_skipped(self):
+        run_at = timezone.now()
+        refresh_rollups(now=run_at)
+        # Stamped before the run by a transaction that only committed after it.
+        SilkProduct.objects.filter(pk=self.scarf.pk).update(availability=False, updated_at=run_at - timedelta(minutes=1))
+        self.assertEqual(refresh_rollups(now=run_at + timedelta(minutes=1)), 2)
+        self.assertEqual(CatalogRollup.objects.get(owner=self.other).available_count, 0)
+
+    def test_seller_with_no_products_left_gets_zero_row(self):
+        refresh_rollups()
+        self.scarf.delete()
+        refresh_rollups()
+        self.assertFalse(CatalogRollup.objects.filter(owner=self.other).exists())
+        row = DailyRollup.objects.get(date=timezone.localdate(), dimension='seller', key=str(self.other.pk))
+        self.assertEqual(row.listing_count, 0)
+        self.assertIsNone(row.average_price)
+
+    def test_analytics_api_reads_rollups_only(self):
+        yesterday = timezone.now() - timedelta(days=1)
+        refresh_rollups(now=yesterday)
+        SilkProduct.objects.create(name='Scarf 2', type='scarf', price=700, owner=self.other)
+        refresh_rollups()
+
+        self.authenticate(self.staff)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_product_analytics'), {'dimension': 'type', 'key': 'scarf'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('silk_products_silkproduct' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual([r['listing_count'] for r in response.data['results']], [1, 2])
+        self.assertEqual(response.data['results'][1]['average_price'], Decimal('600'))
+
+    def test_seller_series_carries_forward_unchanged_days(self):
+        refresh_rollups(now=timezone.now() - timedelta(days=2))
+        SilkProduct.objects.create(name='Scarf 2', type='scarf', price=700, owner=self.other)
+        refresh_rollups()
+
+        self.authenticate(self.staff)
+        response = self.client.get(reverse('api_product_analytics'), {
+            'dimension': 'seller', 'start': str(timezone.localdate()),
+        })
+        keys = {r['key']: r['listing_count'] for r in response.data['results']}
+        self.assertEqual(keys, {str(self.seller.pk): 2, str(self.other.pk): 2})
+
+    def test_non_staff_only_see_their_own_seller_series(self):
+        refresh_rollups()
+        self.authenticate(self.seller)
+        response = self.client.get(reverse('api_product_analytics'), {'dimension': 'type'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('api_product_analytics'), {'dimension': 'seller', 'key': self.other.pk})
+        self.assertEqual({r['key'] for r in response.data['results']}, {str(self.seller.pk)})
+
+
+class WarmupTest(TestCase):
+    def test_warm_up_fills_template_cache(self):
+        from django.template import engines
+
+        engine = engines['django'].engine
+        cached_loader = engine.template_loaders[0]
+        cached_loader.reset()
+        timings = warm_up()
+        self.assertEqual(set(timings), {'urls', 'imports', 'templates', 'suggest', 'connections'})
+        self.assertGreater(timings['templates'][0], 0)
+        self.assertIn('silk_products/product_list.html', cached_loader.get_template_cache)
+
+    def test_warm_up_runs_selected_steps(self):
+        self.assertEqual(set(warm_up(steps=['urls'])), {'urls'})
+
+    def test_warm_up_closes_connections_it_opens(self):
+        from unittest import mock
+        from django.db import connections
+
+        with mock.patch.object(connections, 'close_all') as close_all:
+            warm_up(steps=['connections'])
+        close_all.assert_called_once_with()
+
+    def test_parse_importtime(self):
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   _io\n'
+            'import time:      2500 |       4000 | silk_products.views\n'
+            'some other output\n'
+        )
+        self.assertEqual(parse_importtime(stderr), [('_io', 120, 120), ('silk_products.views', 2500, 4000)])
+
+
+# The cached setup used with a shared cache (SILK_REDIS_URL).
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class SessionStorageTest(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+        self.client.login(username='seller1', password='testpass123')
+
+    def test_create_redirect_flow_does_not_touch_session_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('product_create'), {
+                'name': 'Saree', 'type': 'saree', 'price': '1500.00',
+                'description': 'Handwoven', 'availability': 'on',
+            }, follow=True)
+        self.assertContains(response, 'Product created successfully!')
+        self.assertFalse(any('django_session' in q['sql'] for q in queries.captured_queries))
+
+    def test_session_survives_cache_flush(self):
+        from django.core.cache import caches
+
+        caches['sessions'].clear()
+        response = self.client.get(reverse('seller_dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_deploy_check_rejects_cached_sessions_on_process_cache(self):
+        from .checks import check_session_cache
+
+        self.assertEqual([error.id for error in check_session_cache(None)], ['silk_products.E001'])
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.assertEqual(check_session_cache(None), [])
+        shared = {**settings.CACHES, 'sessions': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_session_cache(None), [])
+
+    def test_deploy_check_warns_about_process_product_cache(self):
+        from .checks import check_product_cache
+
+        self.assertEqual([warning.id for warning in check_product_cache(None)], ['silk_products.W001'])
+        shared = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_product_cache(None), [])
+
+
+class ProductEventsTest(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+
+    def test_replay_detects_dropped_events(self):
+        bus = InMemoryBus()
+        broadcaster = Broadcaster(buffer_size=3)
+        bus.attach(broadcaster)
+        for _ in range(5):
+            bus.publish('created', {'type': 'saree', 'owner': 1})
+        self.assertIsNone(broadcaster.replay(1))
+        self.assertEqual([event.id for event in broadcaster.replay(2)], [3, 4, 5])
+        self.assertEqual(broadcaster.replay(None), [])
+
+    async def test_stream_fans_out_with_filters_and_resumes(self):
+        bus = InMemoryBus()
+        first, second = Broadcaster(), Broadcaster()
+        bus.attach(first)
+        bus.attach(second)
+        frames = stream(second, types=['scarf'], owners=[7], heartbeat=5)
+        self.assertTrue((await anext(frames)).startswith('retry:'))
+
+        bus.publish('created', {'id': 1, 'type': 'saree', 'owner': 7})
+        bus.publish('created', {'id': 2, 'type': 'scarf', 'owner': 8})
+        bus.publish('updated', {'id': 3, 'type': 'scarf', 'owner': 7})
+        frame = await anext(frames)
+        self.assertTrue(frame.startswith('id: 3\nevent: updated\n'))
+        await frames.aclose()
+        self.assertFalse(second.subscriptions)
+        self.assertEqual(len(first.buffer), 3)
+
+        resumed = stream(first, last_event_id=1, heartbeat=5)
+        await anext(resumed)
+        self.assertTrue((await anext(resumed)).startswith('id: 2\n'))
+        self.assertTrue((await anext(resumed)).startswith('id: 3\n'))
+        await resumed.aclose()
+
+    async def test_stream_sends_reset_when_too_far_behind(self):
+        bus = InMemoryBus()
+        broadcaster = Broadcaster(buffer_size=1)
+        bus.attach(broadcaster)
+        bus.publish('created', {'type': 'saree'})
+        bus.publish('created', {'type': 'saree'})
+        frames = stream(broadcaster, last_event_id=0, heartbeat=5)
+        await anext(frames)
+        self.assertTrue((await anext(frames)).startswith('event: reset'))
+        await frames.aclose()
+
+    def test_signals_publish_after_commit(self):
+        broadcaster = get_broadcaster()
+        with self.captureOnCommitCallbacks(execute=True):
+            product = SilkProduct.objects.create(name='Saree', type='saree', price=100, owner=self.seller)
+        event = broadcaster.buffer[-1]
+        self.assertEqual((event.kind, event.data['id'], event.data['owner']), ('created', product.pk, self.seller.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_availability(SilkProduct.objects.filter(pk=product.pk), False)
+        self.assertEqual((broadcaster.buffer[-1].kind, broadcaster.buffer[-1].data['availability']), ('updated', False))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(broadcaster.buffer[-1].kind, 'deleted')
+        self.assertEqual(broadcaster.buffer[-1].data['type'], 'saree')
+
+    def test_replay_resets_when_ahead_of_the_bus(self):
+        # A restarted bus numbers its events from 1 again.
+        bus = InMemoryBus()
+        broadcaster = Broadcaster()
+        bus.attach(broadcaster)
+        self.assertIsNone(broadcaster.replay(40))
+        bus.publish('created', {'type': 'saree', 'owner': 1})
+        self.assertIsNone(broadcaster.replay(40))
+        self.assertEqual(broadcaster.replay(1), [])
+
+    async def test_missed_events_reset_streams(self):
+        broadcaster = Broadcaster()
+        broadcaster.receive(Event(1, 'created', {'type': 'saree'}))
+        frames = stream(broadcaster, last_event_id=1, heartbeat=5)
+        await anext(frames)
+        # The bus skipped ids 2-4: open streams end and old ids can't be replayed.
+        broadcaster.receive(Event(5, 'created', {'type': 'saree'}))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(frames)
+        self.assertIsNone(broadcaster.replay(1))
+        self.assertEqual(broadcaster.replay(5), [])
+
+    def test_redis_bus_numbers_and_relays_events(self):
+        from unittest import mock
+
+        bus = RedisBus(client=mock.Mock())
+        bus.script.return_value = 7
+        event = bus.publish('created', {'type': 'saree', 'price': Decimal('100.00')})
+        self.assertEqual(event.id, 7)
+        payload = bus.script.call_args.kwargs['args'][0]
+        self.assertEqual(json.loads(payload), {'kind': 'created', 'data': {'type': 'saree', 'price': '100.00'}})
+
+        broadcaster = Broadcaster()
+        bus.broadcasters.append(broadcaster)
+        bus.receive(f'7 {payload}'.encode())
+        self.assertEqual(broadcaster.buffer[-1], Event(7, 'created', {'type': 'saree', 'price': '100.00'}))
+
+    def test_deploy_check_warns_about_process_event_bus(self):
+        from .checks import check_event_bus
+
+        self.assertEqual([warning.id for warning in check_event_bus(None)], ['silk_products.W002'])
+        with override_settings(PRODUCT_EVENT_BUS='silk_products.events.RedisBus'):
+            self.assertEqual(check_event_bus(None), [])
+
+    def test_events_endpoint_needs_asgi(self):
+        response = self.client.get(reverse('api_product_events'))
+        self.assertEqual(response.status_code, 501)
+
+    async def test_events_endpoint(self):
+        url = reverse('api_product_events')
+        response = await self.async_client.get(url, {'type': 'saree'})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        response = await self.async_client.get(url, headers={'authorization': 'Bearer nonsense'})
+        self.assertEqual(response.status_code, 401)
+
+        token = str((await sync_to_async(RefreshToken.for_user)(self.seller)).access_token)
+        headers = {'authorization': f'Bearer {token}'}
+        response = await self.async_client.get(url, {'type': 'rug'}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.async_client.get(url, {'type': 'saree'}, headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = aiter(response.streaming_content)
+        self.assertTrue((await anext(frames)).startswith(b'retry:'))
+        await frames.aclose()
+
+
+def make_image(size=(1600, 1200), color=(180, 30, 60), name='saree.jpg'):
+    import io
+    from PIL import Image
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    out = io.BytesIO()
+    Image.new('RGB', size, color).save(out, 'JPEG')
+    return SimpleUploadedFile(name, out.getvalue(), content_type='image/jpeg')
+
+
+class ProductImageTest(APITestCase):
+    def setUp(self):
+        import tempfile
+
+        self.media = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media.name, IMAGE_PROCESSING='sync')
+        self.settings_override.enable()
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media.cleanup()
+
+    def create_with_image(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = SilkProduct.objects.create(
+                name='Saree', type='saree', price=100, owner=self.seller, image=make_image(**kwargs))
+        return SilkProduct.objects.get(pk=product.pk)
+
+    def test_upload_through_form_generates_variants(self):
+        from PIL import Image
+        from django.core.files.storage import default_storage
+
+        self.client.login(username='seller1', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('product_create'), {
+                'name': 'Red Saree', 'type': 'saree', 'price': '1500.00', 'image': make_image(),
+            })
+        product = SilkProduct.objects.get(name='Red Saree')
+        self.assertEqual(set(product.image_variants), {'thumb', 'medium', 'large'})
+        self.assertEqual(product.thumbnail, product.image_variants['thumb'])
+        with default_storage.open(product.thumbnail) as thumb:
+            self.assertLessEqual(max(Image.open(thumb).size), 240)
+
+        response = self.client.get(reverse('product_list'))
+        self.assertContains(response, product.thumbnail_url)
+        self.assertNotContains(response, product.image.url)
+
+    def test_variants_are_content_addressed_and_immutable(self):
+        first = self.create_with_image()
+        second = self.create_with_image()
+        self.assertEqual(first.thumbnail, second.thumbnail)
+
+        with override_settings(DEBUG=True):
+            response = self.client.get(first.thumbnail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_variants_are_sent_by_the_web_server(self):
+        from unittest import mock
+
+        product = self.create_with_image()
+        self.assertEqual(self.client.get(product.thumbnail_url).status_code, 404)
+
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(product.thumbnail_url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{product.thumbnail}')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.content, b'')
+
+        url = product.thumbnail_url
+        with mock.patch('django.core.files.storage.FileSystemStorage.url', return_value='https://cdn.example.com/v.jpg'):
+            response = self.client.get(url)
+        self.assertRedirects(response, 'https://cdn.example.com/v.jpg', fetch_redirect_response=False)
+
+    def test_stale_instance_does_not_clear_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = SilkProduct.objects.create(name='Saree', type='saree', price=100, owner=self.seller, image=make_image())
+        product.name = 'Renamed'
+        product.save()
+        product = SilkProduct.objects.get(pk=product.pk)
+        self.assertEqual(product.name, 'Renamed')
+        self.assertTrue(product.thumbnail)
+
+    def test_replacing_image_regenerates_variants(self):
+        product = self.create_with_image()
+        old_thumbnail = product.thumbnail
+        product.image = make_image(color=(20, 120, 40), name='green.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+        self.assertTrue(product.thumbnail)
+        self.assertNotEqual(product.thumbnail, old_thumbnail)
+
+    def test_api_upload_and_list_thumbnail(self):
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('api_product_list_create'), {
+                'name': 'Scarf', 'type': 'scarf', 'price': '500.00', 'image': make_image(),
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(reverse('api_product_list_create'))
+        row = response.data['results'][0]
+        self.assertTrue(row['thumbnail'].startswith('http://testserver/media/products/variants/'))
+        self.assertNotIn('image', row)
+        self.assertNotIn('image_variants', row)
+
+    def test_process_pool_renders_variants(self):
+        data = make_image(size=(800, 600)).read()
+        variants = get_executor().submit(render_variants, data, {'thumb': (100, 100)}).result(timeout=60)
+        self.assertTrue(variants['thumb'].startswith(b'\xff\xd8'))
+
+
+class StockHoldTest(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        self.buyer = User.objects.create_user(username='buyer1', password='testpass123')
+        self.product = SilkProduct.objects.create(name='Saree', type='saree', price=100, owner=self.seller, stock=3)
+
+    def stock(self):
+        return SilkProduct.objects.values_list('stock', flat=True).get(pk=self.product.pk)
+
+    def test_reserve_never_oversells(self):
+        reserve(self.product.pk, self.buyer, 2)
+        with self.assertRaises(OutOfStock):
+            reserve(self.product.pk, self.buyer, 2)
+        reserve(self.product.pk, self.buyer, 1)
+        self.assertEqual(self.stock(), 0)
+        self.assertEqual(StockHold.objects.filter(status='held').count(), 2)
+
+    def test_unavailable_product_cannot_be_reserved(self):
+        SilkProduct.objects.filter(pk=self.product.pk).update(availability=False)
+        with self.assertRaises(OutOfStock):
+            reserve(self.product.pk, self.buyer)
+
+    def test_release_and_confirm_claim_once(self):
+        hold = reserve(self.product.pk, self.buyer, 2)
+        self.assertTrue(release(hold))
+        self.assertFalse(release(hold))
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(confirm(hold))
+
+        hold = reserve(self.product.pk, self.buyer, 1, ttl=timedelta(seconds=-1))
+        self.assertFalse(confirm(hold))
+        hold = reserve(self.product.pk, self.buyer, 1)
+        self.assertTrue(confirm(hold))
+        self.assertFalse(release(hold))
+        self.assertEqual(self.stock(), 1)
+
+    def test_sweeper_releases_only_expired_holds(self):
+        expired = [reserve(self.product.pk, self.buyer, 1, ttl=timedelta(minutes=-1)) for _ in range(2)]
+        live = reserve(self.product.pk, self.buyer, 1)
+        release(expired[0])
+        out = StringIO()
+        call_command('release_expired_holds', batch_size=1, stdout=out)
+        self.assertIn('Released 1 expired hold(s)', out.getvalue())
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(StockHold.objects.get(pk=expired[1].pk).status, 'expired')
+        self.assertEqual(StockHold.objects.get(pk=live.pk).status, 'held')
+        self.assertEqual(release_expired(), 0)
+
+    def test_seller_edit_applies_stock_as_delta(self):
+        product = SilkProduct.objects.get(pk=self.product.pk)
+        reserve(self.product.pk, self.buyer, 2)
+        product.stock = 5
+        product.name = 'Restocked Saree'
+        product.save()
+        self.assertEqual(product.stock, 3)
+        self.assertEqual(self.stock(), 3)
+
+        product.name = 'Renamed again'
+        product.save()
+        self.assertEqual(self.stock(), 3)
+
+    def test_hold_api(self):
+        refresh = RefreshToken.for_user(self.buyer)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        url = reverse('api_product_reserve', kwargs={'pk': self.product.pk})
+        response = self.client.post(url, {'quantity': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', response.data)
+        response = self.client.post(url, {'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        hold_id = response.data['id']
+        self.assertEqual(self.client.post(url, {'quantity': 2}, format='json').status_code, status.HTTP_409_CONFLICT)
+        missing = reverse('api_product_reserve', kwargs={'pk': 99999})
+        self.assertEqual(self.client.post(missing, {'quantity': 1}, format='json').status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(reverse('api_hold_confirm', kwargs={'pk': hold_id}))
+        self.assertEqual(response.data['status'], 'confirmed')
+        response = self.client.delete(reverse('api_hold_release', kwargs={'pk': hold_id}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.stock(), 1)
+
+
+class StockContentionTest(TransactionTestCase):
+    def test_concurrent_reservations_do_not_oversell(self):
+        import threading
+        from django.db import OperationalError, connections
+
+        seller = User.objects.create_user(username='seller1', password='testpass123')
+        buyer = User.objects.create_user(username='buyer1', password='testpass123')
+        product = SilkProduct.objects.create(name='Last Saree', type='saree', price=100, owner=seller, stock=25)
+        results = {'held': 0, 'sold_out': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(10):
+                    while True:
+                        try:
+                            reserve(product.pk, buyer)
+                            outcome = 'held'
+                        except OutOfStock:
+                            outcome = 'sold_out'
+                        except OperationalError:
+                            continue  # SQLite "table is locked": retry the whole reservation
+                        break
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {'held': 25, 'sold_out': 55})
+        self.assertEqual(SilkProduct.objects.get(pk=product.pk).stock, 0)
+        self.assertEqual(StockHold.objects.count(), 25)
+
+
+class ProductListCacheTest(APITestCase):
+    def setUp(self):
+        product_list_cache.clear()
+        product_list_cache.reset_stats()
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        self.staff = User.objects.create_user(username='manager', password='testpass123', is_staff=True)
+        for i in range(5):
+            SilkProduct.objects.create(name=f'Red Saree {i}', type='saree', price=100 + i, owner=self.seller)
+        SilkProduct.objects.create(name='Blue Scarf', type='scarf', price=50, owner=self.seller)
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.url = reverse('api_product_list_create')
+
+    def names(self, params):
+        return [row['name'] for row in self.client.get(self.url, params).data['results']]
+
+    def test_repeat_query_is_served_from_cache(self):
+        first = self.names({'type': 'saree', 'search': 'RED  saree'})
+        with CaptureQueriesContext(connection) as queries:
+            second = self.names({'type': 'saree', 'search': 'red saree'})
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], 'Red Saree 4')
+        product_sql = [q['sql'] for q in queries.captured_queries if 'silk_products_silkproduct' in q['sql']]
+        self.assertEqual(len(product_sql), 1)
+        self.assertIn(' IN (', product_sql[0])
+        self.assertEqual((product_list_cache.hits, product_list_cache.misses), (1, 1))
+
+    def test_writes_invalidate_cached_lists(self):
+        self.assertEqual(len(self.names({'type': 'scarf'})), 1)
+        SilkProduct.objects.create(name='Green Scarf', type='scarf', price=60, owner=self.seller)
+        self.assertEqual(self.names({'type': 'scarf'}), ['Green Scarf', 'Blue Scarf'])
+
+        set_availability(SilkProduct.objects.filter(type='scarf'), False)
+        self.assertEqual(self.names({'type': 'scarf', 'available': 'true'}), [])
+
+    def test_writes_from_other_processes_are_seen(self):
+        catalog.reset()
+        self.assertEqual(len(self.names({'type': 'scarf'})), 1)
+        # bulk_create sends no signals, and another process's commit only moves
+        # the version row in the database.
+        SilkProduct.objects.bulk_create([SilkProduct(name='Green Scarf', type='scarf', price=60, owner=self.seller)])
+        VersionCounter('catalog').bump()
+        self.assertEqual(len(self.names({'type': 'scarf'})), 1)
+        with self.settings(SHARED_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(self.names({'type': 'scarf'}), ['Green Scarf', 'Blue Scarf'])
+
+    def test_one_version_bump_per_transaction(self):
+        shared = VersionCounter('catalog')
+        before = shared.bump()
+        # setUp's writes queued a bump on the test transaction, which never commits.
+        connection.pending_catalog_bump = None
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                SilkProduct.objects.create(name=f'Shawl {i}', type='shawl', price=10, owner=self.seller)
+            set_availability(SilkProduct.objects.filter(type='shawl'), False)
+        shared.refresh()
+        self.assertEqual(shared.value, before + 1)
+
+        # A rolled-back savepoint takes its queued bump with it.
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                SilkProduct.objects.create(name='Lost Shawl', type='shawl', price=10, owner=self.seller)
+                transaction.set_rollback(True)
+            SilkProduct.objects.create(name='Kept Shawl', type='shawl', price=10, owner=self.seller)
+        shared.refresh()
+        self.assertEqual(shared.value, before + 2)
+
+    def test_entries_expire(self):
+        lru = IdListCache(max_entries=2, max_ids=3, max_age=0)
+        lru.get_ids('a', lambda limit: [1])
+        self.assertEqual(lru.get_ids('a', lambda limit: [2]), (2,))
+        self.assertEqual((lru.hits, lru.misses), (0, 2))
+
+    def test_pagination_over_cached_ids(self):
+        SilkProduct.objects.bulk_create([
+            SilkProduct(name=f'Shawl {i}', type='shawl', price=10, owner=self.seller) for i in range(20)
+        ])
+        self.names({})
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(response.data['count'], 26)
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(product_list_cache.hits, 1)
+
+    def test_lru_eviction_and_size_limits(self):
+        lru = IdListCache(max_entries=2, max_ids=3)
+        lru.get_ids('a', lambda limit: [1])
+        lru.get_ids('b', lambda limit: [2])
+        lru.get_ids('a', lambda limit: [1])
+        lru.get_ids('c', lambda limit: [3])
+        self.assertEqual(lru.evictions, 1)
+        self.assertEqual(lru.get_ids('a', lambda limit: [1]), (1,))
+        self.assertIsNone(lru.get_ids('d', lambda limit: [1, 2, 3, 4][:limit]))
+        self.assertIsNone(lru.get_ids('d', lambda limit: self.fail('recomputed')))
+        stats = lru.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['uncacheable'], stats['entries']), (2, 4, 2, 2))
+
+    def test_uncacheable_lists_fall_back_to_database_pagination(self):
+        with self.settings(PRODUCT_LIST_CACHE_MAX_IDS=3):
+            self.assertEqual(len(self.names({})), 6)
+            self.assertEqual(self.names({'type': 'scarf'}), ['Blue Scarf'])
+        with self.settings(PRODUCT_LIST_CACHE_SIZE=0):
+            self.assertEqual(len(self.names({})), 6)
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.names({})
+        self.assertEqual(self.client.get(reverse('api_product_list_cache')).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(reverse('api_product_list_cache'))
+        self.assertEqual(response.data['misses'], 1)
+
+
+class ProductCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller1', password='testpass123', first_name='Rina')
+        UserProfile.objects.create(user=self.seller, role='seller', phone='0171')
+        self.products = [
+            SilkProduct.objects.create(name=f'Saree {i}', type='saree', price=100 + i, owner=self.seller, stock=5)
+            for i in range(3)
+        ]
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def product_queries(self, queries):
+        return [q['sql'] for q in queries.captured_queries if 'silk_products_silkproduct' in q['sql']]
+
+    def test_detail_is_served_from_cache(self):
+        url = reverse('api_product_detail', args=[self.products[0].pk])
+        self.assertEqual(self.client.get(url).data['name'], 'Saree 0')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.data['name'], 'Saree 0')
+        self.assertEqual(self.product_queries(queries), [])
+
+    def test_cached_product_includes_owner_and_profile(self):
+        get_product(self.products[0].pk)
+        with self.assertNumQueries(0):
+            product = get_product(self.products[0].pk)
+            self.assertEqual((product.owner.first_name, product.owner.userprofile.phone), ('Rina', '0171'))
+
+    def test_writes_invalidate_cached_product(self):
+        product = self.products[0]
+        get_product(product.pk)
+        product.name = 'Renamed Saree'
+        product.save()
+        self.assertEqual(get_product(product.pk).name, 'Renamed Saree')
+
+        reserve(product.pk, self.seller, 2)
+        self.assertEqual(get_product(product.pk).stock, 3)
+
+        reprice(SilkProduct.objects.filter(pk=product.pk), amount=Decimal('10'))
+        self.assertEqual(get_product(product.pk).price, Decimal('110.00'))
+
+        self.seller.first_name = 'Rupa'
+        self.seller.save()
+        self.assertEqual(get_product(product.pk).owner.first_name, 'Rupa')
+
+        pk = product.pk
+        product.delete()
+        self.assertIsNone(get_product(pk))
+
+    def test_web_detail_uses_cache(self):
+        url = reverse('product_detail', args=[self.products[0].pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'Saree 0')
+        self.assertContains(response, '0171')
+        self.assertEqual([sql for sql in self.product_queries(queries) if 'similarproduct' not in sql], [])
+
+    def test_batch_endpoint_fetches_misses_in_one_query(self):
+        first, second, third = self.products
+        get_products([second.pk])
+        url = reverse('api_product_list_create')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'ids': f'{third.pk},{second.pk},999999,{first.pk}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['results']], [third.pk, second.pk, first.pk])
+        self.assertEqual(response.data['missing'], [999999])
+        product_sql = self.product_queries(queries)
+        self.assertEqual(len(product_sql), 1)
+        self.assertIn(' IN (', product_sql[0])
+
+    def test_batch_endpoint_validates_ids(self):
+        url = reverse('api_product_list_create')
+        self.assertEqual(self.client.get(url, {'ids': '1,x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(PRODUCT_BATCH_MAX_IDS=2):
+            self.assertEqual(self.client.get(url, {'ids': '1,2,3'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsetTest(APITestCase):
+    def setUp(self):
+        product_list_cache.clear()
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+        self.product = SilkProduct.objects.create(
+            name='Saree', type='saree', price=100, owner=self.seller, description='Long handwoven story ' * 20)
+        refresh = RefreshToken.for_user(self.seller)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def product_selects(self, queries):
+        return [q['sql'] for q in queries.captured_queries
+                if q['sql'].startswith('SELECT') and 'FROM "silk_products_silkproduct"' in q['sql']]
+
+    def test_list_returns_and_selects_only_requested_fields(self):
+        url = reverse('api_product_list_create')
+        for _ in range(2):  # list cache miss, then hit
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'fields': 'id,name,price,availability'})
+            self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'price', 'availability'})
+            hydrate = self.product_selects(queries)[-1]
+            self.assertNotIn('"summary"', hydrate)
+            self.assertNotIn('"owner_id"', hydrate)
+            self.assertIn('"price"', hydrate)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('api_product_list_create'), {'fields': 'name,description'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('description', str(response.data['fields']))
+
+    def test_detail_and_batch_fields(self):
+        url = reverse('api_product_detail', args=[self.product.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'name,description'})
+        self.assertEqual(response.data, {'name': 'Saree', 'description': self.product.description})
+        self.assertFalse([q for q in queries.captured_queries if 'similarproduct' in q['sql']])
+        self.assertIn('similar', self.client.get(url).data)
+
+        batch_url = reverse('api_product_list_create')
+        response = self.client.get(batch_url, {'ids': str(self.product.pk), 'fields': 'id,price'})
+        self.assertEqual(response.data['results'], [{'id': self.product.pk, 'price': '100.00'}])
+        # The batch takes the list's allow-list, so heavy fields stay detail-only.
+        response = self.client.get(batch_url, {'ids': str(self.product.pk), 'fields': 'id,description'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('description', str(response.data['fields']))
+
+    def test_dashboard_fields(self):
+        response = self.client.get(reverse('api_seller_dashboard'), {'fields': 'id,thumbnail'})
+        self.assertEqual(response.data['results'], [{'id': self.product.pk, 'thumbnail': None}])
+
+
+class ProvisionUsersTest(TestCase):
+    def setUp(self):
+        import tempfile
+
+        self.dir = tempfile.TemporaryDirectory()
+        User.objects.create_user(username='existing', password='testpass123')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name, text):
+        path = f'{self.dir.name}/{name}'
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def provision(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('provision_users', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_creates_users_and_reports_row_errors(self):
+        path = self.write('coop.csv', (
+            'username,email,password,first_name,last_name,role,phone\n'
+            'weaver1,w1@example.com,Weave-Rajshahi-24,Amina,Khatun,,0171\n'
+            'weaver2,w2@example.com,Weave-Rajshahi-24,Rina,Das,buyer,\n'
+            'WEAVER1,w3@example.com,Weave-Rajshahi-24,,,,\n'
+            'weaver4,not-an-email,Weave-Rajshahi-24,,,,\n'
+            'weaver5,w5@example.com,Weave-Rajshahi-24,,,owner,\n'
+            'Existing,x@example.com,Weave-Rajshahi-24,,,,\n'
+            'weaver7,w7@example.com,123,,,,\n'
+            'weaver8,w8@example.com,,,,,\n'
+        ))
+        out, err = self.provision(path, workers=0, batch_size=2)
+        self.assertIn('created 3 user(s)', out)
+        self.assertIn('5 error(s)', out)
+        for line in ('line 4 (WEAVER1): Duplicate', 'line 5 (weaver4)', 'line 6 (weaver5): role',
+                     'line 7 (Existing): A user', 'line 8 (weaver7)'):
+            self.assertIn(line, err)
+
+        weaver = User.objects.get(username='weaver1')
+        self.assertTrue(weaver.check_password('Weave-Rajshahi-24'))
+        self.assertEqual((weaver.userprofile.role, weaver.userprofile.phone), ('seller', '0171'))
+        self.assertEqual(User.objects.get(username='weaver2').userprofile.role, 'buyer')
+        self.assertFalse(User.objects.get(username='weaver8').has_usable_password())
+
+    def test_jsonl_hashes_in_process_pool(self):
+        path = self.write('coop.jsonl', (
+            '{"username": "weaver1", "password": "Weave-Rajshahi-24"}\n'
+            '\n'
+            '{"username": "weaver2"\n'
+            '{"username": "weaver3", "password": "Silk-Road-Loom-9", "role": "buyer"}\n'
+        ))
+        out, err = self.provision(path, workers=1)
+        self.assertIn('Read 3 row(s): created 2 user(s)', out)
+        self.assertIn('line 3: Invalid JSON', err)
+        self.assertTrue(User.objects.get(username='weaver3').check_password('Silk-Road-Loom-9'))
+
+    def test_dry_run_creates_nothing(self):
+        path = self.write('coop.csv', 'username,password\nweaver1,Weave-Rajshahi-24\nexisting,x\n')
+        out, _ = self.provision(path, dry_run=True)
+        self.assertIn('1 of 2 row(s) valid', out)
+        self.assertFalse(User.objects.filter(username='weaver1').exists())
+
+    def test_api_registration_creates_profile_in_same_transaction(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from .serializers import UserRegistrationSerializer
+
+        serializer = UserRegistrationSerializer(data={
+            'username': 'weaver1', 'email': 'w1@example.com', 'password': 'Weave-Rajshahi-24',
+            'password_confirm': 'Weave-Rajshahi-24', 'role': 'seller',
+        })
+        self.assertTrue(serializer.is_valid())
+        with mock.patch.object(UserProfile.objects, 'create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                serializer.save()
+        self.assertFalse(User.objects.filter(username='weaver1').exists())
+
+
+class CurrencyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        rates.reset()
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+        self.product = SilkProduct.objects.create(name='Saree', type='saree', price=Decimal('10.05'), owner=self.seller)
+
+    def load(self, *rates):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('load_exchange_rates', *[f'--rate={rate}' for rate in rates], stdout=StringIO())
+
+    def test_conversion_rounds_half_up_in_one_pass(self):
+        self.load('INR=0.5', 'BDT=117.125')
+        currency, amounts = convert_prices([Decimal('10.05'), Decimal('1.00'), Decimal('0')], 'INR')
+        self.assertEqual(currency.code, 'INR')
+        self.assertEqual(amounts, [Decimal('5.03'), Decimal('0.50'), Decimal('0.00')])
+        self.assertEqual(convert_prices([Decimal('1.00')], 'BDT')[1], [Decimal('117.13')])
+
+    def test_missing_rate_falls_back_to_base_currency(self):
+        currency, amounts = convert_prices([Decimal('10.05')], 'BDT')
+        self.assertEqual((currency.code, amounts), ('USD', [Decimal('10.05')]))
+
+    def test_rates_cached_until_version_changes(self):
+        self.load('BDT=110')
+        self.assertEqual(rate_table.rate('BDT'), Decimal('110'))
+        with self.assertNumQueries(0):
+            rate_table.rate('BDT')
+        self.load('BDT=120.5')
+        self.assertEqual(rate_table.rate('BDT'), Decimal('120.5'))
+
+        rate = ExchangeRate.objects.get(currency='BDT')
+        rate.rate = Decimal('121')
+        with self.captureOnCommitCallbacks(execute=True):
+            rate.save()
+        self.assertEqual(rate_table.rate('BDT'), Decimal('121'))
+
+    def test_rates_loaded_by_another_process_are_seen(self):
+        self.load('BDT=110')
+        self.assertEqual(rate_table.rate('BDT'), Decimal('110'))
+        # What load_exchange_rates leaves behind when run from cron: new rows
+        # and a bumped version, with this process's copy untouched.
+        ExchangeRate.objects.filter(currency='BDT').update(rate=Decimal('125'))
+        VersionCounter('rates').bump()
+        self.assertEqual(rate_table.rate('BDT'), Decimal('110'))
+        with self.settings(SHARED_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(rate_table.rate('BDT'), Decimal('125'))
+
+    def test_pages_show_prices_in_chosen_currency(self):
+        self.load('BDT=100')
+        response = self.client.get(reverse('product_list'), {'currency': 'bdt'})
+        self.assertContains(response, '৳1005.00')
+        # The choice sticks for the session.
+        response = self.client.get(reverse('product_detail', args=[self.product.pk]))
+        self.assertContains(response, '৳1005.00')
+        response = self.client.get(reverse('product_list'), {'currency': 'USD'})
+        self.assertContains(response, '$10.05')
+
+    def test_session_is_only_read_when_the_client_has_one(self):
+        from django.contrib.sessions.backends.db import SessionStore
+        from django.test import RequestFactory
+
+        from .currency import currency_context, get_currency
+
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        context = currency_context(request)
+        self.assertFalse(request.session.accessed)
+        self.assertEqual(context['currency'], settings.DEFAULT_CURRENCY)
+        self.assertFalse(request.session.accessed)
+
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'abc'
+        get_currency(request)
+        self.assertTrue(request.session.accessed)
+
+    def test_switcher_keeps_the_query(self):
+        response = self.client.get(reverse('product_list'), {'q': 'saree', 'sort': 'trending'})
+        self.assertContains(response, 'href="?q=saree&amp;sort=trending&amp;currency=BDT"')
+
+    def test_load_rejects_bad_rates(self):
+        from django.core.management.base import CommandError
+
+        for rate in ('EUR=1.1', 'BDT=abc', 'BDT=-2', 'USD=1'):
+            with self.assertRaises(CommandError):
+                call_command('load_exchange_rates', f'--rate={rate}', stdout=StringIO())
+
+
+class ProductViewCountTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        view_buffer.clear()
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        UserProfile.objects.create(user=self.seller, role='seller')
+        self.products = [
+            SilkProduct.objects.create(name=f'Saree {i}', type='saree', price=100, owner=self.seller)
+            for i in range(2)
+        ]
+
+    def tearDown(self):
+        view_buffer.clear()
+
+    def views(self, product):
+        return ProductViewCount.objects.filter(product=product).values_list('views', flat=True).first()
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600, VIEW_COUNT_FLUSH_HITS=1000)
+    def test_snapshot_beacon_counts_view(self):
+        product = self.products[0]
+        url = reverse('product_viewed', args=[product.pk])
+        self.assertEqual(self.client.post(url).status_code, 204)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(reverse('product_viewed', args=[999999])).status_code, 404)
+        view_buffer.flush()
+        self.assertEqual(self.views(product), 1)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600, VIEW_COUNT_FLUSH_HITS=1000)
+    def test_views_are_buffered_until_flush(self):
+        first, second = self.products
+        url = reverse('product_detail', args=[first.pk])
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.client.get(url)
+        self.assertFalse([q for q in queries.captured_queries if 'productviewcount' in q['sql']])
+        self.assertIsNone(self.views(first))
+
+        self.client.force_authenticate(self.seller)
+        self.client.get(reverse('api_product_detail', args=[second.pk]))
+        self.assertEqual(view_buffer.flush(), 4)
+        self.assertEqual((self.views(first), self.views(second)), (3, 1))
+
+        self.client.get(url)
+        view_buffer.flush()
+        self.assertEqual(self.views(first), 4)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=3600, VIEW_COUNT_FLUSH_HITS=2)
+    def test_flushes_after_max_pending_hits(self):
+        url = reverse('product_detail', args=[self.products[0].pk])
+        self.client.get(url)
+        self.assertIsNone(self.views(self.products[0]))
+        self.client.get(url)
+        self.assertEqual(self.views(self.products[0]), 2)
+        self.assertEqual(view_buffer.pending_hits, 0)
+
+    def test_failed_flush_keeps_counts(self):
+        from unittest import mock
+        from django.db import OperationalError
+
+        view_buffer.pending[self.products[0].pk] += 5
+        view_buffer.pending_hits += 5
+        with mock.patch('silk_products.viewcounts.add_views', side_effect=OperationalError('locked')), \
+                self.assertLogs('silk_products.viewcounts', 'ERROR'):
+            self.assertEqual(view_buffer.flush(), 0)
+        self.assertEqual(view_buffer.flush(), 5)
+        self.assertEqual(self.views(self.products[0]), 5)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0.2, VIEW_COUNT_FLUSH_HITS=1000)
+    def test_background_flush_writes_idle_buffer(self):
+        import threading
+        from unittest import mock
+
+        written = threading.Event()
+        buffer = ViewBuffer()
+        buffer.background = True
+        with mock.patch('silk_products.viewcounts.add_views', side_effect=lambda counts: written.set()) as add:
+            try:
+                buffer.record(self.products[0].pk)
+                # No further views arrive; the flusher thread writes the pending one.
+                self.assertTrue(written.wait(5))
+            finally:
+                buffer.background = False
+        add.assert_called_once_with({self.products[0].pk: 1})
+        self.assertEqual(buffer.pending_hits, 0)
+
+    def test_upsert_batches_many_products(self):
+        from unittest import mock
+
+        with mock.patch('silk_products.viewcounts.UPSERT_BATCH', 1):
+            add_views({product.pk: 2 for product in self.products})
+            add_views({self.products[0].pk: 1})
+        self.assertEqual([self.views(p) for p in self.products], [3, 2])
+
+    def test_dashboards_show_views(self):
+        add_views({self.products[0].pk: 7})
+        self.client.force_authenticate(User.objects.get(pk=self.seller.pk))
+        response = self.client.get(reverse('api_seller_dashboard'), {'fields': 'id,views'})
+        self.assertEqual(sorted(response.data['results'], key=lambda row: row['id']),
+                         [{'id': self.products[0].pk, 'views': 7}, {'id': self.products[1].pk, 'views': 0}])
+
+        self.client.login(username='seller1', password='testpass123')
+        response = self.client.get(reverse('seller_dashboard'))
+        self.assertEqual(sorted(p.views for p in response.context['page_obj']), [0, 7])
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=24, TRENDING_WEIGHTS={'view': 1, 'contact': 10, 'new': 5})
+class TrendingTest(APITestCase):
+    def setUp(self):
+        product_list_cache.clear()
+        self.now = timezone.now()
+        self.seller = User.objects.create_user(username='seller1', password='testpass123')
+        self.old, self.recent, self.quiet = [
+            SilkProduct.objects.create(name=name, type='saree', price=100, owner=self.seller)
+            for name in ('Old Favourite', 'Rising Saree', 'Quiet Saree')
+        ]
+        SilkProduct.objects.update(created_at=self.now - timedelta(days=30))
+
+    def activity(self, product, views=0, contacts=0, days_ago=0):
+        if views:
+            add_views({product.pk: views})
+        if contacts:
+            add_counts({product.pk: contacts}, 'contacts')
+        ProductViewCount.objects.filter(product=product).update(updated_at=self.now - timedelta(days=days_ago))
+
+    def ranking(self):
+        return list(SilkProduct.objects.order_by('-trending_score', '-id').values_list('name', flat=True))
+
+    def test_score_math(self):
+        later = self.now + timedelta(hours=24)
+        self.assertAlmostEqual(event_score(1, later) - event_score(1, self.now), math.log(2))
+        self.assertAlmostEqual(add_scores(event_score(1, self.now), event_score(1, self.now)),
+                               event_score(2, self.now))
+        self.assertAlmostEqual(add_scores(1000.0, 0.0), 1000.0)
+
+    def test_recent_activity_outranks_older_activity(self):
+        self.activity(self.old, views=100, days_ago=10)
+        self.activity(self.recent, views=5, contacts=1, days_ago=0)
+        self.assertEqual(refresh_trending(now=self.now), 3)
+        self.assertEqual(self.ranking(), ['Rising Saree', 'Old Favourite', 'Quiet Saree'])
+
+    def test_refresh_is_incremental(self):
+        self.activity(self.old, views=10, days_ago=1)
+        refresh_trending(now=self.now - timedelta(hours=1))
+        before = dict(SilkProduct.objects.values_list('pk', 'trending_score'))
+
+        self.activity(self.old, views=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(refresh_trending(now=self.now), 1)
+        after = dict(SilkProduct.objects.values_list('pk', 'trending_score'))
+        self.assertGreater(after[self.old.pk], before[self.old.pk])
+        self.assertEqual(after[self.quiet.pk], before[self.quiet.pk])
+        counts = ProductViewCount.objects.get(product=self.old)
+        self.assertEqual((counts.scored_views, counts.views), (15, 15))
+
+        full = refresh_trending(full=True, now=self.now)
+        self.assertEqual(full, 3)
+
+    def test_trending_sort_on_api_and_page(self):
+        self.activity(self.quiet, views=50)
+        refresh_trending(now=self.now)
+        self.client.force_authenticate(self.seller)
+        url = reverse('api_product_list_create')
+        response = self.client.get(url, {'sort': 'trending'})
+        self.assertEqual(response.data['results'][0]['name'], 'Quiet Saree')
+        self.assertEqual(self.client.get(url, {'sort': 'random'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('product_list'), {'sort': 'trending'})
+        self.assertEqual(response.context['products'][0].name, 'Quiet Saree')
+
+    def test_refresh_rereads_overlap_without_double_counting(self):
+        refresh_trending(now=self.now - timedelta(minutes=5))
+        before = dict(SilkProduct.objects.values_list('pk', 'trending_score'))
+        # Committed after that run by a transaction that started before it.
+        self.activity(self.quiet, views=3, days_ago=0)
+        ProductViewCount.objects.update(updated_at=self.now - timedelta(minutes=7))
+        late = SilkProduct.objects.create(name='Late Saree', type='saree', price=100, owner=self.seller)
+        SilkProduct.objects.filter(pk=late.pk).update(created_at=self.now - timedelta(minutes=6))
+
+        self.assertEqual(refresh_trending(now=self.now), 2)
+        after = dict(SilkProduct.objects.values_list('pk', 'trending_score'))
+        self.assertGreater(after[self.quiet.pk], before[self.quiet.pk])
+        self.assertGreater(after[late.pk], 0)
+        self.assertEqual(refresh_trending(now=self.now + timedelta(minutes=1)), 0)
+        self.assertEqual(dict(SilkProduct.objects.values_list('pk', 'trending_score')), after)
+
+    def test_refresh_from_another_process_reaches_cached_lists(self):
+        from unittest import mock
+
+        catalog.reset()
+        self.activity(self.old, views=20)
+        refresh_trending(now=self.now)
+        self.client.force_authenticate(self.seller)
+        url = reverse('api_product_list_create')
+        self.assertEqual(self.client.get(url, {'sort': 'trending'}).data['results'][0]['name'], 'Old Favourite')
+
+        # The cron process has its own version counter; this worker's is untouched.
+        self.activity(self.quiet, views=500)
+        with mock.patch('silk_products.trending.bump_catalog_version', VersionCounter('catalog').bump), \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('refresh_trending', stdout=StringIO())
+        self.assertEqual(self.client.get(url, {'sort': 'trending'}).data['results'][0]['name'], 'Old Favourite')
+        with self.settings(SHARED_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(self.client.get(url, {'sort': 'trending'}).data['results'][0]['name'], 'Quiet Saree')
+
+    def test_trending_order_uses_index(self):
+        plan = SilkProduct.objects.order_by('-trending_score', '-id')[:20].explain()
+        self.assertIn('product_trending_idx', plan)
+
+
+class SnapshotTest(TestCase):
+    def setUp(self):
+        import tempfile
+
+        cache.clear()
+        rates.reset()
+        self.dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.dir.name)
+        self.seller = User.objects.create_user(username='seller1', password='testpass123', email='s@example.com')
+        self.profile = UserProfile.objects.create(user=self.seller, role='seller', phone='0171')
+        self.saree, self.scarf, self.shawl = [
+            SilkProduct.objects.create(name=name, type=kind, price=100, owner=self.seller)
+            for name, kind in (('Red Saree', 'saree'), ('Blue Scarf', 'scarf'), ('Green Shawl', 'shawl'))
+        ]
+        SimilarProduct.objects.create(product=self.saree, similar=self.scarf, rank=1, score=0.5)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def build(self, **options):
+        return build_snapshot(self.root, workers=0, **options)
+
+    def page(self, product=None):
+        url = reverse('product_detail', args=[product.pk]) if product else reverse('product_list')
+        return (self.root / url.strip('/') / 'index.html').read_text()
+
+    def test_full_build_writes_every_page(self):
+        result = self.build()
+        self.assertEqual((result.rendered, result.removed, result.full), (3, 0, True))
+        self.assertIn('Red Saree', self.page())
+        self.assertIn('Green Shawl', self.page())
+        detail = self.page(self.saree)
+        self.assertIn('$100.00', detail)
+        self.assertIn('0171', detail)
+        self.assertIn('Blue Scarf', detail)
+        self.assertIn('as a buyer to contact this seller', detail)
+        self.assertIn(reverse('product_viewed', args=[self.saree.pk]), detail)
+        self.assertNotIn('sendBeacon', self.client.get(reverse('product_detail', args=[self.saree.pk])).content.decode())
+        self.assertEqual(list(self.root.rglob('*.tmp')), [])
+        self.assertEqual(oct((self.root / 'index.html').stat().st_mode & 0o777), '0o644')
+        manifest = json.loads((self.root / MANIFEST).read_text())
+        self.assertEqual(set(manifest['pages']), {str(p.pk) for p in (self.saree, self.scarf, self.shawl)})
+
+    def test_incremental_build_renders_changed_pages_only(self):
+        self.build()
+        self.assertEqual(self.build().rendered, 0)
+
+        self.shawl.price = 150
+        self.shawl.save()
+        result = self.build()
+        self.assertEqual((result.rendered, result.full), (1, False))
+        self.assertIn('$150.00', self.page(self.shawl))
+        self.assertIn('$150.00', self.page())
+
+        # The saree's page shows the scarf, so a change to the scarf renders both.
+        self.scarf.name = 'Blue Silk Scarf'
+        self.scarf.save()
+        self.assertEqual(self.build().rendered, 2)
+        self.assertIn('Blue Silk Scarf', self.page(self.saree))
+
+        # Seller details are on every page of theirs but don't touch updated_at.
+        self.profile.phone = '0199'
+        self.profile.save()
+        self.assertEqual(self.build().rendered, 3)
+        self.assertIn('0199', self.page(self.shawl))
+
+    def test_deleted_products_are_removed(self):
+        self.build()
+        page = self.root / 'product' / str(self.shawl.pk)
+        self.shawl.delete()
+        result = self.build()
+        self.assertEqual((result.rendered, result.removed), (0, 1))
+        self.assertFalse(page.exists())
+        self.assertNotIn('Green Shawl', self.page())
+
+    @override_settings(DEFAULT_CURRENCY='BDT')
+    def test_rate_change_rebuilds_everything(self):
+        rate = ExchangeRate.objects.create(currency='BDT', rate=Decimal('110'))
+        self.build()
+        self.assertIn('৳11000.00', self.page(self.saree))
+        rate.rate = Decimal('120')
+        with self.captureOnCommitCallbacks(execute=True):
+            rate.save()
+        result = self.build()
+        self.assertEqual((result.rendered, result.full), (3, True))
+        self.assertIn('৳12000.00', self.page(self.saree))
+
+    def test_full_rebuild_in_process_pool(self):
+        result = build_snapshot(self.root, full=True, workers=2)
+        self.assertEqual(result.rendered, 3)
+        self.assertIn('Blue Scarf', self.page(self.saree))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('build_snapshot', '--output', str(self.root), '--workers', '0', stdout=out)
+        self.assertIn('Rendered 3 product page(s), removed 0 (full rebuild)', out.getvalue())
+
+
+class StructuredLoggingTest(TestCase):
+    def make_record(self, msg='hello %s', args=('world',), **extra):
+        import logging
+
+        record = logging.LogRecord('silk_products.test', logging.INFO, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter_includes_extra_fields(self):
+        line = JsonFormatter().format(self.make_record(status=200, url_name='product_list'))
+        data = json.loads(line)
+        self.assertEqual(data['message'], 'hello world')
+        self.assertEqual((data['status'], data['url_name'], data['level']), (200, 'product_list', 'INFO'))
+
+    def test_queue_handler_drops_instead_of_blocking(self):
+        import logging
+        import tempfile
+        import threading
+
+        class BlockingHandler(logging.Handler):
+            def __init__(self):
+                super().__init__()
+                self.gate = threading.Event()
+                self.started = threading.Event()
+                self.records = []
+
+            def emit(self, record):
+                self.started.set()
+                self.gate.wait(5)
+                self.records.append(record)
+
+        with tempfile.TemporaryDirectory() as logs:
+            handler = QueueingHandler(filename=f'{logs}/test.log', maxsize=1)
+            target = handler.target = BlockingHandler()
+            try:
+                handler.emit(self.make_record())
+                target.started.wait(5)
+                handler.emit(self.make_record())
+                handler.emit(self.make_record())
+                self.assertEqual(handler.stats()['dropped'], {'INFO': 1})
+                target.gate.set()
+                handler.flush()
+                self.assertEqual(len(target.records), 3)
+                self.assertIn('dropped 1 record', target.records[1].getMessage())
+            finally:
+                target.gate.set()
+                handler.close()
+
+    def test_queue_handler_starts_writer_per_process(self):
+        import tempfile
+        from unittest import mock
+
+        with tempfile.TemporaryDirectory() as logs:
+            path = Path(logs) / 'sub' / 'test.log'
+            handler = QueueingHandler(filename=str(path))
+            handler.setFormatter(JsonFormatter())
+            try:
+                # Configuring logging opens nothing and starts no thread.
+                self.assertIsNone(handler._writer)
+                self.assertFalse(path.parent.exists())
+
+                handler.emit(self.make_record())
+                parent_writer, parent_queue = handler._writer, handler.queue
+                handler.flush()
+                self.assertEqual(json.loads(path.read_text())['message'], 'hello world')
+
+                # A forked child inherits the handler but not its writer thread.
+                with mock.patch('silk_products.log.os.getpid', return_value=-1):
+                    handler.emit(self.make_record(msg='in child', args=()))
+                    self.assertIsNot(handler._writer, parent_writer)
+                    handler.close()
+                self.assertIn('in child', path.read_text())
+            finally:
+                handler.close()
+                parent_queue.put(None)
+                parent_writer.join(5)
+
+    def test_request_middleware_logs_access_record(self):
+        user = User.objects.create_user(username='seller1', password='testpass123')
+        SilkProduct.objects.create(name='Saree', type='saree', price=100, owner=user)
+        self.client.login(username='seller1', password='testpass123')
+        with self.assertLogs('silk_products.access', 'INFO') as logs:
+            self.client.get(reverse('product_list'))
+        record = logs.records[0]
+        self.assertEqual((record.url_name, record.status, record.user_id), ('product_list', 200, user.pk))
+        self.assertGreaterEqual(record.queries, 1)
+        self.assertGreater(record.duration_ms, 0)
+
+
+class SamplingProfilerTest(TestCase):
+    def setUp(self):
+        import tempfile
+
+        self.profiles = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(PROFILE_DIR=self.profiles.name, PROFILE_INTERVAL_MS=1)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='seller1', password='testpass123')
+        SilkProduct.objects.create(name='Saree', type='saree', price=100, owner=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.profiles.cleanup()
+
+    def test_sampler_collects_stacks_of_target_thread(self):
+        import threading
+        import time
+
+        def busy():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        sampler = StackSampler(threading.get_ident(), 0.001).start()
+        busy()
+        stacks = sampler.stop()
+        self.assertTrue(stacks)
+        self.assertTrue(any(stack.endswith('.busy') for stack in stacks))
+
+    def test_unsampled_requests_write_nothing(self):
+        with override_settings(PROFILE_SAMPLE_RATE=0):
+            self.client.get(reverse('product_list'), HTTP_X_SILK_PROFILE='forged')
+        self.assertEqual(read_profiles(), {})
+
+    def test_signed_header_profiles_request(self):
+        with override_settings(PROFILE_SAMPLE_RATE=0):
+            self.client.get(reverse('product_list'), HTTP_X_SILK_PROFILE=profile_token())
+            self.client.get(reverse('product_list'), HTTP_X_SILK_PROFILE=profile_token())
+        self.assertEqual(list(read_profiles()), ['product_list'])
+        self.assertEqual(read_profiles()['product_list'][0], 2)
+
+    def test_old_profiles_are_pruned_per_url_name(self):
+        from collections import Counter
+
+        with override_settings(PROFILE_MAX_FILES=2):
+            paths = [write_profile('product_list', Counter({'a;b': 1}), 0.01) for _ in range(4)]
+            write_profile('product_detail', Counter({'a;c': 1}), 0.01)
+        self.assertEqual(sorted(paths[0].parent.iterdir()), sorted(paths[2:]))
+        self.assertEqual({name: requests for name, (requests, _) in read_profiles().items()},
+                         {'product_list': 2, 'product_detail': 1})
+
+    def test_sample_rate_and_summary_command(self):
+        with override_settings(PROFILE_SAMPLE_RATE=1):
+            self.client.get(reverse('product_detail', args=[SilkProduct.objects.get().pk]))
+        out = StringIO()
+        call_command('profile_summary', stdout=out)
+        self.assertIn('product_detail: 1 request(s)', out.getvalue())
+
+        collapsed = f'{self.profiles.name}/merged.txt'
+        call_command('profile_summary', 'product_detail', collapsed=collapsed, stdout=StringIO())
+        with open(collapsed) as f:
+            for line in f:
+                stack, count = line.rsplit(' ', 1)
+                self.assertTrue(stack)
+                self.assertGreater(int(count), 0)
@@ -0,0 +1,118 @@
+import time
+from functools import wraps
+
+from django.core.cache import cache as default_cache
+from django.http import HttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Buckets read the time through this name so tests can pin it.
+clock = time.time
+
+
+def parse_rate(rate):
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+def get_rate(scope):
+    rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+    return parse_rate(rate) if rate else None
+
+
+class TokenBucket:
+    """
+    A bucket of ``capacity`` tokens per key that refills every ``period``
+    seconds. Each period has its own cache key, so taking a token is one
+    atomic ``incr``; ``add`` is only needed for the first hit of a period.
+    """
+
+    def __init__(self, capacity, period, cache=None, timer=None):
+        self.capacity = capacity
+        self.period = period
+        self.cache = cache if cache is not None else default_cache
+        self.timer = timer or clock
+
+    def consume(self, key):
+        now = self.timer()
+        window = int(now // self.period)
+        bucket_key = f'throttle:{key}:{window}'
+        try:
+            used = self.cache.incr(bucket_key)
+        except ValueError:
+            if self.cache.add(bucket_key, 1, self.period + 1):
+                used = 1
+            else:
+                used = self.cache.incr(bucket_key)
+        if used <= self.capacity:
+            return True, None
+        return False, (window + 1) * self.period - now
+
+
+def get_ident(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{BaseThrottle().get_ident(request)}'
+
+
+def consume(request, scope):
+    rate = get_rate(scope)
+    if rate is None:
+        return True, None
+    match = request.resolver_match
+    endpoint = match.url_name if match else request.path
+    return TokenBucket(*rate).consume(f'{scope}:{endpoint}:{get_ident(request)}')
+
+
+class BucketRateThrottle(BaseThrottle):
+    """Throttles views that declare a ``throttle_scope``."""
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def allow_request(self, request, view):
+        self._wait = None
+        scope = self.get_scope(request, view)
+        if scope is None:
+            return True
+        allowed, self._wait = consume(request, scope)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class SearchRateThrottle(BucketRateThrottle):
+    """Throttles any list request that carries a search term."""
+
+    def get_scope(self, request, view):
+        params = request.query_params
+        if params.get('search') or params.get('q'):
+            return 'search'
+        return None
+
+
+def throttle(scope, methods=None, params=None):
+    """
+    Apply a bucket throttle to a plain Django view. ``methods`` limits the
+    throttle to those HTTP methods and ``params`` to requests carrying one
+    of those query parameters.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            applies = methods is None or request.method in methods
+            if applies and params is not None:
+                applies = any(request.GET.get(param) for param in params)
+            if applies:
+                allowed, wait = consume(request, scope)
+                if not allowed:
+                    response = HttpResponse('Too many requests. Please try again later.', status=429)
+                    response['Retry-After'] = str(int(wait) + 1)
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,100 @@
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .listcache import bump_catalog_version
+from .models import ProductViewCount, RollupWatermark, SilkProduct
+
+WATERMARK = 'trending'
+
+# Scores are stored as log(sum of weight * e^(rate * (t - ANCHOR))) over a
+# product's activity. Anchoring time instead of decaying every row means an
+# old score never has to be rewritten: newer activity simply counts
+# exponentially more, and comparing two logs compares the decayed sums.
+ANCHOR = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def decay_rate():
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def event_score(weight, at):
+    """Log-space contribution of ``weight`` units of activity at time ``at``."""
+    return math.log(weight) + decay_rate() * (at - ANCHOR).total_seconds()
+
+
+def add_scores(a, b):
+    """log(e^a + e^b) without overflowing."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def current_scores(pks, chunk_size=500):
+    scores = {}
+    for start in range(0, len(pks), chunk_size):
+        scores.update(SilkProduct.objects.filter(pk__in=pks[start:start + chunk_size])
+                      .values_list('pk', 'trending_score'))
+    return scores
+
+
+def refresh_trending(full=False, now=None, batch_size=500):
+    """
+    Fold listings created and views/contacts flushed since the last run into
+    the stored scores, treating new activity as happening when its counter
+    row was last updated. ``full`` recomputes every score from the totals,
+    which dates all past activity to each counter's last update.
+    Returns the number of products rescored.
+
+    The watermark is set TRENDING_WATERMARK_LAG_MINUTES before ``now`` so
+    rows committed late by a long transaction are picked up by the next run.
+    Re-reading the overlap is harmless: counters only add what is beyond
+    their scored totals, and listings that already have a score keep it.
+    The catalog version is bumped on commit, which every web worker checks
+    in the database, so their cached trending lists are dropped too.
+    """
+    now = now or timezone.now()
+    weights = settings.TRENDING_WEIGHTS
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().filter(name=WATERMARK).first()
+        since = None if full or watermark is None else watermark.value
+
+        # New listings start with a small boost at their creation time.
+        created = SilkProduct.objects.order_by()
+        if since is not None:
+            created = created.filter(created_at__gte=since, trending_score=0)
+        scores = {
+            pk: event_score(weights['new'], created_at)
+            for pk, created_at in created.values_list('pk', 'created_at').iterator(chunk_size=5000)
+        }
+
+        counters = ProductViewCount.objects.order_by()
+        if since is not None:
+            counters = counters.filter(updated_at__gte=since)
+        rows = list(counters.values_list(
+            'product_id', 'views', 'contacts', 'scored_views', 'scored_contacts', 'updated_at',
+        ))
+        if since is None:
+            rows = [(pk, views, contacts, 0, 0, updated_at) for pk, views, contacts, _, _, updated_at in rows]
+        rows = [row for row in rows if row[1] > row[3] or row[2] > row[4]]
+        scores.update(current_scores([row[0] for row in rows if row[0] not in scores]))
+
+        scored = []
+        for pk, views, contacts, scored_views, scored_contacts, updated_at in rows:
+            if pk not in scores:  # product deleted since
+                continue
+            weight = (views - scored_views) * weights['view'] + (contacts - scored_contacts) * weights['contact']
+            scores[pk] = add_scores(scores[pk], event_score(weight, updated_at))
+            scored.append(ProductViewCount(product_id=pk, scored_views=views, scored_contacts=contacts))
+
+        SilkProduct.objects.bulk_update(
+            [SilkProduct(pk=pk, trending_score=score) for pk, score in scores.items()],
+            ['trending_score'], batch_size=batch_size,
+        )
+        ProductViewCount.objects.bulk_update(scored, ['scored_views', 'scored_contacts'], batch_size=batch_size)
+        lag = timedelta(minutes=settings.TRENDING_WATERMARK_LAG_MINUTES)
+        RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': now - lag})
+        transaction.on_commit(bump_catalog_version)
+    return len(scores)
@@ -5,6 +5,8 @@ from . import views
 urlpatterns = [
     path('', views.product_list, name='product_list'),
     path('product/<int:pk>/', views.product_detail, name='product_detail'),
+    path('product/<int:pk>/viewed/', views.product_viewed, name='product_viewed'),
+    path('dashboard/', views.seller_dashboard, name='seller_dashboard'),
     path('register/', views.register_view, name='register'),
     path('create/', views.product_create, name='product_create'),
     path('update/<int:pk>/', views.product_update, name='product_update'),
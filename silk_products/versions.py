@@ -0,0 +1,51 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import SharedVersion
+
+
+class VersionCounter:
+    """
+    A named version kept in the database, so a bump from any process (web
+    worker, cron job, shell) reaches the others. Each process re-reads it at
+    most every SHARED_VERSION_CHECK_INTERVAL seconds; its own bumps are seen
+    at once.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.value = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        checked_at = self.checked_at
+        if checked_at is None or time.monotonic() - checked_at >= settings.SHARED_VERSION_CHECK_INTERVAL:
+            self.refresh()
+        return self.value
+
+    def refresh(self):
+        value = SharedVersion.objects.filter(name=self.name).values_list('value', flat=True).first() or 0
+        with self.lock:
+            self.value, self.checked_at = value, time.monotonic()
+
+    def bump(self):
+        if not SharedVersion.objects.filter(name=self.name).update(value=F('value') + 1):
+            # Seed from the clock so a recreated row never reuses a version a
+            # process may still hold cached data for.
+            try:
+                with transaction.atomic():
+                    SharedVersion.objects.create(name=self.name, value=time.time_ns())
+            except IntegrityError:
+                SharedVersion.objects.filter(name=self.name).update(value=F('value') + 1)
+        self.refresh()
+        return self.value
+
+    def reset(self):
+        """Forget the value read last, so the next get() reads the database."""
+        with self.lock:
+            self.value = self.checked_at = None
@@ -0,0 +1,142 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import ProductViewCount
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT; three parameters each keeps SQLite under its 999-variable limit.
+UPSERT_BATCH = 300
+
+# Every counter column has to be given on insert; the model defaults aren't database defaults.
+COUNTER_COLUMNS = ('views', 'contacts', 'scored_views', 'scored_contacts')
+
+
+def add_counts(counts, column='views'):
+    """
+    Add ``{product_id: n}`` to the stored ``column`` totals with multi-row
+    ``INSERT ... ON CONFLICT DO UPDATE`` statements (SQLite and PostgreSQL).
+    """
+    if column not in ('views', 'contacts'):
+        raise ValueError(f'Unknown counter {column!r}')
+    table = connection.ops.quote_name(ProductViewCount._meta.db_table)
+    row = '(%s, ' + ', '.join('%s' if name == column else '0' for name in COUNTER_COLUMNS) + ', %s)'
+    now = timezone.now()
+    items = sorted(counts.items())
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_BATCH):
+            batch = items[start:start + UPSERT_BATCH]
+            cursor.execute(
+                f'INSERT INTO {table} (product_id, {", ".join(COUNTER_COLUMNS)}, updated_at) '
+                f'VALUES {", ".join([row] * len(batch))} '
+                f'ON CONFLICT (product_id) DO UPDATE SET {column} = {table}.{column} + excluded.{column}, '
+                f'updated_at = excluded.updated_at',
+                [param for product_id, n in batch for param in (product_id, n, now)],
+            )
+
+
+def add_views(counts):
+    add_counts(counts, 'views')
+
+
+def record_contact(product_id):
+    """Buyers contacting a seller are rare enough to write straight away."""
+    add_counts({product_id: 1}, 'contacts')
+
+
+class ViewBuffer:
+    """
+    Counts product views in process memory and writes them out in one
+    batched upsert once VIEW_COUNT_FLUSH_INTERVAL seconds have passed or
+    VIEW_COUNT_FLUSH_HITS views are pending. With ``background`` set (see
+    flush_in_background) a thread in each process flushes on the interval
+    even when no more views arrive, so a crash loses at most that much; a
+    clean shutdown flushes (see flush_on_exit). Without it the interval is
+    only checked when the next view is recorded.
+    """
+
+    def __init__(self):
+        self.pending = Counter()
+        self.pending_hits = 0
+        self.flushed_at = time.monotonic()
+        self.background = False
+        self._flusher_pid = None
+        self._lock = threading.Lock()
+
+    def record(self, product_id):
+        with self._lock:
+            self.pending[product_id] += 1
+            self.pending_hits += 1
+            due = (self.pending_hits >= settings.VIEW_COUNT_FLUSH_HITS
+                   or time.monotonic() - self.flushed_at >= settings.VIEW_COUNT_FLUSH_INTERVAL)
+            # Started on the first view in each process: a thread started
+            # before a pre-fork server forks doesn't exist in its workers.
+            if self.background and self._flusher_pid != os.getpid():
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._flush_periodically, name='view-count-flusher', daemon=True).start()
+        if due:
+            self.flush()
+
+    def _flush_periodically(self):
+        while self.background:
+            with self._lock:
+                wait = self.flushed_at + settings.VIEW_COUNT_FLUSH_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Background view count flush failed')
+            finally:
+                # This thread's own connection; don't hold it open between flushes.
+                connection.close()
+
+    def flush(self):
+        """Write the pending counts; returns the number of views written."""
+        with self._lock:
+            counts, self.pending = self.pending, Counter()
+            self.pending_hits = 0
+            self.flushed_at = time.monotonic()
+        if not counts:
+            return 0
+        try:
+            add_views(counts)
+        except DatabaseError:
+            # Keep the hits for the next flush rather than dropping them.
+            with self._lock:
+                self.pending.update(counts)
+                self.pending_hits += sum(counts.values())
+            logger.exception('Could not flush %d product view count(s)', len(counts))
+            return 0
+        return sum(counts.values())
+
+    def clear(self):
+        with self._lock:
+            self.pending.clear()
+            self.pending_hits = 0
+
+
+view_buffer = ViewBuffer()
+
+
+def record_view(product_id):
+    view_buffer.record(product_id)
+
+
+def flush_on_exit():
+    """Called by wsgi.py/asgi.py so a worker writes its buffered views when it shuts down."""
+    atexit.register(view_buffer.flush)
+
+
+def flush_in_background():
+    """Called by wsgi.py/asgi.py so each worker flushes its buffered views on the interval even when idle."""
+    view_buffer.background = True
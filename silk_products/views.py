@@ -3,23 +3,47 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout, login
 from django.contrib import messages
 from django.db.models import Q
-from django.http import HttpResponse
+from django.db.models.functions import Coalesce
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from django.views.static import serve
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import SilkProduct, UserProfile
+from .models import ArchivedSilkProduct, SilkProduct, SimilarProduct, UserProfile
 from .forms import SilkProductForm, CustomUserCreationForm, ContactSellerForm
+from .changelog import record_changes
+from .pagination import KnownCountPaginator
+from .productcache import get_product
+from .currency import apply_prices, currencies, format_price, get_currency
+from .viewcounts import record_contact, record_view
+from .throttling import throttle
 
 
+@throttle('search', params=('q',))
 def product_list(request):
-    products = SilkProduct.objects.select_related('owner').all()
+    products = SilkProduct.objects.select_related('owner').defer(*SilkProduct.LIST_DEFERRED_FIELDS)
     query = request.GET.get('q')
     if query:
         products = products.filter(Q(name__icontains=query) | Q(type__icontains=query))
-    return render(request, 'silk_products/product_list.html', {'products': products, 'query': query})
+    sort = request.GET.get('sort')
+    if sort not in SilkProduct.SORT_ORDERS:
+        sort = 'newest'
+    products = list(products.order_by(*SilkProduct.SORT_ORDERS[sort]))
+    apply_prices(products, get_currency(request))
+    return render(request, 'silk_products/product_list.html', {'products': products, 'query': query, 'sort': sort})
 
 
 def product_detail(request, pk):
-    product = get_object_or_404(SilkProduct, pk=pk)
+    product = get_product(pk)
+    if product is None:
+        archived = get_object_or_404(ArchivedSilkProduct, pk=pk)
+        apply_prices([archived], get_currency(request))
+        return render(request, 'silk_products/product_detail.html', {'product': archived, 'archived': True})
+    if request.method == 'GET':
+        record_view(product.pk)
+
     contact_form = None
     
     if request.user.is_authenticated and hasattr(request.user, 'userprofile'):
@@ -35,7 +59,7 @@ def product_detail(request, pk):
                     {contact_form.cleaned_data['message']}
                     
                     Product: {product.name}
-                    Price: ${product.price}
+                    Price: {format_price(product.price, currencies()[settings.BASE_CURRENCY])}
                     """
                     try:
                         send_mail(
@@ -45,19 +69,41 @@ def product_detail(request, pk):
                             [product.owner.email],
                             fail_silently=False,
                         )
-                        messages.success(request, 'Your message has been sent to the seller!')
-                        return redirect('product_detail', pk=pk)
                     except:
                         messages.error(request, 'Failed to send message. Please try again.')
+                    else:
+                        record_contact(product.pk)
+                        messages.success(request, 'Your message has been sent to the seller!')
+                        return redirect('product_detail', pk=pk)
             else:
                 contact_form = ContactSellerForm()
     
+    similar_links = (
+        SimilarProduct.objects.filter(product_id=product.pk)
+        .select_related('similar')
+        .defer('similar__description')
+        .order_by('rank')
+    )
+    similar_products = [link.similar for link in similar_links]
+    apply_prices([product, *similar_products], get_currency(request))
     return render(request, 'silk_products/product_detail.html', {
         'product': product,
-        'contact_form': contact_form
+        'contact_form': contact_form,
+        'similar_products': similar_products,
     })
 
 
+@csrf_exempt
+@require_POST
+def product_viewed(request, pk):
+    """Count a view of a product page served from the static snapshot, which never reaches product_detail."""
+    if get_product(pk) is None:
+        raise Http404
+    record_view(pk)
+    return HttpResponse(status=204)
+
+
+@throttle('register', methods=('POST',))
 def register_view(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
@@ -78,7 +124,7 @@ def product_create(request):
         return redirect('product_list')
     
     if request.method == 'POST':
-        form = SilkProductForm(request.POST)
+        form = SilkProductForm(request.POST, request.FILES)
         if form.is_valid():
             product = form.save(commit=False)
             product.owner = request.user
@@ -99,9 +145,10 @@ def product_update(request, pk):
         return redirect('product_list')
     
     if request.method == 'POST':
-        form = SilkProductForm(request.POST, instance=product)
+        form = SilkProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
-            form.save()
+            with record_changes(request.user):
+                form.save()
             messages.success(request, 'Product updated successfully!')
             return redirect('product_list')
     else:
@@ -124,6 +171,31 @@ def product_delete(request, pk):
     return render(request, 'silk_products/product_confirm_delete.html', {'product': product})
 
 
+@login_required
+def seller_dashboard(request):
+    if not hasattr(request.user, 'userprofile') or request.user.userprofile.role != 'seller':
+        messages.error(request, 'Only sellers have a dashboard.')
+        return redirect('product_list')
+
+    profile = request.user.userprofile
+    products = request.user.products.defer(*SilkProduct.LIST_DEFERRED_FIELDS).annotate(
+        views=Coalesce('view_count__views', 0),
+    )
+    paginator = KnownCountPaginator(products, 20, profile.product_count)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = list(page_obj.object_list)
+    apply_prices(page_obj.object_list, get_currency(request))
+    type_counts = [
+        (label, getattr(profile, f'{value}_count'))
+        for value, label in SilkProduct.TYPE_CHOICES
+    ]
+    return render(request, 'silk_products/seller_dashboard.html', {
+        'profile': profile,
+        'page_obj': page_obj,
+        'type_counts': type_counts,
+    })
+
+
 def custom_logout(request):
     logout(request)
     messages.success(request, 'You have been logged out successfully!')
@@ -132,3 +204,27 @@ def custom_logout(request):
 
 def favicon_view(request):
     return HttpResponse(status=204)
+
+
+@require_GET
+def product_image_variant(request, path):
+    """
+    A resized product image. Names are content hashes, so they can be cached
+    forever. The bytes never go through Python in production: nginx sends
+    them (MEDIA_ACCEL_REDIRECT), or the client is redirected to the storage's
+    own URL when it lives elsewhere. Django only serves the file itself in
+    DEBUG, like the rest of MEDIA_URL.
+    """
+    name = f'products/variants/{path}'
+    url = default_storage.url(name)
+    if url != request.path:
+        return redirect(url)
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type='image/jpeg')
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT.rstrip('/') + '/' + name
+    elif settings.DEBUG:
+        response = serve(request, name, document_root=settings.MEDIA_ROOT)
+    else:
+        raise Http404
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
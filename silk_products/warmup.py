@@ -0,0 +1,101 @@
+import importlib
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+
+# Modules the first API request would otherwise import lazily.
+PRELOAD_MODULES = [
+    'rest_framework.authentication',
+    'rest_framework.negotiation',
+    'rest_framework.renderers',
+    'rest_framework.parsers',
+    'rest_framework.pagination',
+    'rest_framework_simplejwt.authentication',
+    'rest_framework_simplejwt.tokens',
+    'silk_products.api_views',
+    'silk_products.views',
+]
+
+
+def load_urls():
+    resolver = get_resolver()
+    # reverse_dict populates the resolver (and every included resolver) up front.
+    resolver.reverse_dict
+    return len(resolver.url_patterns)
+
+
+def import_modules():
+    from rest_framework.settings import api_settings
+
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    # Touching the settings imports the configured authentication/throttle/etc. classes.
+    for setting in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+                    'DEFAULT_PARSER_CLASSES', 'DEFAULT_THROTTLE_CLASSES', 'DEFAULT_PAGINATION_CLASS'):
+        getattr(api_settings, setting)
+    return len(PRELOAD_MODULES)
+
+
+def compile_templates():
+    """Compile every project template so the cached loader already holds them."""
+    compiled = 0
+    for engine in engines.all():
+        for directory in getattr(engine, 'dirs', []):
+            root = Path(directory)
+            for path in sorted(root.rglob('*.html')):
+                engine.get_template(path.relative_to(root).as_posix())
+                compiled += 1
+    return compiled
+
+
+def open_connections():
+    """
+    Connect once to load the database driver and fail fast on bad settings,
+    then close again: the connection belongs to this (import) thread, and a
+    preforking server would otherwise hand the same socket to every worker.
+    """
+    for conn in connections.all():
+        conn.ensure_connection()
+    connections.close_all()
+    return len(connections.all())
+
+
+def build_suggest_index():
+    """Build the typeahead index now rather than in the first suggest request."""
+    from .suggest import rebuild_index
+
+    return len(rebuild_index()._products)
+
+
+STEPS = [
+    ('urls', load_urls),
+    ('imports', import_modules),
+    ('templates', compile_templates),
+    ('suggest', build_suggest_index),
+    ('connections', open_connections),
+]
+
+
+def warm_up(steps=None):
+    """
+    Run the warm-up steps and return ``{step: (count, seconds)}``. Called
+    from wsgi.py/asgi.py once the application is built, so a recycled
+    worker pays these costs before it accepts its first request.
+    """
+    timings = {}
+    for name, step in STEPS:
+        if steps is not None and name not in steps:
+            continue
+        start = time.perf_counter()
+        count = step()
+        timings[name] = (count, time.perf_counter() - start)
+    return timings
+
+
+def warm_up_on_startup():
+    if settings.WARMUP_ON_STARTUP:
+        warm_up()